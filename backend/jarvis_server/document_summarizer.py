@@ -0,0 +1,256 @@
+"""
+Document summarization for J.A.R.V.I.S
+Map-reduce summaries of long documents: chunks are summarized concurrently,
+then the partial summaries are merged in rounds until one remains
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import time
+import zlib
+from contextlib import nullcontext
+from typing import Dict, List, Optional
+
+from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+# Rough size of a token for English text - good enough for sizing chunks
+CHARS_PER_TOKEN = 4
+
+# Page markers added by PDF extraction - stripped so inserting a page doesn't
+# renumber (and re-hash) every chunk after it
+PAGE_MARKER_PATTERN = re.compile(r"^\[Page \d+\]\s*$", re.MULTILINE)
+
+# A chunk past a quarter of its target size ends at any unit whose hash is 0 modulo this.
+# Boundaries then depend on content rather than position, so an edit only
+# reshapes the chunks around it and the rest keep their hashes (and cached summaries).
+BOUNDARY_MODULUS = 4
+
+SYSTEM_PROMPT = "You are J.A.R.V.I.S, analyzing documents for the user. Be concise and professional."
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of a text"""
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+def _split_unit(text: str, max_tokens: int) -> List[str]:
+    """Break text longer than max_tokens on lines, then sentences, then characters"""
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+    
+    for separator in ("\n", ". "):
+        parts = [part for part in text.split(separator) if part.strip()]
+        if len(parts) > 1:
+            units = []
+            for part in parts:
+                units.extend(_split_unit(part, max_tokens))
+            return units
+    
+    width = max_tokens * CHARS_PER_TOKEN
+    return [text[i:i + width] for i in range(0, len(text), width)]
+
+def split_into_chunks(text: str, chunk_tokens: int) -> List[str]:
+    """
+    Split text into chunks of at most about chunk_tokens
+    
+    A text that fits in one chunk is returned whole. Longer texts are split
+    into paragraphs (or lines/sentences of oversized ones), packed into
+    chunks with content-defined boundaries - see BOUNDARY_MODULUS.
+    
+    Args:
+        text: Document text
+        chunk_tokens: Target chunk size in tokens
+    
+    Returns:
+        List of chunk texts
+    """
+    text = PAGE_MARKER_PATTERN.sub("", text).strip()
+    # Stable boundaries only pay off across several chunks - one chunk means one LLM call
+    if estimate_tokens(text) <= chunk_tokens:
+        return [text] if text else []
+    
+    units = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        if paragraph.strip():
+            units.extend(unit.strip() for unit in _split_unit(paragraph.strip(), chunk_tokens))
+    
+    max_chars = chunk_tokens * CHARS_PER_TOKEN
+    chunks: List[str] = []
+    current: List[str] = []
+    current_chars = 0
+    for unit in units:
+        if current and current_chars + len(unit) + 1 > max_chars:
+            chunks.append("\n".join(current))
+            current, current_chars = [], 0
+        
+        current.append(unit)
+        current_chars += len(unit) + 1
+        if current_chars >= max_chars // 4 and zlib.crc32(unit.encode("utf-8")) % BOUNDARY_MODULUS == 0:
+            chunks.append("\n".join(current))
+            current, current_chars = [], 0
+    
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+class DocumentSummarizer:
+    """
+    Map-reduce summarizer for long documents
+    
+    The document is split into token-sized chunks that are summarized
+    concurrently (at most max_concurrency calls in flight). Partial summaries
+    are merged fan_in at a time, round after round, and the last merge writes
+    the user-facing summary. Chunk summaries are cached by content hash, so a
+    re-uploaded, edited document only re-summarizes the chunks that changed.
+    """
+    
+    def __init__(self, client: Optional[AsyncOpenAI], limiter: Optional[asyncio.Semaphore] = None,
+                 model: Optional[str] = None, cache=None, chunk_tokens: int = 1500,
+                 max_concurrency: int = 4, fan_in: int = 8):
+        """
+        Initialize summarizer
+        
+        Args:
+            client: Async OpenAI-compatible client
+            limiter: Optional semaphore shared with other LLM calls to cap concurrency
+            model: Summary model (defaults to OPENAI_MODEL)
+            cache: Chunk summary store with get_chunk_summaries/put_chunk_summaries (e.g. FileCache)
+            chunk_tokens: Target chunk size in tokens
+            max_concurrency: Max summarization calls in flight for one document
+            fan_in: Partial summaries merged per reduce call
+        """
+        self.client = client
+        self.limiter = limiter
+        self.model = model or os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+        self.cache = cache
+        self.chunk_tokens = chunk_tokens
+        self.max_concurrency = max(1, max_concurrency)
+        self.fan_in = max(2, fan_in)
+        
+        # Metrics
+        self._documents = 0
+        self._chunks = 0
+        self._chunk_cache_hits = 0
+        self._llm_calls = 0
+        self._total_seconds = 0.0
+    
+    def chunk_key(self, chunk: str) -> str:
+        """Cache key of a chunk summary (model + chunk text)"""
+        return hashlib.sha256(f"{self.model}\0{chunk}".encode("utf-8")).hexdigest()
+    
+    async def _complete(self, prompt: str, max_tokens: int, slots: asyncio.Semaphore) -> str:
+        """One summarization call, bounded by the document's slots and the shared limiter"""
+        async with slots:
+            async with (self.limiter or nullcontext()):
+                self._llm_calls += 1
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": SYSTEM_PROMPT},
+                        {"role": "user", "content": prompt}
+                    ],
+                    max_tokens=max_tokens,
+                    temperature=0.5,
+                )
+        return (response.choices[0].message.content or "").strip()
+    
+    async def _gather(self, prompts: List[str], max_tokens: int, slots: asyncio.Semaphore) -> List[Optional[str]]:
+        """Run prompts concurrently; failed calls come back as None (all failing raises)"""
+        results = await asyncio.gather(
+            *(self._complete(prompt, max_tokens, slots) for prompt in prompts), return_exceptions=True
+        )
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors and len(errors) == len(results):
+            raise errors[0]
+        for error in errors:
+            logger.warning(f"Document summarization call failed - continuing without it: {error}")
+        return [None if isinstance(result, BaseException) else result for result in results]
+    
+    async def _map(self, chunks: List[str], file_type: str, slots: asyncio.Semaphore) -> List[str]:
+        """Summarize each chunk, reusing cached chunk summaries"""
+        keys = [self.chunk_key(chunk) for chunk in chunks]
+        cached: Dict[str, str] = {}
+        if self.cache:
+            cached = await asyncio.to_thread(self.cache.get_chunk_summaries, keys)
+        self._chunk_cache_hits += len(cached)
+        
+        missing = [index for index, key in enumerate(keys) if key not in cached]
+        prompts = [
+            f"""This is part {index + 1} of {len(chunks)} of a {file_type} document.
+Summarize its key facts, figures and conclusions in a few sentences.
+
+Content:
+{chunks[index]}"""
+            for index in missing
+        ]
+        fresh = await self._gather(prompts, 200, slots)
+        
+        new_summaries = {keys[index]: summary for index, summary in zip(missing, fresh) if summary}
+        if self.cache and new_summaries:
+            await asyncio.to_thread(self.cache.put_chunk_summaries, new_summaries)
+        cached.update(new_summaries)
+        
+        logger.info(f"Summarized {len(chunks)} chunks ({len(chunks) - len(missing)} cached, {len(new_summaries)} new)")
+        return [cached[key] for key in keys if key in cached]
+    
+    async def summarize(self, text: str, file_type: str) -> str:
+        """
+        Summarize a document
+        
+        Args:
+            text: Extracted document text
+            file_type: 'pdf' or 'image' (used in prompts)
+        
+        Returns:
+            Summary of the whole document in 2-3 sentences
+        """
+        start_time = time.perf_counter()
+        slots = asyncio.Semaphore(self.max_concurrency)
+        chunks = split_into_chunks(text, self.chunk_tokens) or [text]
+        self._documents += 1
+        self._chunks += len(chunks)
+        
+        final_prompt = f"""Analyze and summarize the following {file_type} content concisely.
+Provide key points and main ideas in 2-3 sentences.
+
+Content:
+{{content}}"""
+
+        if len(chunks) == 1:
+            summary = await self._complete(final_prompt.format(content=chunks[0]), 300, slots)
+        else:
+            partials = await self._map(chunks, file_type, slots)
+            
+            # Merge rounds until one call can take everything that is left
+            while len(partials) > self.fan_in:
+                groups = [partials[i:i + self.fan_in] for i in range(0, len(partials), self.fan_in)]
+                prompts = [
+                    "Combine these consecutive section summaries of one document into a single summary "
+                    "that keeps the key facts, figures and conclusions.\n\n" + "\n\n".join(group)
+                    for group in groups
+                ]
+                merged = await self._gather(prompts, 300, slots)
+                partials = [summary for summary in merged if summary]
+            
+            summary = await self._complete(
+                final_prompt.format(content="Summaries of consecutive sections:\n\n" + "\n\n".join(partials)), 300, slots
+            )
+        
+        self._total_seconds += time.perf_counter() - start_time
+        return summary
+    
+    def get_stats(self) -> Dict:
+        """Get summarizer metrics"""
+        return {
+            'model': self.model,
+            'chunk_tokens': self.chunk_tokens,
+            'max_concurrency': self.max_concurrency,
+            'documents': self._documents,
+            'chunks': self._chunks,
+            'chunk_cache_hits': self._chunk_cache_hits,
+            'llm_calls': self._llm_calls,
+            'avg_latency_ms': round(self._total_seconds / self._documents * 1000) if self._documents else 0,
+        }
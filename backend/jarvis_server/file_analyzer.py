@@ -5,13 +5,224 @@ Handles PDF extraction and image OCR
 
 import io
 import logging
-from typing import Optional
-from PyPDF2 import PdfReader
-from PIL import Image
-import pytesseract
+import mmap
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from memory import get_connection_pool
+
+# PyPDF2, PIL and pytesseract are imported on first use to keep server startup fast
 
 logger = logging.getLogger(__name__)
 
+# Worker processes for CPU-bound extraction (0 = extract in the calling thread)
+FILE_WORKERS = int(os.getenv("FILE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Pages handed to a worker per task
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "8"))
+
+# OCR preprocessing: larger images are downscaled to this many pixels, and
+# images taller than the tile height are split into strips OCR'd in parallel (0 = no tiling)
+OCR_MAX_PIXELS = int(os.getenv("OCR_MAX_PIXELS", "4000000"))
+OCR_TILE_HEIGHT = int(os.getenv("OCR_TILE_HEIGHT", "1600"))
+
+# OCR jobs allowed to wait for a worker before new ones are turned away
+OCR_QUEUE_SIZE = int(os.getenv("OCR_QUEUE_SIZE", "4"))
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+class AnalyzerBusyError(Exception):
+    """Raised when the OCR queue is full - the caller should retry later"""
+
+# File content: in-memory bytes (small uploads) or a path to a spooled file on disk.
+# Paths are memory-mapped where read, and are what gets sent to pool workers.
+FileSource = Union[bytes, str]
+
+# Leading bytes identifying supported formats
+MAGIC_SIGNATURES = [
+    (b"%PDF-", "pdf"),
+    (b"\x89PNG\r\n\x1a\n", "image"),
+    (b"\xff\xd8\xff", "image"),          # JPEG
+    (b"GIF87a", "image"),
+    (b"GIF89a", "image"),
+    (b"BM", "image"),                     # BMP
+    (b"II*\x00", "image"),                # TIFF, little-endian
+    (b"MM\x00*", "image"),                # TIFF, big-endian
+]
+
+def detect_file_type(header: bytes) -> Optional[str]:
+    """
+    Identify a file from its first bytes
+    
+    Args:
+        header: At least the first 8 bytes of the file
+        
+    Returns:
+        'pdf', 'image' or None if unsupported
+    """
+    for signature, file_type in MAGIC_SIGNATURES:
+        if header.startswith(signature):
+            return file_type
+    return None
+
+@contextmanager
+def open_source(source: FileSource):
+    """
+    Open file content as a seekable binary stream without copying it
+    
+    Paths are memory-mapped, so the OS pages data in on demand and it is
+    shared with the page cache instead of duplicated on the heap.
+    """
+    if not isinstance(source, str):
+        yield io.BytesIO(source)
+        return
+    
+    with open(source, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield io.BytesIO(b"")
+            return
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield mapped
+        finally:
+            mapped.close()
+
+def read_header(source: FileSource, size: int = 16) -> bytes:
+    """First bytes of the content, for magic-byte detection"""
+    if not isinstance(source, str):
+        return bytes(source[:size])
+    with open(source, "rb") as f:
+        return f.read(size)
+
+def get_process_pool() -> Optional[ProcessPoolExecutor]:
+    """Get or create the shared extraction process pool (None when FILE_WORKERS is 0)"""
+    global _process_pool
+    if FILE_WORKERS <= 0:
+        return None
+    with _process_pool_lock:
+        if _process_pool is None:
+            # Created on first use, when the server already runs threads (event loop, threadpool,
+            # memory warm-up and write queue) - forked children could inherit their held locks
+            start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _process_pool = ProcessPoolExecutor(
+                max_workers=FILE_WORKERS,
+                mp_context=multiprocessing.get_context(start_method)
+            )
+            logger.info(f"Started file extraction pool ({FILE_WORKERS} workers)")
+        return _process_pool
+
+def shutdown_process_pool():
+    """Stop the extraction pool (called on app shutdown)"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+            _process_pool = None
+
+def iter_pdf_pages(source: FileSource, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+    """
+    Lazily yield (page_number, text) for pages with text
+    
+    Pages are only parsed as the caller iterates, so stopping early skips the rest.
+    
+    Args:
+        source: PDF bytes or path
+        start: First page index (0-based)
+        end: Page index to stop before (None = last page)
+    """
+    from PyPDF2 import PdfReader
+    
+    with open_source(source) as stream:
+        pdf_reader = PdfReader(stream)
+        end = len(pdf_reader.pages) if end is None else min(end, len(pdf_reader.pages))
+        
+        for index in range(start, end):
+            try:
+                text = pdf_reader.pages[index].extract_text()
+                if text and text.strip():
+                    yield index + 1, text
+            except Exception as e:
+                logger.warning(f"Error extracting page {index + 1}: {e}")
+
+def count_pdf_pages(source: FileSource) -> int:
+    """Number of pages in a PDF"""
+    from PyPDF2 import PdfReader
+    
+    with open_source(source) as stream:
+        return len(PdfReader(stream).pages)
+
+def _prepare_ocr_image(source: FileSource, max_pixels: int, tile_height: int) -> List[Tuple[Tuple[int, int], bytes]]:
+    """
+    Process pool task: decode, grayscale, downscale and tile an image for OCR
+    
+    Returns:
+        List of ((width, height), grayscale pixel bytes) tiles, top to bottom
+    """
+    import numpy as np
+    from PIL import Image
+    
+    with open_source(source) as stream:
+        image = Image.open(stream)
+        
+        # JPEG can decode straight to grayscale at reduced size, skipping most of the work
+        if image.width * image.height > max_pixels:
+            scale = (max_pixels / (image.width * image.height)) ** 0.5
+            image.draft('L', (int(image.width * scale), int(image.height * scale)))
+        image = image.convert('L')
+    
+    if image.width * image.height > max_pixels:
+        scale = (max_pixels / (image.width * image.height)) ** 0.5
+        image = image.resize((max(1, int(image.width * scale)), max(1, int(image.height * scale))), Image.LANCZOS)
+    
+    if tile_height <= 0 or image.height <= tile_height * 1.5:
+        return [(image.size, image.tobytes())]
+    
+    # Cut strips at the brightest row near each boundary - usually the gap between text lines
+    pixels = np.asarray(image)
+    row_brightness = pixels.mean(axis=1)
+    search = max(1, tile_height // 8)
+    cuts = [0]
+    while image.height - cuts[-1] > tile_height * 1.5:
+        target = cuts[-1] + tile_height
+        window = row_brightness[target - search:target + search]
+        cuts.append(target - search + int(np.argmax(window)))
+    cuts.append(image.height)
+    
+    return [
+        ((image.width, bottom - top), pixels[top:bottom].tobytes())
+        for top, bottom in zip(cuts, cuts[1:])
+    ]
+
+def _ocr_tile(size: Tuple[int, int], pixels: bytes) -> str:
+    """Process pool task: OCR one grayscale tile"""
+    from PIL import Image
+    import pytesseract
+    
+    try:
+        return pytesseract.image_to_string(Image.frombytes('L', size, pixels))
+    except Exception as e:
+        # Re-raise as a plain exception so it pickles back to the parent intact
+        raise RuntimeError(str(e)) from None
+
+def _extract_page_range(source: FileSource, start: int, end: int, max_chars: Optional[int]) -> List[Tuple[int, str]]:
+    """Process pool task: extract a page range, stopping once max_chars is reached"""
+    pages = []
+    total = 0
+    pages_iter = iter_pdf_pages(source, start, end)
+    for page_num, text in pages_iter:
+        pages.append((page_num, text))
+        total += len(text)
+        if max_chars and total >= max_chars:
+            break
+    pages_iter.close()  # Release the mapping now rather than at garbage collection
+    return pages
+
 class FileAnalyzer:
     """Analyzes files and extracts text content"""
     
@@ -19,65 +230,113 @@ class FileAnalyzer:
         """Initialize file analyzer"""
         self.supported_image_formats = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.gif']
         self.supported_pdf_formats = ['.pdf']
+        
+        # One slot per running or queued OCR job - bounds memory and latency under load
+        self._ocr_slots = threading.BoundedSemaphore(max(1, FILE_WORKERS) + OCR_QUEUE_SIZE)
+    
+    def iter_pdf_pages(self, source: FileSource) -> Iterator[Tuple[int, str]]:
+        """
+        Yield (page_number, text) one page at a time
+        
+        Args:
+            source: PDF bytes or path
+        """
+        return iter_pdf_pages(source)
     
-    def extract_pdf_text(self, file_content: bytes) -> str:
+    def extract_pdf_text(self, source: FileSource, max_chars: Optional[int] = None) -> str:
         """
         Extract text from PDF file
         
+        Page ranges are extracted in parallel in the process pool, a wave of
+        ranges at a time, and extraction stops once max_chars is reached.
+        
         Args:
-            file_content: PDF file bytes
+            source: PDF bytes or path
+            max_chars: Stop after roughly this many characters (None = whole document)
             
         Returns:
-            Extracted text
+            Extracted text (at most max_chars characters when given)
         """
         try:
-            # Create PDF reader from bytes
-            pdf_file = io.BytesIO(file_content)
-            pdf_reader = PdfReader(pdf_file)
-            
-            # Extract text from all pages
-            text_parts = []
-            for page_num, page in enumerate(pdf_reader.pages, 1):
-                try:
-                    text = page.extract_text()
-                    if text.strip():
-                        text_parts.append(f"[Page {page_num}]\n{text}")
-                except Exception as e:
-                    logger.warning(f"Error extracting page {page_num}: {e}")
-            
-            full_text = "\n\n".join(text_parts)
+            page_count = count_pdf_pages(source)
+            
+            pages = self._collect_pdf_pages(source, page_count, max_chars)
+            full_text = "\n\n".join(f"[Page {page_num}]\n{text}" for page_num, text in pages)
             
             if not full_text.strip():
                 return "No text could be extracted from the PDF."
             
-            logger.info(f"Extracted {len(full_text)} characters from PDF ({len(pdf_reader.pages)} pages)")
+            if max_chars:
+                full_text = full_text[:max_chars]
+            
+            logger.info(f"Extracted {len(full_text)} characters from PDF ({len(pages)}/{page_count} pages with text read)")
             return full_text
             
         except Exception as e:
             logger.error(f"Error extracting PDF text: {e}")
             raise ValueError(f"Failed to extract PDF text: {str(e)}")
     
-    def extract_image_text(self, file_content: bytes) -> str:
+    def _collect_pdf_pages(self, source: FileSource, page_count: int, max_chars: Optional[int]) -> List[Tuple[int, str]]:
+        """Gather page texts in order, in parallel where it pays off"""
+        pages: List[Tuple[int, str]] = []
+        total = 0
+        # Each task re-parses the document, so parallelism only pays off with several workers
+        pool = get_process_pool() if page_count > PDF_PAGES_PER_TASK and FILE_WORKERS > 1 else None
+        
+        # Short documents (or a single worker): one lazy pass in this thread
+        if pool is None:
+            return _extract_page_range(source, 0, page_count, max_chars)
+        
+        ranges = [(start, min(start + PDF_PAGES_PER_TASK, page_count)) for start in range(0, page_count, PDF_PAGES_PER_TASK)]
+        
+        # Submit one range per worker at a time, so a met budget cancels the remaining work
+        for wave_start in range(0, len(ranges), FILE_WORKERS):
+            wave = ranges[wave_start:wave_start + FILE_WORKERS]
+            futures = [pool.submit(_extract_page_range, source, start, end, max_chars) for start, end in wave]
+            for future in futures:
+                for page_num, text in future.result():
+                    pages.append((page_num, text))
+                    total += len(text)
+                    if max_chars and total >= max_chars:
+                        for pending in futures:
+                            pending.cancel()
+                        return pages
+        
+        return pages
+    
+    def extract_image_text(self, source: FileSource) -> str:
         """
         Extract text from image using OCR
         
+        Runs in the process pool: the image is grayscaled and capped at
+        OCR_MAX_PIXELS, and tall images are split into strips OCR'd in parallel.
+        
         Args:
-            file_content: Image file bytes
+            source: Image bytes or path
             
         Returns:
             Extracted text
+            
+        Raises:
+            AnalyzerBusyError: If OCR_QUEUE_SIZE jobs are already waiting
         """
+        if not self._ocr_slots.acquire(blocking=False):
+            raise AnalyzerBusyError("OCR queue is full")
+        
         try:
-            # Open image from bytes
-            image = Image.open(io.BytesIO(file_content))
-            
-            # Perform OCR
-            text = pytesseract.image_to_string(image)
+            pool = get_process_pool()
+            if pool is None:
+                tiles = _prepare_ocr_image(source, OCR_MAX_PIXELS, OCR_TILE_HEIGHT)
+                text = "\n".join(_ocr_tile(size, pixels) for size, pixels in tiles)
+            else:
+                tiles = pool.submit(_prepare_ocr_image, source, OCR_MAX_PIXELS, OCR_TILE_HEIGHT).result()
+                futures = [pool.submit(_ocr_tile, size, pixels) for size, pixels in tiles]
+                text = "\n".join(future.result() for future in futures)
             
             if not text.strip():
                 return "No text could be extracted from the image."
             
-            logger.info(f"Extracted {len(text)} characters from image via OCR")
+            logger.info(f"Extracted {len(text)} characters from image via OCR ({len(tiles)} tiles)")
             return text.strip()
             
         except Exception as e:
@@ -91,27 +350,28 @@ class FileAnalyzer:
                 )
             
             raise ValueError(f"Failed to extract image text: {str(e)}")
+        finally:
+            self._ocr_slots.release()
     
-    def analyze_file(self, filename: str, file_content: bytes) -> dict:
+    def analyze_file(self, filename: str, source: FileSource, max_chars: Optional[int] = None) -> dict:
         """
         Analyze file and extract content
         
         Args:
             filename: Original filename
-            file_content: File bytes
+            source: File bytes or path to the spooled upload
+            max_chars: Text budget - PDF extraction stops once it is reached
             
         Returns:
             Dictionary with file_type and extracted_text
         """
-        # Determine file type
-        filename_lower = filename.lower()
+        # Determine file type from content, not the (client-controlled) extension
+        file_type = detect_file_type(read_header(source))
         
-        if any(filename_lower.endswith(ext) for ext in self.supported_pdf_formats):
-            file_type = "pdf"
-            extracted_text = self.extract_pdf_text(file_content)
-        elif any(filename_lower.endswith(ext) for ext in self.supported_image_formats):
-            file_type = "image"
-            extracted_text = self.extract_image_text(file_content)
+        if file_type == "pdf":
+            extracted_text = self.extract_pdf_text(source, max_chars=max_chars)
+        elif file_type == "image":
+            extracted_text = self.extract_image_text(source)
         else:
             raise ValueError(
                 f"Unsupported file type. Supported: PDF, "
@@ -125,6 +385,235 @@ class FileAnalyzer:
             "text_length": len(extracted_text)
         }
 
+class FileCache:
+    """
+    Content-addressed cache of analyzed files
+    
+    Entries are keyed by the SHA-256 of the uploaded bytes and hold the
+    extracted text plus the generated summary, so a repeat upload skips both
+    extraction and the LLM call. Per-chunk summaries of long documents are
+    kept alongside, keyed by chunk hash. Stored in SQLite; once the stored
+    text exceeds max_bytes the least recently used entries are evicted.
+    """
+    
+    def __init__(self, db_path: str = "jarvis_file_cache.db", max_bytes: int = 100 * 1024 * 1024):
+        """
+        Initialize file cache
+        
+        Args:
+            db_path: SQLite database file
+            max_bytes: Approximate cap on cached text + summaries
+        """
+        self.max_bytes = max_bytes
+        self.pool = get_connection_pool(db_path)
+        
+        # Metrics
+        self._hits = 0
+        self._text_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        
+        with self.pool.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS file_cache (
+                    sha256 TEXT PRIMARY KEY,
+                    file_type TEXT NOT NULL,
+                    extracted_text TEXT NOT NULL,
+                    max_chars INTEGER,
+                    summary TEXT,
+                    summary_model TEXT,
+                    size_bytes INTEGER NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_file_cache_last_used ON file_cache(last_used)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS chunk_summaries (
+                    chunk_key TEXT PRIMARY KEY,
+                    summary TEXT NOT NULL,
+                    size_bytes INTEGER NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+    
+    def get(self, sha256: str, max_chars: Optional[int] = None, model: Optional[str] = None) -> Optional[Dict]:
+        """
+        Look up a file
+        
+        Args:
+            sha256: Content hash
+            max_chars: Text budget of the caller - text extracted with a smaller budget doesn't count
+            model: Summary model - a summary from another model is not returned
+            
+        Returns:
+            {'file_type', 'extracted_text', 'max_chars', 'summary'} (summary may be None), or None
+        """
+        try:
+            with self.pool.transaction() as conn:
+                row = conn.execute(
+                    "SELECT file_type, extracted_text, max_chars, summary, summary_model FROM file_cache WHERE sha256 = ?",
+                    (sha256,)
+                ).fetchone()
+                
+                # Text extracted under a smaller budget may be missing what this caller needs
+                if row is None or (row['max_chars'] is not None and (max_chars is None or row['max_chars'] < max_chars)):
+                    self._misses += 1
+                    return None
+                
+                conn.execute("UPDATE file_cache SET last_used = ? WHERE sha256 = ?", (time.time(), sha256))
+        except Exception as e:
+            logger.warning(f"File cache lookup failed: {e}")
+            return None
+        
+        summary = row['summary'] if row['summary_model'] == model else None
+        if summary:
+            self._hits += 1
+        else:
+            self._text_hits += 1
+        
+        return {
+            'file_type': row['file_type'],
+            'extracted_text': row['extracted_text'],
+            'max_chars': row['max_chars'],
+            'summary': summary,
+        }
+    
+    def put(self, sha256: str, file_type: str, extracted_text: str, max_chars: Optional[int] = None,
+            summary: Optional[str] = None, model: Optional[str] = None):
+        """
+        Store (or update) a file's extracted text and summary, evicting LRU entries past max_bytes
+        
+        Args:
+            sha256: Content hash
+            file_type: 'pdf' or 'image'
+            extracted_text: Extracted text
+            max_chars: Budget the text was extracted with (None = full text)
+            summary: Generated summary, if any
+            model: Model that generated the summary
+        """
+        size = len(extracted_text.encode("utf-8")) + len((summary or "").encode("utf-8"))
+        try:
+            with self.pool.transaction() as conn:
+                conn.execute(
+                    """INSERT OR REPLACE INTO file_cache
+                       (sha256, file_type, extracted_text, max_chars, summary, summary_model, size_bytes, last_used)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (sha256, file_type, extracted_text, max_chars, summary, model, size, time.time())
+                )
+                self._evict(conn)
+        except Exception as e:
+            logger.warning(f"File cache store failed: {e}")
+    
+    def get_chunk_summaries(self, chunk_keys: List[str]) -> Dict[str, str]:
+        """
+        Look up cached chunk summaries
+        
+        Args:
+            chunk_keys: Chunk cache keys
+            
+        Returns:
+            Dict of chunk_key -> summary for the keys found
+        """
+        if not chunk_keys:
+            return {}
+        try:
+            with self.pool.transaction() as conn:
+                found = {}
+                # Stay well under SQLite's bound-parameter limit
+                for start in range(0, len(chunk_keys), 500):
+                    batch = chunk_keys[start:start + 500]
+                    placeholders = ",".join("?" * len(batch))
+                    for row in conn.execute(
+                        f"SELECT chunk_key, summary FROM chunk_summaries WHERE chunk_key IN ({placeholders})", batch
+                    ):
+                        found[row['chunk_key']] = row['summary']
+                conn.executemany(
+                    "UPDATE chunk_summaries SET last_used = ? WHERE chunk_key = ?",
+                    [(time.time(), key) for key in found]
+                )
+                return found
+        except Exception as e:
+            logger.warning(f"Chunk summary lookup failed: {e}")
+            return {}
+    
+    def put_chunk_summaries(self, summaries: Dict[str, str]):
+        """
+        Store chunk summaries, evicting LRU entries past max_bytes
+        
+        Args:
+            summaries: Dict of chunk_key -> summary
+        """
+        now = time.time()
+        try:
+            with self.pool.transaction() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO chunk_summaries (chunk_key, summary, size_bytes, last_used) VALUES (?, ?, ?, ?)",
+                    [(key, summary, len(summary.encode("utf-8")), now) for key, summary in summaries.items()]
+                )
+                self._evict(conn)
+        except Exception as e:
+            logger.warning(f"Chunk summary store failed: {e}")
+    
+    def _evict(self, conn):
+        """Drop least recently used files and chunk summaries until under max_bytes (transaction held)"""
+        total = conn.execute(
+            "SELECT (SELECT COALESCE(SUM(size_bytes), 0) FROM file_cache) + (SELECT COALESCE(SUM(size_bytes), 0) FROM chunk_summaries)"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        
+        # Walk from least recently used, collecting rows until enough is freed
+        evict = {'file_cache': [], 'chunk_summaries': []}
+        rows = conn.execute("""
+            SELECT 'file_cache' AS tbl, sha256 AS key, size_bytes, last_used FROM file_cache
+            UNION ALL
+            SELECT 'chunk_summaries', chunk_key, size_bytes, last_used FROM chunk_summaries
+            ORDER BY last_used
+        """)
+        for row in rows:
+            if total <= self.max_bytes:
+                break
+            evict[row['tbl']].append((row['key'],))
+            total -= row['size_bytes']
+        conn.executemany("DELETE FROM file_cache WHERE sha256 = ?", evict['file_cache'])
+        conn.executemany("DELETE FROM chunk_summaries WHERE chunk_key = ?", evict['chunk_summaries'])
+        self._evictions += len(evict['file_cache']) + len(evict['chunk_summaries'])
+    
+    def get_stats(self) -> Dict:
+        """Get cache metrics"""
+        try:
+            with self.pool.connection() as conn:
+                entries, stored = conn.execute("SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM file_cache").fetchone()
+                chunks, chunk_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM chunk_summaries").fetchone()
+        except Exception:
+            entries, stored, chunks, chunk_bytes = 0, 0, 0, 0
+        
+        lookups = self._hits + self._text_hits + self._misses
+        return {
+            'entries': entries,
+            'chunk_summaries': chunks,
+            'bytes': stored + chunk_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self._hits,
+            'text_only_hits': self._text_hits,
+            'misses': self._misses,
+            'evictions': self._evictions,
+            'hit_rate': round(self._hits / lookups, 3) if lookups else 0.0,
+        }
+
+# Global file cache instance
+_file_cache = None
+
+def get_file_cache() -> FileCache:
+    """Get or create global file cache instance"""
+    global _file_cache
+    if _file_cache is None:
+        _file_cache = FileCache(
+            db_path=os.getenv("FILE_CACHE_DB", "jarvis_file_cache.db"),
+            max_bytes=int(os.getenv("FILE_CACHE_MAX_MB", "100")) * 1024 * 1024
+        )
+    return _file_cache
+
 # Global analyzer instance
 analyzer = None
 
@@ -1,17 +1,30 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Request, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from openai import OpenAI
+from openai import AsyncOpenAI
+from contextlib import asynccontextmanager
+import asyncio
+import httpx
 import os
+import time
 import json
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Tuple, AsyncIterator
 import logging
 from dotenv import load_dotenv
-from memory import get_memory
+from memory import get_memory, MemoryWriteQueue, PAST_CONTEXT_HEADER, DOCUMENT_PASSAGES_HEADER
 from security import redact_secrets
-from file_analyzer import get_analyzer
+from file_analyzer import (
+    get_analyzer, get_file_cache, shutdown_process_pool, AnalyzerBusyError
+)
 from tool_manager import get_tool_manager
 from post_processing import SuggestionManager, HumorFilter
+from response_cache import get_response_cache
+from document_summarizer import DocumentSummarizer
+from prompt_builder import get_prompt_builder
+from session_store import get_session_store, SessionStore
+from uploads import UploadSizeLimitMiddleware, receive_upload, discard_upload
 
 # Load environment variables from .env file
 load_dotenv()
@@ -20,11 +33,29 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup/shutdown hooks"""
+    if memory_writer:
+        memory_writer.start()
+    # tiktoken may download its encoding on first load - do it off the request path
+    prompt_builder.tokenizer.load_in_background()
+    yield
+    # Durably flush queued conversation turns before exiting
+    if memory_writer:
+        await memory_writer.stop()
+    # Release pooled provider and tool connections
+    await llm_http_client.aclose()
+    if tools:
+        await tools.aclose()
+    shutdown_process_pool()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="J.A.R.V.I.S Server",
     description="Backend API for J.A.R.V.I.S voice assistant",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS for Flutter app
@@ -33,11 +64,21 @@ app = FastAPI(
 cors_origins = os.getenv("CORS_ORIGINS", "http://localhost,http://localhost:8080,http://127.0.0.1,http://127.0.0.1:8080")
 allowed_origins = [origin.strip() for origin in cors_origins.split(",") if origin.strip()]
 
+# Upload limits - uploads up to UPLOAD_SPOOL_KB stay in memory, larger ones are
+# spooled to a temp file that extraction memory-maps
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", "25")) * 1024 * 1024
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_KB", "1024")) * 1024
+
+# Registered before CORS so it runs inside it (the last middleware added is
+# outermost) and browser clients can read its 413s. Allows some headroom for
+# multipart framing.
+app.add_middleware(UploadSizeLimitMiddleware, path="/analyze_file", max_bytes=MAX_UPLOAD_BYTES + 64 * 1024)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
     allow_credentials=True,
-    allow_methods=["GET", "POST", "OPTIONS"],
+    allow_methods=["GET", "POST", "DELETE", "OPTIONS"],
     allow_headers=["Content-Type", "Authorization", "X-Requested-With"],
 )
 
@@ -46,28 +87,61 @@ openai_api_key = os.getenv("OPENAI_API_KEY", "")
 base_url = os.getenv("OPENAI_BASE_URL", "")
 use_local = os.getenv("USE_LOCAL_MODEL", "false").lower() == "true"
 
+# Concurrency limits for provider calls (per worker process)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "32"))
+
+# Shared, pooled HTTP client - keeps provider connections alive across requests
+llm_http_client = httpx.AsyncClient(
+    limits=httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_CONNECTIONS
+    ),
+    timeout=httpx.Timeout(60.0, connect=10.0)
+)
+
+# Caps in-flight LLM calls so a burst of requests can't overwhelm the provider
+llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+# Per-stage timeouts (seconds) for the concurrent pre-LLM stages
+TOOL_STAGE_TIMEOUT = float(os.getenv("TOOL_STAGE_TIMEOUT", "8"))
+CONTEXT_STAGE_TIMEOUT = float(os.getenv("CONTEXT_STAGE_TIMEOUT", "2"))
+
 if use_local:
     local_url = base_url or "http://localhost:1234/v1"
     logger.info(f"Using LOCAL model at {local_url}")
-    client = OpenAI(api_key="local", base_url=local_url)
+    client = AsyncOpenAI(api_key="local", base_url=local_url, http_client=llm_http_client)
 elif openai_api_key:
     if base_url:
         logger.info(f"Using API at {base_url}")
     else:
         logger.info("Using OpenAI API")
-    client = OpenAI(api_key=openai_api_key, base_url=base_url if base_url else None)
+    client = AsyncOpenAI(
+        api_key=openai_api_key,
+        base_url=base_url if base_url else None,
+        http_client=llm_http_client
+    )
 else:
     logger.warning("No API configuration found")
     client = None
 
 # Initialize memory system
 try:
-    memory = get_memory()
+    # SQLite is ready immediately; the embedding model / ChromaDB warm up in the background
+    memory = get_memory(background_init=True)
     logger.info("Memory system initialized")
 except Exception as e:
     logger.error(f"Failed to initialize memory: {e}")
     memory = None
 
+# Initialize session store (server-side conversation history per client session)
+try:
+    sessions = get_session_store()
+    logger.info("Session store initialized")
+except Exception as e:
+    logger.error(f"Failed to initialize session store: {e}")
+    sessions = None
+
 # Initialize tool manager
 try:
     tools = get_tool_manager()
@@ -76,9 +150,47 @@ except Exception as e:
     logger.error(f"Failed to initialize tool manager: {e}")
     tools = None
 
+def _embed_for_cache(texts: List[str]):
+    """Embeddings for near-duplicate matching, or None while the model is warming up"""
+    if memory and memory.is_semantic_ready() and memory.embeddings:
+        return memory.embed(texts)
+    return None
+
+# Initialize response cache (repeated / near-duplicate questions skip the LLM)
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+response_cache = get_response_cache(embed_fn=_embed_for_cache) if RESPONSE_CACHE_ENABLED else None
+
+# Prompt assembly - memory, tool output and history are fitted to a token budget
+prompt_builder = get_prompt_builder()
+
+# Ask for token usage at the end of streams (cached-token metrics); turn off for
+# OpenAI-compatible servers that reject stream_options
+LLM_STREAM_USAGE = os.getenv("LLM_STREAM_USAGE", "true").lower() == "true"
+
+def _record_llm_usage(usage, first_token_seconds: float):
+    """Log and record provider token usage, including prompt tokens served from the provider's cache"""
+    counts = prompt_builder.record_usage(usage, first_token_seconds)
+    if counts:
+        logger.info(
+            f"LLM usage: {counts['prompt_tokens']} prompt tokens ({counts['cached_tokens']} cached), "
+            f"first token after {first_token_seconds * 1000:.0f}ms"
+        )
+
+# Suggestions: "deferred" computes them when first fetched after the reply, "inline" appends
+# them before returning (extra LLM round trip), "off" disables them
+SUGGESTION_MODE = os.getenv("SUGGESTION_MODE", "deferred").lower()
+if SUGGESTION_MODE not in ("deferred", "inline", "off"):
+    logger.warning(f"Unknown SUGGESTION_MODE '{SUGGESTION_MODE}' - using deferred")
+    SUGGESTION_MODE = "deferred"
+
 # Initialize post-processing
 try:
-    suggestion_manager = SuggestionManager(client)
+    suggestion_manager = SuggestionManager(
+        client,
+        limiter=llm_semaphore,
+        budget=float(os.getenv("SUGGESTION_BUDGET", "3")) or None,
+        db_path=os.getenv("SUGGESTION_DB", "jarvis_suggestions.db")
+    )
     humor_filter = HumorFilter(chance=0.2)
     logger.info("Post-processing modules initialized")
 except Exception as e:
@@ -90,22 +202,26 @@ except Exception as e:
 class AskRequest(BaseModel):
     user_input: str
     conversation_history: Optional[list] = None
+    session_id: Optional[str] = None  # Server keeps the history - replaces conversation_history
     
     class Config:
         json_schema_extra = {
             "example": {
                 "user_input": "What's the weather like today?",
-                "conversation_history": []
+                "session_id": "9b1f0c2e7d4a4b8e9f3a6c5d2e1b0a97"
             }
         }
 
 class AskResponse(BaseModel):
     response: str
+    suggestion_id: Optional[str] = None  # Poll /suggestion/{id} for the deferred tip
+    session_id: Optional[str] = None
     
     class Config:
         json_schema_extra = {
             "example": {
-                "response": "I'm J.A.R.V.I.S, your personal assistant. How may I help you?"
+                "response": "I'm J.A.R.V.I.S, your personal assistant. How may I help you?",
+                "suggestion_id": "3f2c9a7e5b6d4e1f8a0b9c8d7e6f5a4b"
             }
         }
 
@@ -137,50 +253,18 @@ Guidelines:
 - When greeted with 'JARVIS', respond warmly and await their request
 - For science, math, history, or any educational questions - provide helpful explanations"""
 
-def _format_tool_result(tool_name: str, result: dict) -> str:
-    """Format tool result for LLM context"""
-    if tool_name == 'web_search':
-        formatted = f"Search query: {result.get('query', 'N/A')}\n"
-        formatted += f"Found {result.get('count', 0)} results:\n\n"
-        for i, item in enumerate(result.get('results', []), 1):
-            formatted += f"{i}. {item['title']}\n"
-            formatted += f"   {item['snippet']}\n"
-            formatted += f"   URL: {item['url']}\n\n"
-        return formatted
-    
-    elif tool_name == 'weather':
-        formatted = f"Weather for {result.get('city', 'Unknown')}, {result.get('country', '')}\n"
-        formatted += f"Temperature: {result.get('temperature', 'N/A')}°C (feels like {result.get('feels_like', 'N/A')}°C)\n"
-        formatted += f"Conditions: {result.get('description', 'N/A')}\n"
-        formatted += f"Humidity: {result.get('humidity', 'N/A')}%\n"
-        formatted += f"Wind speed: {result.get('wind_speed', 'N/A')} m/s\n"
-        if 'note' in result:
-            formatted += f"\nNote: {result['note']}\n"
-        return formatted
-    
-    elif tool_name == 'system_status':
-        formatted = f"System Status Report - {result.get('timestamp', 'N/A')}\n\n"
-        devices = result.get('devices', {})
-        for device_name, device_info in devices.items():
-            formatted += f"{device_name.replace('_', ' ').title()}:\n"
-            for key, value in device_info.items():
-                formatted += f"  {key.replace('_', ' ').title()}: {value}\n"
-            formatted += "\n"
-        formatted += f"Overall: {result.get('overall_status', 'Unknown')}\n"
-        return formatted
-    
-    return str(result)
-
-def _summarize_conversation(memory_system, openai_client):
+PERMISSION_DENIED_RESPONSE = "That permission is disabled, sir."
+
+async def _summarize_conversation(memory_system, openai_client):
     """
     Summarize recent conversation to extract facts and preferences
     """
     try:
         # Get last 20 messages
-        recent = memory_system.get_recent(limit=20)
+        recent = await run_in_threadpool(memory_system.get_recent, limit=20)
         if not recent:
             return
-
+        
         conversation_text = "\n".join([f"{msg['role']}: {msg['content']}" for msg in recent])
         
         prompt = f"""Analyze the following conversation and extract concise facts and user preferences.
@@ -194,22 +278,50 @@ Conversation:
 
 Output a single paragraph summary."""
 
-        response = openai_client.chat.completions.create(
-            model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant summarizing conversations."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=150,
-            temperature=0.5,
-        )
+        async with llm_semaphore:
+            response = await openai_client.chat.completions.create(
+                model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant summarizing conversations."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=150,
+                temperature=0.5,
+            )
         
         summary = response.choices[0].message.content.strip()
-        memory_system.store_summary(summary)
-        
+        await run_in_threadpool(memory_system.store_summary, summary)
+    
     except Exception as e:
         logger.error(f"Error summarizing conversation: {e}")
 
+# Summarize every N stored messages
+SUMMARY_INTERVAL = 20
+
+# Keep references to fire-and-forget jobs so they aren't garbage collected mid-run
+_background_jobs = set()
+
+async def _on_memory_flush(message_ids: List[int]):
+    """Trigger summarization when a flush crosses a multiple of SUMMARY_INTERVAL messages"""
+    if not client:
+        return
+    
+    msg_count = await run_in_threadpool(memory.get_message_count)
+    if msg_count > 0 and msg_count // SUMMARY_INTERVAL > (msg_count - len(message_ids)) // SUMMARY_INTERVAL:
+        logger.info("Triggering conversation summarization...")
+        # Run summarization in background to avoid blocking the flush loop
+        task = asyncio.create_task(_summarize_conversation(memory, client))
+        _background_jobs.add(task)
+        task.add_done_callback(_background_jobs.discard)
+
+# Initialize write-behind persistence
+memory_writer = MemoryWriteQueue(
+    memory,
+    max_batch=int(os.getenv("MEMORY_WRITE_BATCH_SIZE", "32")),
+    flush_interval=float(os.getenv("MEMORY_WRITE_FLUSH_INTERVAL", "1.0")),
+    on_flush=_on_memory_flush
+) if memory else None
+
 def _get_permissions(request: Request) -> Dict[str, bool]:
     """Extract permissions from request headers"""
     try:
@@ -227,20 +339,6 @@ def _get_permissions(request: Request) -> Dict[str, bool]:
             'sensors': True,
         }
 
-def _check_tool_permission(tool_name: str, permissions: Dict[str, bool]) -> bool:
-    """Check if tool is allowed based on permissions"""
-    tool_permission_map = {
-        'web_search': 'web_internet',
-        'weather': 'web_internet',
-        'system_status': 'sensors',
-    }
-    
-    required_permission = tool_permission_map.get(tool_name)
-    if required_permission:
-        return permissions.get(required_permission, True)
-    
-    return True  # Allow if no specific permission required
-
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -253,48 +351,48 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Detailed health check"""
-    memory_stats = memory.get_stats() if memory else {}
+    memory_stats = await run_in_threadpool(memory.get_stats) if memory else {}
+    readiness = memory.get_readiness() if memory else {}
     return {
-        "status": "healthy",
+        # Always 200 - /ask works while warming up, just without semantic recall
+        "status": "starting" if readiness.get('semantic') == 'loading' else "healthy",
         "openai_configured": client is not None,
         "memory_configured": memory is not None,
+        "readiness": readiness,
         "memory_stats": memory_stats,
+        "memory_write_queue": memory_writer.get_stats() if memory_writer else {},
+        "response_cache": response_cache.get_stats() if response_cache else {},
+        "prompt": prompt_builder.get_stats(),
+        "tools": tools.get_stats() if tools else {},
+        "file_cache": file_cache.get_stats() if file_cache else {},
+        "document_summarizer": document_summarizer.get_stats(),
+        "suggestions": dict(suggestion_manager.get_stats(), mode=SUGGESTION_MODE) if suggestion_manager else {},
+        "sessions": await run_in_threadpool(sessions.get_stats) if sessions else {},
         "endpoints": {
             "ask": "/ask",
+            "ask_stream": "/ask/stream",
+            "suggestion": "/suggestion/{suggestion_id}",
             "health": "/health",
             "memory_stats": "/memory/stats",
-            "memory_clear": "/memory/clear"
+            "memory_clear": "/memory/clear",
+            "session": "/session",
+            "session_history": "/session/{session_id}"
         }
     }
 
 @app.post("/memory/clear")
 async def clear_memory():
-    """Clear all memory - removes stored summaries and conversation history"""
+    """Clear all memory - removes stored summaries, conversation history, sessions and indexed documents"""
     try:
         if memory:
-            # Clear SQLite messages
-            import sqlite3
-            conn = sqlite3.connect(memory.db_path)
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM messages")
-            conn.commit()
-            conn.close()
-            
-            # Clear ChromaDB if available
-            if memory.collection is not None:
-                try:
-                    # Delete and recreate collection
-                    memory.chroma_client.delete_collection("jarvis_conversations")
-                    memory.collection = memory.chroma_client.create_collection(
-                        name="jarvis_conversations",
-                        metadata={"description": "J.A.R.V.I.S conversation memory"}
-                    )
-                except Exception as e:
-                    logger.warning(f"Error clearing ChromaDB: {e}")
-            
-            # Clear in-memory fallback
-            if hasattr(memory, '_memory_store'):
-                memory._memory_store = []
+            # Flush queued turns first so they don't reappear after the clear
+            if memory_writer:
+                await memory_writer.flush()
+            await run_in_threadpool(memory.clear_all)
+            if sessions:
+                await run_in_threadpool(sessions.clear_all)
+            if response_cache:
+                response_cache.clear()
             
             logger.info("Memory cleared successfully")
             return {"success": True, "message": "All memory cleared"}
@@ -304,29 +402,293 @@ async def clear_memory():
         logger.error(f"Error clearing memory: {e}")
         return {"success": False, "message": str(e)}
 
+async def _run_tools(user_input: str, permissions: Dict[str, bool]) -> Tuple[str, bool, bool]:
+    """
+    Run every tool matching the input concurrently before the LLM call
+    
+    Args:
+        user_input: User's input text
+        permissions: Permissions parsed from request headers
+    
+    Returns:
+        Tuple of (tool_context, permission_denied, complete) - denied only when
+        every matching tool is disabled by permissions; complete is False when
+        any matching tool failed or was denied
+    """
+    tool_context = ""
+    
+    if not tools:
+        return tool_context, False, True
+    
+    complete = True
+    try:
+        results, denied_tools = await tools.run_tools(user_input, permissions)
+        
+        if denied_tools:
+            complete = False
+            logger.info(f"Tools {denied_tools} denied by permissions")
+            if not results:
+                return tool_context, True, False
+        
+        # Merge results into the system prompt in rank order
+        for tool_name, tool_result in results:
+            if tool_result and tool_result.get('success'):
+                tool_context += f"\n\nTOOL RESULT ({tool_name}):\n"
+                tool_context += tools.format_result(tool_name, tool_result)
+                logger.info(f"Tool executed successfully: {tool_name}")
+            else:
+                complete = False
+        
+        # Tell the model what it couldn't look up, so it doesn't guess
+        for tool_name in denied_tools:
+            tool_context += f"\n\nTOOL UNAVAILABLE ({tool_name}): disabled in the user's permissions."
+    except Exception as e:
+        logger.warning(f"Tool execution error: {e}")
+        complete = False
+    
+    return tool_context, False, complete
+
+async def _load_context(user_input: str, history: Optional[list] = None) -> str:
+    """
+    Load recent + semantically relevant conversation context from memory
+    
+    Messages already in the conversation history are left out, so the same
+    turn isn't sent to the model twice.
+    """
+    if not memory:
+        return ""
+    
+    exclude = {msg['content'] for msg in history or [] if isinstance(msg, dict) and isinstance(msg.get('content'), str)}
+    context = await run_in_threadpool(
+        memory.get_conversation_context,
+        user_input=user_input,
+        recent_limit=10,
+        semantic_limit=3,
+        exclude=exclude
+    )
+    if context:
+        logger.debug(f"Loaded context: {len(context)} chars")
+    return context
+
+async def _load_summaries() -> List[str]:
+    """Load user facts/preferences from stored summaries"""
+    if not memory:
+        return []
+    return await run_in_threadpool(memory.get_summaries, limit=3)
+
+async def _run_stage(name: str, coro, timeout: float, default):
+    """
+    Await a pre-LLM stage with a timeout
+    
+    A slow or failing stage falls back to its default, so it degrades context
+    quality instead of blocking the response.
+    """
+    start = time.perf_counter()
+    try:
+        result = await asyncio.wait_for(coro, timeout=timeout)
+        logger.debug(f"Stage {name} finished in {(time.perf_counter() - start) * 1000:.0f}ms")
+        return result
+    except asyncio.TimeoutError:
+        logger.warning(f"Stage {name} timed out after {timeout}s - continuing without it")
+    except Exception as e:
+        logger.warning(f"Stage {name} failed: {e}")
+    return default
+
+async def _prepare_request(ask_request: AskRequest,
+                           permissions: Dict[str, bool]) -> Tuple[List[Dict], str, bool, bool]:
+    """
+    Run tool execution, context loading and summary loading concurrently, then build messages
+    
+    Args:
+        ask_request: Incoming request
+        permissions: Permissions parsed from request headers
+    
+    Returns:
+        Tuple of (messages, memory context string, tool_permission_denied, replayable) -
+        replayable is False when the answer will depend on the user's own memory
+        (facts, recalled conversations or documents) or on a tool run that failed,
+        so it must not be served to later questions from the response cache
+    """
+    (tool_context, denied, tools_complete), context, summaries = await asyncio.gather(
+        _run_stage("tools", _run_tools(ask_request.user_input, permissions), TOOL_STAGE_TIMEOUT, ("", False, False)),
+        _run_stage("context", _load_context(ask_request.user_input, ask_request.conversation_history),
+                   CONTEXT_STAGE_TIMEOUT, ""),
+        _run_stage("summaries", _load_summaries(), CONTEXT_STAGE_TIMEOUT, []),
+    )
+    
+    if denied:
+        return [], "", True, False
+    
+    personal = bool(summaries) or PAST_CONTEXT_HEADER in context or DOCUMENT_PASSAGES_HEADER in context
+    replayable = tools_complete and not personal
+    return _build_messages(ask_request, tool_context, context, summaries), context, False, replayable
+
+def _build_messages(ask_request: AskRequest, tool_context: str, context: str, summaries: List[str]) -> List[Dict]:
+    """
+    Build LLM messages from persona, memory context and tool results
+    
+    Sections are fitted to the prompt token budget - see PromptBuilder.
+    
+    Args:
+        ask_request: Incoming request
+        tool_context: Formatted tool output (may be empty)
+        context: Conversation context from memory (may be empty)
+        summaries: User facts/preferences summaries
+    
+    Returns:
+        Messages for the chat completion call
+    """
+    messages, report = prompt_builder.build(
+        JARVIS_SYSTEM_PROMPT,
+        ask_request.user_input,
+        tool_context=tool_context,
+        context=context,
+        summaries=summaries,
+        history=ask_request.conversation_history
+    )
+    
+    trimmed = f", trimmed {', '.join(report['trimmed'])}" if report['trimmed'] else ""
+    logger.info(
+        f"Prompt {report['total']}/{report['max_tokens']} tokens (system {report['system']}, "
+        f"summaries {report['summaries']}, context {report['context']}, tools {report['tools']}, "
+        f"history {report['history']}, input {report['user_input']}{trimmed})"
+    )
+    return messages
+
+def _extract_response_text(response) -> str:
+    """Extract assistant text from a chat completion (or non-standard) response"""
+    if hasattr(response, 'choices'):
+        return response.choices[0].message.content
+    
+    # Handle non-standard response (e.g. direct string or dict)
+    logger.warning("Standard OpenAI response structure not found")
+    if isinstance(response, str):
+        return response
+    elif isinstance(response, dict) and 'choices' in response:
+        return response['choices'][0]['message']['content']
+    return str(response)
+
+async def _post_process(ai_response: str, ask_request: AskRequest, context: str) -> Tuple[str, Optional[str]]:
+    """
+    Apply post-processing (Humor & Suggestions) BEFORE redaction
+    
+    Returns:
+        Tuple of (processed response, suggestion_id) - suggestion_id is only set
+        in deferred mode, where the tip is generated after the reply goes out
+    """
+    processed_response = ai_response
+    suggestion_id = None
+    
+    if humor_filter:
+        processed_response = humor_filter.apply(processed_response)
+    
+    if suggestion_manager and SUGGESTION_MODE != "off":
+        # Get recent messages for context
+        recent_msgs = []
+        if ask_request.conversation_history:
+            recent_msgs.extend(ask_request.conversation_history)
+        recent_msgs.append({"role": "user", "content": ask_request.user_input})
+        recent_msgs.append({"role": "assistant", "content": processed_response})
+        
+        if SUGGESTION_MODE == "deferred":
+            suggestion_id = await run_in_threadpool(suggestion_manager.defer, recent_msgs, context)
+        else:
+            processed_response = await suggestion_manager.apply(processed_response, recent_msgs, context)
+    
+    return processed_response, suggestion_id
+
+def _save_turn(user_input: str, processed_response: str):
+    """
+    Queue conversation turn for write-behind persistence (store the processed but unredacted version)
+    
+    The reply goes back to the user immediately; storage and embedding happen on the next flush.
+    """
+    if not memory_writer:
+        return
+    
+    memory_writer.enqueue("user", user_input)
+    memory_writer.enqueue("assistant", processed_response)
+
+async def _resolve_session(ask_request: AskRequest):
+    """
+    Load the session's stored history into the request
+    
+    Clients that send a session_id get their conversation_history from the
+    server. A well-formed id the server doesn't know yet starts a new session,
+    so clients can mint their own ids without an extra round trip.
+    """
+    if not ask_request.session_id:
+        return
+    if not sessions:
+        raise HTTPException(status_code=503, detail="Session store unavailable")
+    if not SessionStore.is_valid_id(ask_request.session_id):
+        raise HTTPException(status_code=400, detail="Invalid session_id")
+    
+    if ask_request.conversation_history:
+        logger.debug("Ignoring conversation_history - session history is used instead")
+    ask_request.conversation_history = await run_in_threadpool(sessions.get_history, ask_request.session_id)
+
+async def _save_session_turn(ask_request: AskRequest, processed_response: str):
+    """Append the turn to the request's session (processed but unredacted, like memory)"""
+    if not ask_request.session_id or not sessions:
+        return
+    
+    await run_in_threadpool(sessions.append, ask_request.session_id, [
+        {"role": "user", "content": ask_request.user_input},
+        {"role": "assistant", "content": processed_response},
+    ])
+
+def _cache_category(ask_request: AskRequest, permissions: Dict[str, bool]) -> Tuple[bool, Optional[str]]:
+    """
+    Decide whether a request may use the response cache
+    
+    Only standalone questions are cached - with conversation_history the answer
+    depends on the preceding turns. Requests whose tool is denied go through the
+    normal path so they still get the permission response. Live-data,
+    time-sensitive and personal questions are filtered (and counted) by the
+    cache itself.
+    
+    Returns:
+        Tuple of (use_cache, tool category or None)
+    """
+    if not response_cache or ask_request.conversation_history:
+        return False, None
+    
+    selected = tools.select_tools(ask_request.user_input) if tools else []
+    if any(not tools.is_allowed(name, permissions) for name in selected):
+        return False, None
+    
+    # With several tools, the shortest-lived result decides how long the answer may be cached
+    category = min(selected, key=response_cache.ttl_for) if selected else None
+    return True, category
+
+def _validate_ask_request(ask_request: AskRequest):
+    """Reject empty input and unconfigured providers before doing any work"""
+    if not ask_request.user_input or not ask_request.user_input.strip():
+        raise HTTPException(status_code=400, detail="user_input cannot be empty")
+    
+    # Check if OpenAI is configured
+    if not client:
+        raise HTTPException(
+            status_code=503,
+            detail="OpenAI API key not configured. Please set OPENAI_API_KEY environment variable."
+        )
+
 @app.post("/ask", response_model=AskResponse)
-async def ask_jarvis(request: Request, ask_request: AskRequest, background_tasks: BackgroundTasks):
+async def ask_jarvis(request: Request, ask_request: AskRequest):
     """
     Process user input and return AI-generated response
     
     Args:
         request: FastAPI request object (for headers)
-        ask_request: AskRequest containing user_input and optional conversation_history
-        
+        ask_request: AskRequest containing user_input and optional session_id or conversation_history
+    
     Returns:
         AskResponse with the AI-generated response
     """
     try:
-        # Validate input
-        if not ask_request.user_input or not ask_request.user_input.strip():
-            raise HTTPException(status_code=400, detail="user_input cannot be empty")
-        
-        # Check if OpenAI is configured
-        if not client:
-            raise HTTPException(
-                status_code=503,
-                detail="OpenAI API key not configured. Please set OPENAI_API_KEY environment variable."
-            )
+        _validate_ask_request(ask_request)
+        await _resolve_session(ask_request)
         
         logger.info(f"Processing request: {ask_request.user_input[:50]}...")
         
@@ -334,136 +696,63 @@ async def ask_jarvis(request: Request, ask_request: AskRequest, background_tasks
         permissions = _get_permissions(request)
         logger.debug(f"Permissions: {permissions}")
         
-        # Detect intent and execute tools pre-LLM
-        tool_result = None
-        tool_context = ""
-        
-        if tools:
-            try:
-                detected_tool = tools.detect_intent(ask_request.user_input)
-                
-                if detected_tool:
-                    # Check permission before executing tool
-                    if not _check_tool_permission(detected_tool, permissions):
-                        logger.info(f"Tool {detected_tool} denied by permissions")
-                        return AskResponse(response="That permission is disabled, sir.")
-                    
-                    logger.info(f"Executing tool: {detected_tool}")
-                    tool_result = tools.execute_tool(detected_tool, ask_request.user_input)
-                    
-                    if tool_result and tool_result.get('success'):
-                        # Format tool result for context
-                        tool_context = f"\n\nTOOL RESULT ({detected_tool}):\n"
-                        tool_context += f"{_format_tool_result(detected_tool, tool_result)}"
-                        logger.info(f"Tool executed successfully: {detected_tool}")
-            except Exception as e:
-                logger.warning(f"Tool execution error: {e}")
-        
-        # Load context from memory
-        context = ""
-        if memory:
-            try:
-                context = memory.get_conversation_context(
-                    user_input=ask_request.user_input,
-                    recent_limit=10,
-                    semantic_limit=3
+        # Repeated questions are answered from the cache without tools or an LLM call
+        use_cache, cache_category = _cache_category(ask_request, permissions)
+        if use_cache:
+            cached_response = await run_in_threadpool(response_cache.lookup, ask_request.user_input, cache_category)
+            if cached_response:
+                processed_response, suggestion_id = await _post_process(cached_response, ask_request, "")
+                _save_turn(ask_request.user_input, processed_response)
+                await _save_session_turn(ask_request, processed_response)
+                return AskResponse(
+                    response=redact_secrets(processed_response),
+                    suggestion_id=suggestion_id,
+                    session_id=ask_request.session_id
                 )
-                if context:
-                    logger.debug(f"Loaded context: {len(context)} chars")
-            except Exception as e:
-                logger.warning(f"Error loading context: {e}")
-        
-        # Build conversation messages with context and tool results
-        system_prompt = JARVIS_SYSTEM_PROMPT
-        
-        # Add user facts/preferences from summaries
-        if memory:
-            summaries = memory.get_summaries(limit=3)
-            if summaries:
-                system_prompt += "\n\nUSER FACTS & PREFERENCES:\n" + "\n".join([f"- {s}" for s in summaries])
         
-        if context:
-            system_prompt += f"\n\nCONVERSATION CONTEXT:\n{context}"
-        if tool_context:
-            system_prompt += tool_context
+        start_time = time.perf_counter()
         
-        messages = [
-            {"role": "system", "content": system_prompt}
-        ]
-        
-        # Add conversation history if provided
-        if ask_request.conversation_history:
-            messages.extend(ask_request.conversation_history)
-        
-        # Add current user input
-        messages.append({"role": "user", "content": ask_request.user_input})
+        # Tools, memory context and summaries run concurrently pre-LLM
+        messages, context, denied, replayable = await _prepare_request(ask_request, permissions)
+        if denied:
+            return AskResponse(response=PERMISSION_DENIED_RESPONSE, session_id=ask_request.session_id)
         
         # Call OpenAI API (or compatible provider)
         model_name = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
         
         try:
-            response = client.chat.completions.create(
-                model=model_name,
-                messages=messages,
-                max_tokens=500,
-                temperature=0.7,
-                top_p=0.9,
-            )
+            async with llm_semaphore:
+                call_start = time.perf_counter()
+                response = await client.chat.completions.create(
+                    model=model_name,
+                    messages=messages,
+                    max_tokens=500,
+                    temperature=0.7,
+                    top_p=0.9,
+                )
+                _record_llm_usage(getattr(response, 'usage', None), time.perf_counter() - call_start)
             logger.info(f"Raw response type: {type(response)}")
             # logger.info(f"Raw response: {response}") # Uncomment if needed
         except Exception as e:
             logger.error(f"API Call Error: {e}")
             raise
-
+        
         # Extract response
-        if hasattr(response, 'choices'):
-            ai_response = response.choices[0].message.content
-        else:
-            # Handle non-standard response (e.g. direct string or dict)
-            logger.warning("Standard OpenAI response structure not found")
-            if isinstance(response, str):
-                ai_response = response
-            elif isinstance(response, dict) and 'choices' in response:
-                ai_response = response['choices'][0]['message']['content']
-            else:
-                ai_response = str(response)
+        ai_response = _extract_response_text(response)
         
         logger.info(f"Generated response: {ai_response[:50]}...")
         
-        # Apply post-processing (Humor & Suggestions) BEFORE redaction
-        processed_response = ai_response
+        if use_cache and replayable:
+            # Cache the raw reply - humor and suggestions are re-applied on each hit
+            await run_in_threadpool(
+                response_cache.store, ask_request.user_input, cache_category,
+                ai_response, time.perf_counter() - start_time
+            )
         
-        if humor_filter:
-            processed_response = humor_filter.apply(processed_response)
-            
-        if suggestion_manager:
-            # Get recent messages for context
-            recent_msgs = []
-            if ask_request.conversation_history:
-                recent_msgs.extend(ask_request.conversation_history)
-            recent_msgs.append({"role": "user", "content": ask_request.user_input})
-            recent_msgs.append({"role": "assistant", "content": processed_response})
-            
-            processed_response = suggestion_manager.apply(processed_response, recent_msgs, context)
+        processed_response, suggestion_id = await _post_process(ai_response, ask_request, context)
         
-        # Save conversation to memory (store the processed but unredacted version)
-        if memory:
-            try:
-                memory.store_message("user", ask_request.user_input)
-                memory.store_message("assistant", processed_response)
-                logger.debug("Conversation saved to memory")
-                
-                # Check if summarization is needed (every 20 messages)
-                # We check after adding 2 new messages
-                msg_count = memory.get_message_count()
-                if msg_count > 0 and msg_count % 20 == 0:
-                    logger.info("Triggering conversation summarization...")
-                    logger.info("Triggering conversation summarization...")
-                    # Run summarization in background to avoid blocking response
-                    background_tasks.add_task(_summarize_conversation, memory, client)
-                    
-            except Exception as e:
-                logger.warning(f"Error saving to memory: {e}")
+        _save_turn(ask_request.user_input, processed_response)
+        await _save_session_turn(ask_request, processed_response)
         
         # Apply security redaction as the FINAL step
         final_response = redact_secrets(processed_response)
@@ -472,20 +761,209 @@ async def ask_jarvis(request: Request, ask_request: AskRequest, background_tasks
         if final_response != processed_response:
             logger.warning("Response was redacted due to banned terms")
         
-        return AskResponse(response=final_response)
-        
+        return AskResponse(response=final_response, suggestion_id=suggestion_id, session_id=ask_request.session_id)
+    
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error processing request: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+def _sse_event(payload: Dict) -> str:
+    """Encode a payload as a single server-sent event frame"""
+    return f"data: {json.dumps(payload)}\n\n"
+
+async def _stream_response(ask_request: AskRequest, messages: List[Dict], context: str) -> AsyncIterator[str]:
+    """
+    Relay LLM deltas as SSE frames, then post-process and persist the full reply
+    
+    Event types:
+        token:      {"type": "token", "content": "<delta>"}
+        done:       {"type": "done", "response": "<final response>", "suggestion_id": "<id or null>",
+                     "session_id": "<id or null>"}
+        suggestion: {"type": "suggestion", "content": "<tip>"}  (deferred mode, after done)
+        error:      {"type": "error", "detail": "<message>"}
+    """
+    model_name = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    chunks = []
+    
+    try:
+        # Hold the concurrency slot for the whole stream - the provider is busy until it ends
+        async with llm_semaphore:
+            call_start = time.perf_counter()
+            first_token_seconds = None
+            usage = None
+            stream = await client.chat.completions.create(
+                model=model_name,
+                messages=messages,
+                max_tokens=500,
+                temperature=0.7,
+                top_p=0.9,
+                stream=True,
+                **({"stream_options": {"include_usage": True}} if LLM_STREAM_USAGE else {}),
+            )
+            
+            async for chunk in stream:
+                # With include_usage the final chunk carries usage and no choices
+                if getattr(chunk, 'usage', None):
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if first_token_seconds is None:
+                        first_token_seconds = time.perf_counter() - call_start
+                    chunks.append(delta)
+                    yield _sse_event({"type": "token", "content": delta})
+            
+            _record_llm_usage(usage, first_token_seconds if first_token_seconds is not None else time.perf_counter() - call_start)
+    except Exception as e:
+        logger.error(f"Streaming API error: {e}")
+        yield _sse_event({"type": "error", "detail": f"Internal server error: {str(e)}"})
+        return
+    
+    ai_response = "".join(chunks)
+    logger.info(f"Streamed response: {ai_response[:50]}...")
+    
+    processed_response, suggestion_id = await _post_process(ai_response, ask_request, context)
+    
+    # Humor lines and tips are appended after the model finishes - send them as a trailing token
+    if processed_response.startswith(ai_response) and len(processed_response) > len(ai_response):
+        yield _sse_event({"type": "token", "content": processed_response[len(ai_response):]})
+    
+    _save_turn(ask_request.user_input, processed_response)
+    await _save_session_turn(ask_request, processed_response)
+    
+    # Apply security redaction as the FINAL step
+    final_response = redact_secrets(processed_response)
+    if final_response != processed_response:
+        logger.warning("Response was redacted due to banned terms")
+    
+    yield _sse_event({
+        "type": "done", "response": final_response,
+        "suggestion_id": suggestion_id, "session_id": ask_request.session_id
+    })
+    
+    # Deferred tip arrives as a trailer once ready (bounded by SUGGESTION_BUDGET)
+    if suggestion_id:
+        suggestion = await suggestion_manager.wait_deferred(suggestion_id)
+        if suggestion:
+            yield _sse_event({"type": "suggestion", "content": redact_secrets(suggestion)})
+
 @app.post("/ask/stream")
-async def ask_jarvis_stream(request: AskRequest):
+async def ask_jarvis_stream(request: Request, ask_request: AskRequest):
     """
-    Stream AI response (for future implementation)
+    Stream AI response as server-sent events
+    
+    Runs the same tool, memory and post-processing stages as /ask, but relays
+    LLM tokens as they arrive. The full response is persisted once the stream closes.
+    
+    Args:
+        request: FastAPI request object (for headers)
+        ask_request: AskRequest containing user_input and optional session_id or conversation_history
+    
+    Returns:
+        StreamingResponse with text/event-stream frames
     """
-    raise HTTPException(status_code=501, detail="Streaming not yet implemented")
+    try:
+        _validate_ask_request(ask_request)
+        await _resolve_session(ask_request)
+        
+        logger.info(f"Processing streaming request: {ask_request.user_input[:50]}...")
+        
+        permissions = _get_permissions(request)
+        
+        messages, context, denied, _ = await _prepare_request(ask_request, permissions)
+        if denied:
+            frames = iter([
+                _sse_event({"type": "token", "content": PERMISSION_DENIED_RESPONSE}),
+                _sse_event({
+                    "type": "done", "response": PERMISSION_DENIED_RESPONSE,
+                    "suggestion_id": None, "session_id": ask_request.session_id
+                }),
+            ])
+        else:
+            frames = _stream_response(ask_request, messages, context)
+        
+        return StreamingResponse(
+            frames,
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error processing streaming request: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@app.get("/suggestion/{suggestion_id}")
+async def get_suggestion(suggestion_id: str):
+    """
+    Get the next-step suggestion for an earlier /ask reply
+    
+    The suggestion is generated on the first request for it (waiting at most
+    SUGGESTION_BUDGET seconds), so replies whose tip is never fetched cost no LLM call.
+    
+    Returns:
+        {"status": "ready" | "none", "suggestion": str | null}
+    """
+    if not suggestion_manager:
+        raise HTTPException(status_code=503, detail="Suggestions not initialized")
+    
+    slot = await run_in_threadpool(suggestion_manager.get_deferred, suggestion_id)
+    if slot is None:
+        raise HTTPException(status_code=404, detail="Suggestion not found or expired")
+    
+    if slot["status"] == "pending":
+        await suggestion_manager.wait_deferred(suggestion_id)
+        slot = await run_in_threadpool(suggestion_manager.get_deferred, suggestion_id) or {"status": "none", "suggestion": None}
+    
+    if slot["suggestion"]:
+        slot["suggestion"] = redact_secrets(slot["suggestion"])
+    return slot
+
+def _require_sessions() -> SessionStore:
+    if not sessions:
+        raise HTTPException(status_code=503, detail="Session store not initialized")
+    return sessions
+
+@app.post("/session")
+async def create_session():
+    """
+    Start a conversation session
+    
+    Send the returned session_id with /ask instead of conversation_history.
+    
+    Returns:
+        {"session_id": str}
+    """
+    store = _require_sessions()
+    session_id = await run_in_threadpool(store.create)
+    return {"session_id": session_id}
+
+@app.get("/session/{session_id}")
+async def get_session(session_id: str):
+    """
+    Get the stored conversation of a session (newest SESSION_MAX_MESSAGES messages)
+    """
+    store = _require_sessions()
+    if not await run_in_threadpool(store.exists, session_id):
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    
+    history = await run_in_threadpool(store.get_history, session_id)
+    return {
+        "session_id": session_id,
+        "messages": [dict(msg, content=redact_secrets(msg["content"])) for msg in history]
+    }
+
+@app.delete("/session/{session_id}")
+async def delete_session(session_id: str):
+    """End a session and delete its history (long-term memory is kept)"""
+    store = _require_sessions()
+    if not await run_in_threadpool(store.delete, session_id):
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return {"status": "deleted", "session_id": session_id}
 
 @app.get("/memory/stats")
 async def memory_stats():
@@ -496,7 +974,7 @@ async def memory_stats():
         raise HTTPException(status_code=503, detail="Memory system not initialized")
     
     try:
-        stats = memory.get_stats()
+        stats = await run_in_threadpool(memory.get_stats)
         return stats
     except Exception as e:
         logger.error(f"Error getting memory stats: {e}")
@@ -511,51 +989,118 @@ async def get_recent_messages(limit: int = 10):
         raise HTTPException(status_code=503, detail="Memory system not initialized")
     
     try:
-        messages = memory.get_recent(limit=limit)
+        messages = await run_in_threadpool(memory.get_recent, limit=limit)
         return {"messages": messages}
     except Exception as e:
         logger.error(f"Error getting recent messages: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Characters of a document summarized - extraction stops once reached
+FILE_TEXT_BUDGET = int(os.getenv("FILE_TEXT_BUDGET", "100000"))
+
+# Repeat uploads (same bytes) reuse the extracted text and summary
+try:
+    file_cache = get_file_cache()
+except Exception as e:
+    logger.error(f"Failed to initialize file cache: {e}")
+    file_cache = None
+
+# Long documents are summarized chunk by chunk (map-reduce); chunk summaries
+# are cached in the file cache so edited re-uploads only redo changed chunks
+document_summarizer = DocumentSummarizer(
+    client,
+    limiter=llm_semaphore,
+    cache=file_cache,
+    chunk_tokens=int(os.getenv("SUMMARY_CHUNK_TOKENS", "1500")),
+    max_concurrency=int(os.getenv("SUMMARY_CONCURRENCY", "4")),
+    fan_in=int(os.getenv("SUMMARY_FAN_IN", "8"))
+)
+
+def _document_indexed(passages: int):
+    """Cached answers predate a newly indexed document"""
+    if response_cache:
+        response_cache.clear()
+
+async def _index_document(file_hash: str, filename: str, file_type: str, text: str):
+    """Add an analyzed document's passages to memory (no-op if already indexed)"""
+    try:
+        await run_in_threadpool(memory.store_document, file_hash, filename, file_type, text, _document_indexed)
+    except Exception as e:
+        logger.warning(f"Document indexing failed for {filename}: {e}")
+
+def _schedule_document_indexing(file_hash: str, filename: str, file_type: str, text: str):
+    """Make a document searchable from /ask - indexed in the background, off the request path"""
+    if not memory or text.startswith("No text could be extracted"):
+        return
+    task = asyncio.create_task(_index_document(file_hash, filename, file_type, text))
+    _background_jobs.add(task)
+    task.add_done_callback(_background_jobs.discard)
+
 @app.post("/analyze_file", response_model=AnalyzeFileResponse)
-async def analyze_file(request: Request, file: UploadFile = File(...)):
+async def analyze_file(request: Request):
     """
     Analyze uploaded file (PDF or Image) and return summary
     
     Args:
-        request: FastAPI request object (for headers)
-        file: Uploaded file (PDF or image)
-        
+        request: FastAPI request object - headers, and a multipart body
+            whose 'file' field holds the PDF or image
+    
     Returns:
         AnalyzeFileResponse with summary and file info
     """
+    upload_source = None
     try:
         # Check permissions
         permissions = _get_permissions(request)
         if not permissions.get('files_media', True):
             logger.info("File analysis denied by permissions")
             raise HTTPException(status_code=403, detail="Permission disabled: Files/Media")
-
+        
+        # Stream the upload (type/size checked as it arrives) - large files go to disk, not the heap
+        upload = await receive_upload(request, MAX_UPLOAD_BYTES, UPLOAD_SPOOL_BYTES)
+        upload_source, file_hash = await run_in_threadpool(upload.finish)
+        filename = upload.filename
+        
         # Validate file
-        if not file.filename:
+        if not filename:
             raise HTTPException(status_code=400, detail="No filename provided")
         
-        logger.info(f"Analyzing file: {file.filename}")
+        logger.info(f"Analyzing file: {filename}")
         
-        # Read file content
-        file_content = await file.read()
+        model_name = document_summarizer.model
+        cached = await run_in_threadpool(file_cache.get, file_hash, FILE_TEXT_BUDGET, model_name) if file_cache else None
         
-        if not file_content:
-            raise HTTPException(status_code=400, detail="Empty file")
-        
-        # Analyze file and extract text
-        analyzer = get_analyzer()
-        analysis_result = analyzer.analyze_file(file.filename, file_content)
+        if cached and cached['summary'] and client:
+            logger.info(f"File cache hit for {filename} ({file_hash[:12]})")
+            _schedule_document_indexing(file_hash, filename, cached['file_type'], cached['extracted_text'])
+            return AnalyzeFileResponse(
+                summary=cached['summary'],
+                file_type=cached['file_type'],
+                filename=filename
+            )
         
-        extracted_text = analysis_result['extracted_text']
-        file_type = analysis_result['file_type']
+        if cached:
+            extracted_text = cached['extracted_text']
+            file_type = cached['file_type']
+            text_budget = cached['max_chars']
+        else:
+            # Analyze file and extract text
+            analyzer = get_analyzer()
+            analysis_result = await run_in_threadpool(
+                analyzer.analyze_file, filename, upload_source, max_chars=FILE_TEXT_BUDGET
+            )
+            
+            extracted_text = analysis_result['extracted_text']
+            file_type = analysis_result['file_type']
+            
+            # Text shorter than the budget (and OCR output) is complete - valid for any budget
+            text_budget = FILE_TEXT_BUDGET if file_type == 'pdf' and len(extracted_text) >= FILE_TEXT_BUDGET else None
+            
+            logger.info(f"Extracted {len(extracted_text)} characters from {file_type}")
+            if file_cache:
+                await run_in_threadpool(file_cache.put, file_hash, file_type, extracted_text, text_budget)
         
-        logger.info(f"Extracted {len(extracted_text)} characters from {file_type}")
+        _schedule_document_indexing(file_hash, filename, file_type, extracted_text)
         
         # Check if OpenAI is configured
         if not client:
@@ -563,39 +1108,35 @@ async def analyze_file(request: Request, file: UploadFile = File(...)):
             return AnalyzeFileResponse(
                 summary=f"Extracted text (OpenAI not configured):\n\n{extracted_text[:500]}...",
                 file_type=file_type,
-                filename=file.filename
+                filename=filename
             )
         
-        # Generate summary using LLM
-        summary_prompt = f"""Analyze and summarize the following {file_type} content concisely. 
-Provide key points and main ideas in 2-3 sentences.
-
-Content:
-{extracted_text[:4000]}"""  # Limit to 4000 chars to avoid token limits
-        
-        response = client.chat.completions.create(
-            model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-            messages=[
-                {"role": "system", "content": "You are J.A.R.V.I.S, analyzing documents for the user. Be concise and professional."},
-                {"role": "user", "content": summary_prompt}
-            ],
-            max_tokens=300,
-            temperature=0.5,
-        )
-        
-        summary = response.choices[0].message.content
+        # Generate summary using LLM - chunked and merged when the document is long
+        summary = await document_summarizer.summarize(extracted_text[:FILE_TEXT_BUDGET], file_type)
         
         # Apply security redaction
         summary = redact_secrets(summary)
         
-        logger.info(f"Generated summary for {file.filename}")
+        if file_cache:
+            await run_in_threadpool(
+                file_cache.put, file_hash, file_type, extracted_text, text_budget, summary, model_name
+            )
+        
+        logger.info(f"Generated summary for {filename}")
         
         return AnalyzeFileResponse(
             summary=summary,
             file_type=file_type,
-            filename=file.filename
+            filename=filename
+        )
+    
+    except AnalyzerBusyError:
+        logger.warning("OCR queue full - rejecting file analysis")
+        raise HTTPException(
+            status_code=429,
+            detail="J.A.R.V.I.S is busy analyzing other images. Please try again shortly.",
+            headers={"Retry-After": "5"}
         )
-        
     except ValueError as e:
         # File analysis errors (unsupported format, extraction failed)
         logger.error(f"File analysis error: {e}")
@@ -605,13 +1146,13 @@ Content:
     except Exception as e:
         logger.error(f"Error analyzing file: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    finally:
+        discard_upload(upload_source)
 
 
 # ===== ELEVENLABS TTS PROXY =====
 # Securely proxies TTS requests to ElevenLabs, keeping API key on server
 
-import httpx
-
 # ElevenLabs configuration
 ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY", "")
 ELEVENLABS_DEFAULT_VOICE = os.getenv("ELEVENLABS_DEFAULT_VOICE", "pNInz6obpgDQGcFmaJgB")  # Adam voice
@@ -695,7 +1236,7 @@ async def speak_text(request: SpeakRequest):
             else:
                 logger.error(f"ElevenLabs error: {response.status_code}")
                 raise HTTPException(status_code=502, detail="TTS service error")
-                
+    
     except httpx.TimeoutException:
         raise HTTPException(status_code=504, detail="TTS service timeout")
     except Exception as e:
@@ -1,69 +1,553 @@
 """
 J.A.R.V.I.S Memory System
-Combines SQLite for conversation storage and ChromaDB for semantic recall
+Combines SQLite for conversation storage and ChromaDB for semantic recall,
+plus a vector index of uploaded documents
 """
 
 import sqlite3
-from datetime import datetime
-from typing import List, Dict, Optional
+import hashlib
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+import asyncio
+from datetime import datetime, timezone
+from typing import List, Dict, Optional, Callable, Awaitable, Set
+import importlib.util
 import logging
 import os
+import numpy as np
+from vector_index import VectorIndex, HashingEmbedder
+from document_summarizer import split_into_chunks
 
-# Optional imports with fallbacks
-try:
-    from sentence_transformers import SentenceTransformer
-    SENTENCE_TRANSFORMERS_AVAILABLE = True
-except ImportError:
-    SENTENCE_TRANSFORMERS_AVAILABLE = False
+# Optional dependencies - only probed here, imported when the semantic backend loads
+# (importing sentence-transformers pulls in torch and takes seconds)
+SENTENCE_TRANSFORMERS_AVAILABLE = importlib.util.find_spec("sentence_transformers") is not None
+
+# Context sections recalled from long-term memory (as opposed to the last few turns)
+PAST_CONTEXT_HEADER = "RELEVANT PAST CONTEXT:"
+DOCUMENT_PASSAGES_HEADER = "RELEVANT DOCUMENT PASSAGES:"
+
+# Explicit references to an upload ("the pdf", "my uploaded file") - with hashed (lexical)
+# embeddings, passages are only recalled for these or for questions naming an indexed file.
+# Bare nouns like "report" or "agreement" are too common in unrelated questions to count.
+DOCUMENT_REFERENCE_PATTERN = re.compile(
+    r"\b(the|this|that|these|those|my|our)\s+((uploaded|attached|scanned)\s+)?"
+    r"(documents?|docs?|files?|pdfs?|uploads?|attachments?|scans?)\b",
+    re.IGNORECASE
+)
 
 logger = logging.getLogger(__name__)
 
+# Applied to every pooled connection
+SQLITE_PRAGMAS = [
+    "PRAGMA journal_mode=WAL",        # Readers don't block the writer
+    "PRAGMA synchronous=NORMAL",      # Safe with WAL, avoids an fsync per commit
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",       # ~16MB page cache per connection
+    "PRAGMA mmap_size=134217728",     # 128MB memory-mapped reads
+    "PRAGMA busy_timeout=5000",
+]
+
+class SQLiteConnectionPool:
+    """
+    Thread-safe pool of persistent SQLite connections
+    
+    Connections are opened lazily up to max_connections and reused, so each
+    keeps its page cache and prepared statement cache warm across requests.
+    """
+    
+    def __init__(self, db_path: str, max_connections: int = 8, timeout: float = 10.0):
+        """
+        Initialize connection pool
+        
+        Args:
+            db_path: Path to SQLite database
+            max_connections: Maximum number of open connections
+            timeout: Seconds to wait for a free connection (and for SQLite locks)
+        """
+        self.db_path = db_path
+        self.max_connections = max_connections
+        self.timeout = timeout
+        
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        
+        # Metrics
+        self._created = 0
+        self._in_use = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_seconds = 0.0
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a new connection with tuned pragmas"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            check_same_thread=False,  # Pool hands connections across threadpool workers
+            cached_statements=256     # Prepared statements are reused per connection
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in SQLITE_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+    
+    def _acquire(self) -> sqlite3.Connection:
+        """Check out an idle connection, opening or waiting for one if needed"""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.max_connections
+                if can_create:
+                    self._created += 1
+            
+            if can_create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                start = time.perf_counter()
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise sqlite3.OperationalError("SQLite connection pool exhausted")
+                with self._lock:
+                    self._waits += 1
+                    self._wait_seconds += time.perf_counter() - start
+        
+        with self._lock:
+            self._checkouts += 1
+            self._in_use += 1
+        return conn
+    
+    def _release(self, conn: sqlite3.Connection):
+        """Return a connection to the pool"""
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            self._in_use -= 1
+        self._idle.put(conn)
+    
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for reads (or manually committed writes)"""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+    
+    @contextmanager
+    def transaction(self, immediate: bool = False):
+        """
+        Borrow a connection and commit on success, roll back on error
+        
+        Args:
+            immediate: Take the write lock up front (BEGIN IMMEDIATE), so reads at the
+                start of the transaction can't go stale before its first write
+        """
+        with self.connection() as conn:
+            with conn:
+                if immediate:
+                    conn.execute("BEGIN IMMEDIATE")
+                yield conn
+    
+    def get_stats(self) -> Dict:
+        """Get pool metrics"""
+        with self._lock:
+            return {
+                'max_connections': self.max_connections,
+                'open_connections': self._created,
+                'in_use': self._in_use,
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'avg_wait_ms': round(self._wait_seconds * 1000 / self._waits, 2) if self._waits else 0.0
+            }
+    
+    def close(self):
+        """Close all idle connections"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+# Pools shared by every component that opens the same database file
+_pools: Dict[str, SQLiteConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+def get_connection_pool(db_path: str) -> SQLiteConnectionPool:
+    """Get or create the shared connection pool for a database file"""
+    key = os.path.abspath(db_path)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = SQLiteConnectionPool(
+                db_path,
+                max_connections=int(os.getenv("MEMORY_DB_POOL_SIZE", "8"))
+            )
+        return _pools[key]
+
+class EmbeddingService:
+    """
+    Shared text embedder with an LRU + on-disk cache
+    
+    Texts are keyed by a hash of their normalized form (case, whitespace and
+    trailing punctuation folded), so repeated utterances like "Hey JARVIS"
+    cost a cache lookup instead of a model forward pass. Misses from one call
+    are encoded together in a single batch.
+    """
+    
+    def __init__(self, encoder, model_name: str, pool: SQLiteConnectionPool,
+                 max_memory_entries: int = 4096, max_disk_entries: int = 200000):
+        """
+        Initialize embedding service
+        
+        Args:
+            encoder: Object with encode(texts, normalize_embeddings=True)
+                (SentenceTransformer or HashingEmbedder)
+            model_name: Model identifier, part of the cache key
+            pool: Connection pool for the on-disk cache table
+            max_memory_entries: LRU capacity
+            max_disk_entries: Approximate cap on cached rows in SQLite
+        """
+        self.encoder = encoder
+        self.model_name = model_name
+        self.pool = pool
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inserts_since_trim = 0
+        
+        # Metrics
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._batches = 0
+        
+        with self.pool.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS embedding_cache (
+                    key TEXT PRIMARY KEY,
+                    vector BLOB NOT NULL
+                )
+            """)
+    
+    def _key(self, text: str) -> str:
+        """Hash of model name + normalized text"""
+        normalized = re.sub(r"\s+", " ", text.lower()).strip().rstrip("?!. ")
+        return hashlib.sha256(f"{self.model_name}\0{normalized}".encode("utf-8")).hexdigest()
+    
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts as normalized float32 vectors
+        
+        Args:
+            texts: Texts to embed
+        
+        Returns:
+            Array of shape (len(texts), dim)
+        """
+        keys = [self._key(text) for text in texts]
+        found: Dict[str, np.ndarray] = {}
+        
+        # 1. In-process LRU
+        with self._lock:
+            for key in keys:
+                if key in self._lru and key not in found:
+                    self._lru.move_to_end(key)
+                    found[key] = self._lru[key]
+                    self._memory_hits += 1
+        
+        # 2. On-disk cache, one query for all LRU misses
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        if missing:
+            try:
+                with self.pool.connection() as conn:
+                    placeholders = ",".join("?" * len(missing))
+                    rows = conn.execute(
+                        f"SELECT key, vector FROM embedding_cache WHERE key IN ({placeholders})",
+                        missing
+                    ).fetchall()
+            except Exception as e:
+                # The cache only saves work - encode everything rather than fail recall
+                logger.warning(f"Error reading embedding cache: {e}")
+                rows = []
+            for row in rows:
+                found[row['key']] = np.frombuffer(row['vector'], dtype=np.float32)
+            self._disk_hits += len(rows)
+        
+        # 3. Batch-encode whatever is left
+        to_encode = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in to_encode:
+                to_encode[key] = text
+        
+        if to_encode:
+            vectors = np.asarray(
+                self.encoder.encode(list(to_encode.values()), normalize_embeddings=True),
+                dtype=np.float32
+            )
+            self._misses += len(to_encode)
+            self._batches += 1
+            new_entries = dict(zip(to_encode.keys(), vectors))
+            found.update(new_entries)
+            self._persist(new_entries)
+        
+        with self._lock:
+            for key in missing:
+                self._lru[key] = found[key]
+            while len(self._lru) > self.max_memory_entries:
+                self._lru.popitem(last=False)
+        
+        return np.stack([found[key] for key in keys]) if keys else np.zeros((0, 0), dtype=np.float32)
+    
+    def _persist(self, entries: Dict[str, np.ndarray]):
+        """Write new embeddings to disk, trimming the oldest rows now and then"""
+        try:
+            with self.pool.transaction() as conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO embedding_cache (key, vector) VALUES (?, ?)",
+                    [(key, vector.tobytes()) for key, vector in entries.items()]
+                )
+                self._inserts_since_trim += len(entries)
+                if self._inserts_since_trim >= 1024:
+                    self._inserts_since_trim = 0
+                    # rowid grows with insertion order - drop everything below the newest max_disk_entries
+                    conn.execute(
+                        "DELETE FROM embedding_cache WHERE rowid <= (SELECT MAX(rowid) FROM embedding_cache) - ?",
+                        (self.max_disk_entries,)
+                    )
+        except Exception as e:
+            logger.warning(f"Error persisting embeddings: {e}")
+    
+    def get_stats(self) -> Dict:
+        """Get cache metrics"""
+        lookups = self._memory_hits + self._disk_hits + self._misses
+        return {
+            'model': self.model_name,
+            'memory_entries': len(self._lru),
+            'memory_hits': self._memory_hits,
+            'disk_hits': self._disk_hits,
+            'misses': self._misses,
+            'encode_batches': self._batches,
+            'hit_rate': round((self._memory_hits + self._disk_hits) / lookups, 3) if lookups else 0.0
+        }
+
 class JarvisMemory:
     """
     Memory system for J.A.R.V.I.S with SQLite storage and semantic search
     """
     
-    def __init__(self, db_path: str = "jarvis_memory.db", chroma_path: str = "./chroma_db"):
+    def __init__(self, db_path: str = "jarvis_memory.db", chroma_path: str = "./chroma_db",
+                 index_path: str = "./vector_index", document_index_path: str = "./document_index",
+                 background_init: bool = False):
         """
         Initialize memory system
         
         Args:
             db_path: Path to SQLite database
             chroma_path: Path to ChromaDB storage
+            index_path: Path to embedded vector index (used when ChromaDB is unavailable)
+            document_index_path: Path to the vector index of uploaded document passages
+            background_init: Load the semantic backend (ChromaDB / embedding model) in a
+                background thread instead of blocking the constructor
         """
         self.db_path = db_path
         self.chroma_path = chroma_path
+        self.index_path = index_path
+        self.document_index_path = document_index_path
+        self.vector_index = None
+        self.document_index = None
+        self.document_recall_lexical = False  # Documents use hashed embeddings
+        self.embeddings: Optional[EmbeddingService] = None
+        self.document_embeddings: Optional[EmbeddingService] = None
+        self.chroma_client = None
+        self.collection = None
+        self.encoder = None
+        
+        # Semantic backend readiness: loading -> ready | failed
+        self.semantic_status = "loading"
+        
+        # Semantic writes made while the backend loads; the warm-up thread runs
+        # them in order once it finishes (None afterwards - writes run inline)
+        self._semantic_lock = threading.Lock()
+        self._deferred_semantic: Optional[List[Callable[[], None]]] = []
+        
+        # Bounds for the fallback stores
+        self.max_summaries = int(os.getenv("MEMORY_MAX_SUMMARIES", "100"))
+        self.max_vectors = int(os.getenv("MEMORY_MAX_VECTORS", "50000"))
+        self.max_document_vectors = int(os.getenv("MEMORY_MAX_DOCUMENT_VECTORS", "100000"))
+        
+        # Document passages: size when indexed, and how similar one must be to enter the context
+        self.passage_tokens = int(os.getenv("DOCUMENT_PASSAGE_TOKENS", "200"))
+        self.document_min_score = float(os.getenv("DOCUMENT_MIN_SCORE", "0.15"))
+        self.pool = get_connection_pool(db_path)
         
         # Initialize SQLite
         self._init_sqlite()
         
-        # Initialize ChromaDB
-        self._init_chroma()
+        # Initialize ChromaDB (or the embedded index) - the slow part of startup
+        if background_init:
+            threading.Thread(target=self._init_semantic, name="memory-warmup", daemon=True).start()
+        else:
+            self._init_semantic()
         
         logger.info("J.A.R.V.I.S Memory System initialized")
     
+    def _init_semantic(self):
+        """Load the semantic recall backend and record readiness"""
+        start = time.perf_counter()
+        try:
+            self._init_chroma()
+            self._init_document_index()
+            self.semantic_status = "ready"
+            logger.info(f"Semantic memory ready in {time.perf_counter() - start:.1f}s")
+        except Exception as e:
+            self.semantic_status = "failed"
+            logger.error(f"Semantic memory failed to load: {e}")
+        finally:
+            self._run_deferred_semantic()
+    
+    def _run_deferred_semantic(self):
+        """Run the semantic writes queued during warm-up, including any queued meanwhile"""
+        while True:
+            with self._semantic_lock:
+                if not self._deferred_semantic:
+                    self._deferred_semantic = None
+                    return
+                jobs, self._deferred_semantic = self._deferred_semantic, []
+            
+            if jobs:
+                logger.info(f"Running {len(jobs)} semantic writes deferred during warm-up")
+            for job in jobs:
+                try:
+                    job()
+                except Exception as e:
+                    logger.warning(f"Deferred semantic write failed: {e}")
+    
+    def _after_semantic_load(self, job: Callable[[], None]):
+        """
+        Run a semantic write now, or after warm-up if the backend is still loading
+        
+        Callers never wait on model loading - SQLite writes are already committed
+        by the time a job is queued.
+        """
+        with self._semantic_lock:
+            if self._deferred_semantic is not None:
+                self._deferred_semantic.append(job)
+                return
+        job()
+    
+    def is_semantic_ready(self) -> bool:
+        """Whether semantic recall is available"""
+        return self.semantic_status == "ready"
+    
+    def get_readiness(self) -> Dict:
+        """Readiness of each memory component"""
+        if self.collection is not None:
+            backend = "chromadb"
+        elif self.vector_index is not None:
+            backend = "vector_index"
+        else:
+            backend = None
+        return {
+            'sqlite': 'ready',
+            'semantic': self.semantic_status,
+            'semantic_backend': backend
+        }
+    
     def _init_sqlite(self):
         """Initialize SQLite database with messages table"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS messages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                role TEXT NOT NULL,
-                content TEXT NOT NULL,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Create index on timestamp for faster recent queries
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_timestamp 
-            ON messages(timestamp DESC)
-        """)
-        
-        conn.commit()
-        conn.close()
+        # One locked transaction: workers starting together must not both see the
+        # stats table missing and run the backfill twice
+        with self.pool.transaction(immediate=True) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # Create index on timestamp for faster recent queries
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_timestamp 
+                ON messages(timestamp DESC)
+            """)
+            
+            # Per-role message counters kept up to date by triggers,
+            # so counts never need a full-table COUNT(*)
+            stats_exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'message_stats'"
+            ).fetchone()
+            
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS message_stats (
+                    role TEXT PRIMARY KEY,
+                    count INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS trg_messages_insert AFTER INSERT ON messages
+                BEGIN
+                    INSERT INTO message_stats (role, count) VALUES (NEW.role, 1)
+                    ON CONFLICT(role) DO UPDATE SET count = count + 1;
+                END
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS trg_messages_delete AFTER DELETE ON messages
+                BEGIN
+                    UPDATE message_stats SET count = count - 1 WHERE role = OLD.role;
+                END
+            """)
+            
+            if not stats_exists:
+                # One-time backfill for databases created before the counters existed
+                conn.execute("""
+                    INSERT INTO message_stats (role, count)
+                    SELECT role, COUNT(*) FROM messages GROUP BY role
+                """)
+            
+            # Summaries and other typed records for the fallback path (no ChromaDB)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS memory_records (
+                    id TEXT PRIMARY KEY,
+                    type TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    timestamp TEXT NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_records_type_timestamp
+                ON memory_records(type, timestamp DESC)
+            """)
+            
+            # Uploaded documents whose passages are in the document index.
+            # Re-uploading a file under the same name supersedes the older version.
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    id TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    file_type TEXT NOT NULL,
+                    passages INTEGER NOT NULL,
+                    superseded INTEGER NOT NULL DEFAULT 0,
+                    added_at TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_filename ON documents(filename)")
         
         logger.info(f"SQLite database initialized at {self.db_path}")
     
@@ -89,29 +573,88 @@ class JarvisMemory:
                 metadata={"description": "J.A.R.V.I.S conversation memory"}
             )
             
-            # Initialize sentence transformer for embeddings if available
+            # Initialize sentence transformer for embeddings if available.
+            # Same model as Chroma's default embedding function, so cached
+            # vectors are interchangeable with ones Chroma computed itself.
             if SENTENCE_TRANSFORMERS_AVAILABLE:
+                from sentence_transformers import SentenceTransformer
                 self.encoder = SentenceTransformer('all-MiniLM-L6-v2')
+                self.embeddings = EmbeddingService(self.encoder, 'all-MiniLM-L6-v2', self.pool)
             else:
                 self.encoder = None
             
             logger.info(f"ChromaDB initialized at {self.chroma_path}")
-            
+        
         except ImportError:
-            logger.warning("ChromaDB not available - using in-memory fallback")
-            # Simple in-memory fallback
+            logger.warning("ChromaDB not available - using embedded vector index")
             self.chroma_client = None
             self.collection = None
-            self.encoder = None
-            self._memory_store = []  # Simple list for testing
-            
+            self._init_vector_index()
+        
         except Exception as e:
             logger.error(f"Error initializing ChromaDB: {e}")
-            # Fallback to in-memory
+            # Fallback to embedded index
             self.chroma_client = None
             self.collection = None
-            self.encoder = None
-            self._memory_store = []
+            self._init_vector_index()
+    
+    def _init_vector_index(self):
+        """Initialize embedded NumPy vector index for semantic recall without ChromaDB"""
+        if SENTENCE_TRANSFORMERS_AVAILABLE:
+            from sentence_transformers import SentenceTransformer
+            model_name = 'all-MiniLM-L6-v2'
+            self.encoder = SentenceTransformer(model_name)
+            dim = self.encoder.get_sentence_embedding_dimension()
+        else:
+            # No model available - hashed lexical features still beat substring matching
+            self.encoder = HashingEmbedder()
+            model_name = HashingEmbedder.name
+            dim = self.encoder.dim
+        
+        self.embeddings = EmbeddingService(self.encoder, model_name, self.pool)
+        self.vector_index = VectorIndex(
+            self.index_path,
+            dim=dim,
+            embedder_name=model_name,
+            max_vectors=self.max_vectors
+        )
+    
+    def _init_document_index(self):
+        """
+        Initialize the document passage index
+        
+        Always an embedded index, separate from conversation recall so message
+        compaction never drops document passages. Uses the conversation
+        embedder when it is a real model; hashed features only score
+        content terms, since passages sharing just function words with a
+        question are noise.
+        """
+        if self.embeddings is not None and not isinstance(self.encoder, HashingEmbedder):
+            self.document_embeddings = self.embeddings
+            dim = self.encoder.get_sentence_embedding_dimension()
+            self.document_recall_lexical = False
+        else:
+            encoder = HashingEmbedder(content_terms_only=True)
+            self.document_embeddings = EmbeddingService(encoder, encoder.name, self.pool)
+            dim = encoder.dim
+            self.document_recall_lexical = True
+        
+        self.document_index = VectorIndex(
+            self.document_index_path,
+            dim=dim,
+            embedder_name=self.document_embeddings.model_name,
+            max_vectors=self.max_document_vectors
+        )
+        
+        # A new or rebuilt (e.g. embedder changed) index holds no passages -
+        # forget indexed documents so uploading them again re-indexes them
+        if self.document_index.count() == 0:
+            with self.pool.transaction() as conn:
+                conn.execute("DELETE FROM documents")
+    
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed texts as normalized float32 vectors (through the embedding cache)"""
+        return self.embeddings.embed(texts)
     
     def store_message(self, role: str, text: str) -> int:
         """
@@ -120,89 +663,119 @@ class JarvisMemory:
         Args:
             role: Message role ('user' or 'assistant')
             text: Message content
-            
+        
         Returns:
             Message ID from SQLite
         """
+        return self.store_messages([{"role": role, "content": text}])[0]
+    
+    def store_messages(self, messages: List[Dict]) -> List[int]:
+        """
+        Store a batch of messages with one SQLite transaction and one ChromaDB add
+        
+        Args:
+            messages: Dicts with 'role', 'content' and optional 'created_at'
+                (timezone-aware datetime, defaults to now)
+        
+        Returns:
+            Message IDs from SQLite, in input order
+        """
         try:
-            # Store in SQLite
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            now = datetime.now(timezone.utc)
+            message_ids = []
             
-            cursor.execute(
-                "INSERT INTO messages (role, content) VALUES (?, ?)",
-                (role, text)
-            )
-            
-            message_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
+            # Store in SQLite
+            with self.pool.transaction() as conn:
+                for msg in messages:
+                    created_at = msg.get("created_at") or now
+                    cursor = conn.execute(
+                        "INSERT INTO messages (role, content, timestamp) VALUES (?, ?, ?)",
+                        (msg["role"], msg["content"], created_at.strftime("%Y-%m-%d %H:%M:%S"))
+                    )
+                    message_ids.append(cursor.lastrowid)
             
             # Store in ChromaDB for semantic search
             # Only store user messages and assistant responses for context
-            if text.strip() and self.collection is not None:
-                try:
-                    self.collection.add(
-                        documents=[text],
-                        metadatas=[{
-                            "role": role,
-                            "timestamp": datetime.now().isoformat(),
-                            "message_id": message_id
-                        }],
-                        ids=[f"msg_{message_id}"]
-                    )
-                except Exception as e:
-                    logger.warning(f"Error adding to ChromaDB: {e}")
-            elif text.strip() and hasattr(self, '_memory_store'):
-                # Fallback: store in memory
-                self._memory_store.append({
-                    "id": message_id,
-                    "role": role,
-                    "content": text,
-                    "timestamp": datetime.now().isoformat()
+            documents, metadatas, ids = [], [], []
+            
+            for msg, message_id in zip(messages, message_ids):
+                if not msg["content"].strip():
+                    continue
+                documents.append(msg["content"])
+                metadatas.append({
+                    "role": msg["role"],
+                    "timestamp": (msg.get("created_at") or now).astimezone().replace(tzinfo=None).isoformat(),
+                    "message_id": message_id
                 })
+                ids.append(f"msg_{message_id}")
             
-            logger.debug(f"Stored message {message_id}: {role} - {text[:50]}...")
-            return message_id
+            # Messages flushed during warm-up are indexed once it finishes
+            if documents:
+                self._after_semantic_load(lambda: self._index_messages(documents, metadatas, ids))
             
+            logger.debug(f"Stored {len(message_ids)} messages (ids {message_ids[:1]}..{message_ids[-1:]})")
+            return message_ids
+        
         except Exception as e:
-            logger.error(f"Error storing message: {e}")
+            logger.error(f"Error storing messages: {e}")
             raise
     
+    def _index_messages(self, documents: List[str], metadatas: List[Dict], ids: List[str]):
+        """Add stored messages to ChromaDB (or the embedded vector index)"""
+        if not self.is_semantic_ready():
+            logger.debug("Semantic memory unavailable - messages stored in SQLite only")
+        elif self.collection is not None:
+            try:
+                if self.embeddings is not None:
+                    self.collection.add(
+                        documents=documents,
+                        metadatas=metadatas,
+                        ids=ids,
+                        embeddings=self.embed(documents).tolist()
+                    )
+                else:
+                    self.collection.add(documents=documents, metadatas=metadatas, ids=ids)
+            except Exception as e:
+                logger.warning(f"Error adding to ChromaDB: {e}")
+        elif self.vector_index is not None:
+            # Fallback: embedded vector index (one batched encode + append)
+            try:
+                self.vector_index.add(
+                    self.embed(documents),
+                    [dict(metadata, content=doc) for doc, metadata in zip(documents, metadatas)]
+                )
+            except Exception as e:
+                logger.warning(f"Error adding to vector index: {e}")
+    
     def get_recent(self, limit: int = 10) -> List[Dict]:
         """
         Get recent messages from SQLite
         
         Args:
             limit: Maximum number of messages to retrieve
-            
+        
         Returns:
             List of message dictionaries
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                """
-                SELECT id, role, content, timestamp 
-                FROM messages 
-                ORDER BY timestamp DESC 
-                LIMIT ?
-                """,
-                (limit,)
-            )
-            
-            messages = [dict(row) for row in cursor.fetchall()]
-            conn.close()
+            with self.pool.connection() as conn:
+                cursor = conn.execute(
+                    """
+                    SELECT id, role, content, timestamp 
+                    FROM messages 
+                    ORDER BY timestamp DESC 
+                    LIMIT ?
+                    """,
+                    (limit,)
+                )
+                messages = [dict(row) for row in cursor.fetchall()]
             
             # Reverse to get chronological order
             messages.reverse()
             
             logger.debug(f"Retrieved {len(messages)} recent messages")
             return messages
-            
+        
         except Exception as e:
             logger.error(f"Error retrieving recent messages: {e}")
             return []
@@ -214,34 +787,44 @@ class JarvisMemory:
         Args:
             query: Search query
             n_results: Number of results to return
-            
+        
         Returns:
             List of relevant message dictionaries
         """
         try:
+            if not self.is_semantic_ready():
+                # Degrade gracefully while the model/ChromaDB is still loading
+                logger.debug("Semantic memory not ready - skipping recall")
+                return []
+            
             if self.collection is None:
-                # Fallback: simple text matching
-                if not hasattr(self, '_memory_store'):
+                # Fallback: embedded vector index
+                if self.vector_index is None:
                     return []
-                    
-                query_lower = query.lower()
-                matches = []
-                for msg in self._memory_store:
-                    if query_lower in msg['content'].lower():
-                        matches.append({
-                            'content': msg['content'],
-                            'role': msg['role'],
-                            'timestamp': msg['timestamp'],
-                            'message_id': msg['id'],
-                            'relevance_score': 0.5
-                        })
-                return matches[:n_results]
+                
+                hits = self.vector_index.search(self.embed([query])[0], k=n_results)
+                return [
+                    {
+                        'content': metadata['content'],
+                        'role': metadata.get('role', 'unknown'),
+                        'timestamp': metadata.get('timestamp', ''),
+                        'message_id': metadata.get('message_id', 0),
+                        'relevance_score': score
+                    }
+                    for score, metadata in hits
+                ]
             
             # Query ChromaDB
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=n_results
-            )
+            if self.embeddings is not None:
+                results = self.collection.query(
+                    query_embeddings=self.embed([query]).tolist(),
+                    n_results=n_results
+                )
+            else:
+                results = self.collection.query(
+                    query_texts=[query],
+                    n_results=n_results
+                )
             
             if not results['documents'] or not results['documents'][0]:
                 logger.debug("No semantic matches found")
@@ -263,30 +846,156 @@ class JarvisMemory:
             
             logger.debug(f"Recalled {len(recalled_messages)} semantically relevant messages")
             return recalled_messages
-            
+        
         except Exception as e:
             logger.error(f"Error in semantic recall: {e}")
             return []
     
-    def get_conversation_context(self, user_input: str, recent_limit: int = 10, semantic_limit: int = 3) -> str:
+    def store_document(self, document_id: str, filename: str, file_type: str, text: str,
+                       on_indexed: Optional[Callable[[int], None]] = None):
         """
-        Build conversation context from recent history and semantic recall
+        Split a document into passages and add them to the document index
+        
+        Runs after warm-up when the semantic backend is still loading.
+        
+        Args:
+            document_id: Content hash of the file (already indexed documents are skipped)
+            filename: Original filename - supersedes earlier uploads with the same name
+            file_type: 'pdf' or 'image'
+            text: Extracted text
+            on_indexed: Called with the number of passages added, when any were
+        """
+        self._after_semantic_load(lambda: self._index_document(document_id, filename, file_type, text, on_indexed))
+    
+    def _index_document(self, document_id: str, filename: str, file_type: str, text: str,
+                        on_indexed: Optional[Callable[[int], None]]):
+        """Add a document's passages to the document index (see store_document)"""
+        try:
+            if not self.is_semantic_ready() or self.document_index is None:
+                logger.debug("Semantic memory unavailable - document not indexed")
+                return
+            
+            with self.pool.connection() as conn:
+                if conn.execute("SELECT 1 FROM documents WHERE id = ?", (document_id,)).fetchone():
+                    return
+            
+            passages = split_into_chunks(text, self.passage_tokens)
+            if not passages:
+                return
+            
+            # One batched encode + one append to the index files
+            self.document_index.add(
+                self.document_embeddings.embed(passages),
+                [
+                    {'document_id': document_id, 'filename': filename, 'passage': i, 'content': passage}
+                    for i, passage in enumerate(passages)
+                ]
+            )
+            
+            with self.pool.transaction() as conn:
+                conn.execute(
+                    "UPDATE documents SET superseded = 1 WHERE filename = ? AND id != ?",
+                    (filename, document_id)
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO documents (id, filename, file_type, passages, superseded, added_at) VALUES (?, ?, ?, ?, 0, ?)",
+                    (document_id, filename, file_type, len(passages), datetime.now().isoformat())
+                )
+            
+            logger.info(f"Indexed {len(passages)} passages from {filename}")
+            if on_indexed:
+                on_indexed(len(passages))
+        
+        except Exception as e:
+            logger.error(f"Error indexing document: {e}")
+    
+    def recall_documents(self, query: str, n_results: int = 3) -> List[Dict]:
+        """
+        Find document passages relevant to a query
+        
+        Args:
+            query: Search query
+            n_results: Number of passages to return
+        
+        Returns:
+            List of passage dictionaries (content, filename, relevance_score), best first
+        """
+        try:
+            if not self.is_semantic_ready() or self.document_index is None or self.document_index.count() == 0:
+                return []
+            
+            # Lexical scores can't tell a topic from shared vocabulary ("the weather in London"
+            # vs a contract naming London courts) - only search when the question is about a document
+            if self.document_recall_lexical and not self._refers_to_documents(query):
+                return []
+            
+            # Over-fetch so passages of superseded versions can be dropped
+            hits = self.document_index.search(self.document_embeddings.embed([query])[0], k=n_results * 4)
+            hits = [(score, metadata) for score, metadata in hits if score >= self.document_min_score]
+            if not hits:
+                return []
+            
+            with self.pool.connection() as conn:
+                document_ids = list({metadata['document_id'] for _, metadata in hits})
+                placeholders = ",".join("?" * len(document_ids))
+                current = {
+                    row['id'] for row in conn.execute(
+                        f"SELECT id FROM documents WHERE superseded = 0 AND id IN ({placeholders})", document_ids
+                    )
+                }
+            
+            return [
+                {
+                    'content': metadata['content'],
+                    'filename': metadata.get('filename', ''),
+                    'document_id': metadata['document_id'],
+                    'relevance_score': score
+                }
+                for score, metadata in hits if metadata['document_id'] in current
+            ][:n_results]
+        
+        except Exception as e:
+            logger.error(f"Error in document recall: {e}")
+            return []
+    
+    def _refers_to_documents(self, query: str) -> bool:
+        """Whether a query mentions a document, or a word from the name of an indexed file"""
+        if DOCUMENT_REFERENCE_PATTERN.search(query):
+            return True
+        
+        with self.pool.connection() as conn:
+            filenames = [row['filename'] for row in conn.execute("SELECT filename FROM documents WHERE superseded = 0")]
+        query_words = set(re.findall(r"[a-z0-9]+", query.lower()))
+        for filename in filenames:
+            stem = os.path.splitext(filename.lower())[0]
+            if any(len(word) >= 3 and word in query_words for word in re.findall(r"[a-z0-9]+", stem)):
+                return True
+        return False
+    
+    def get_conversation_context(self, user_input: str, recent_limit: int = 10, semantic_limit: int = 3,
+                                 document_limit: int = 3, exclude: Optional[Set[str]] = None) -> str:
+        """
+        Build conversation context from recent history, semantic recall and uploaded documents
         
         Args:
             user_input: Current user input for semantic search
             recent_limit: Number of recent messages to include
             semantic_limit: Number of semantic matches to include
-            
+            document_limit: Number of document passages to include
+            exclude: Message texts already in the prompt (e.g. session history) - skipped here
+        
         Returns:
             Formatted context string
         """
         context_parts = []
+        exclude = {text.strip() for text in exclude} if exclude else set()
         
         # Get recent conversation
         recent_messages = self.get_recent(limit=recent_limit)
-        if recent_messages:
+        unseen_recent = [msg for msg in recent_messages if msg['content'].strip() not in exclude]
+        if unseen_recent:
             context_parts.append("RECENT CONVERSATION:")
-            for msg in recent_messages[-5:]:  # Last 5 for context
+            for msg in unseen_recent[-5:]:  # Last 5 for context
                 role_label = "User" if msg['role'] == 'user' else "J.A.R.V.I.S"
                 context_parts.append(f"{role_label}: {msg['content']}")
         
@@ -297,17 +1006,57 @@ class JarvisMemory:
             recent_ids = {msg['id'] for msg in recent_messages}
             unique_semantic = [
                 msg for msg in semantic_results 
-                if msg.get('message_id') not in recent_ids
+                if msg.get('message_id') not in recent_ids and msg['content'].strip() not in exclude
             ]
             
             if unique_semantic:
-                context_parts.append("\nRELEVANT PAST CONTEXT:")
+                context_parts.append(f"\n{PAST_CONTEXT_HEADER}")
                 for msg in unique_semantic:
                     role_label = "User" if msg['role'] == 'user' else "J.A.R.V.I.S"
                     context_parts.append(f"{role_label}: {msg['content']}")
         
+        # Passages from documents the user uploaded earlier
+        passages = self.recall_documents(user_input, n_results=document_limit) if document_limit else []
+        if passages:
+            context_parts.append(f"\n{DOCUMENT_PASSAGES_HEADER}")
+            for passage in passages:
+                context_parts.append(f"[{passage['filename']}] {passage['content']}")
+        
         return "\n".join(context_parts) if context_parts else ""
     
+    def clear_all(self):
+        """Remove all stored messages, summaries, documents and embeddings"""
+        with self.pool.transaction() as conn:
+            conn.execute("DELETE FROM messages")
+        
+        # Queued after any writes deferred during warm-up, so those are cleared too
+        self._after_semantic_load(self._clear_semantic)
+    
+    def _clear_semantic(self):
+        """Empty summaries, documents, ChromaDB and the embedded indexes"""
+        # Clear fallback records and the indexed document list
+        with self.pool.transaction() as conn:
+            conn.execute("DELETE FROM memory_records")
+            conn.execute("DELETE FROM documents")
+        
+        # Clear ChromaDB if available
+        if self.collection is not None:
+            try:
+                # Delete and recreate collection
+                self.chroma_client.delete_collection("jarvis_conversations")
+                self.collection = self.chroma_client.create_collection(
+                    name="jarvis_conversations",
+                    metadata={"description": "J.A.R.V.I.S conversation memory"}
+                )
+            except Exception as e:
+                logger.warning(f"Error clearing ChromaDB: {e}")
+        
+        # Clear embedded indexes
+        if self.vector_index is not None:
+            self.vector_index.clear()
+        if self.document_index is not None:
+            self.document_index.clear()
+    
     def clear_old_messages(self, days: int = 30):
         """
         Clear messages older than specified days
@@ -316,66 +1065,73 @@ class JarvisMemory:
             days: Number of days to keep
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                """
-                DELETE FROM messages 
-                WHERE timestamp < datetime('now', '-' || ? || ' days')
-                """,
-                (days,)
-            )
-            
-            deleted_count = cursor.rowcount
-            conn.commit()
-            conn.close()
+            with self.pool.transaction() as conn:
+                cursor = conn.execute(
+                    """
+                    DELETE FROM messages 
+                    WHERE timestamp < datetime('now', '-' || ? || ' days')
+                    """,
+                    (days,)
+                )
+                deleted_count = cursor.rowcount
             
             logger.info(f"Cleared {deleted_count} messages older than {days} days")
-            
+        
         except Exception as e:
             logger.error(f"Error clearing old messages: {e}")
     
     def get_stats(self) -> Dict:
         """Get memory statistics"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.pool.connection() as conn:
+                counts = {
+                    row['role']: row['count']
+                    for row in conn.execute("SELECT role, count FROM message_stats")
+                }
+                documents = conn.execute("SELECT COUNT(*) FROM documents WHERE superseded = 0").fetchone()[0]
             
-            cursor.execute("SELECT COUNT(*) FROM messages")
-            total_messages = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM messages WHERE role = 'user'")
-            user_messages = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM messages WHERE role = 'assistant'")
-            assistant_messages = cursor.fetchone()[0]
-            
-            conn.close()
+            total_messages = sum(counts.values())
+            user_messages = counts.get('user', 0)
+            assistant_messages = counts.get('assistant', 0)
             
-            chroma_count = self.collection.count()
+            if self.collection is not None:
+                chroma_count = self.collection.count()
+            else:
+                chroma_count = self.vector_index.count() if self.vector_index is not None else 0
             
             return {
                 'total_messages': total_messages,
                 'user_messages': user_messages,
                 'assistant_messages': assistant_messages,
-                'vector_embeddings': chroma_count
+                'vector_embeddings': chroma_count,
+                'documents': documents,
+                'document_passages': self.document_index.count() if self.document_index is not None else 0,
+                'embedding_cache': self.embeddings.get_stats() if self.embeddings is not None else {},
+                'connection_pool': self.pool.get_stats()
             }
-            
+        
         except Exception as e:
             logger.error(f"Error getting stats: {e}")
             return {}
-
+    
     def store_summary(self, summary: str):
         """
-        Store a conversation summary in ChromaDB
+        Store a conversation summary in ChromaDB (or SQLite when unavailable)
+        
+        Summaries go to ChromaDB when it's the backend, so while it loads
+        they are stored once warm-up finishes.
         
         Args:
             summary: Concise facts and preferences summary
         """
+        now = datetime.now()
+        self._after_semantic_load(lambda: self._store_summary(summary, now))
+    
+    def _store_summary(self, summary: str, now: datetime):
+        """Write a summary to the active backend (see store_summary)"""
         try:
-            timestamp = datetime.now().isoformat()
-            summary_id = f"summary_{int(datetime.now().timestamp())}"
+            timestamp = now.isoformat()
+            summary_id = f"summary_{int(now.timestamp() * 1000)}"
             
             if self.collection is not None:
                 self.collection.add(
@@ -387,41 +1143,54 @@ class JarvisMemory:
                     ids=[summary_id]
                 )
                 logger.info(f"Stored summary: {summary[:50]}...")
-            elif hasattr(self, '_memory_store'):
-                # Fallback: store in memory
-                self._memory_store.append({
-                    "id": summary_id,
-                    "type": "summary",
-                    "content": summary,
-                    "timestamp": timestamp
-                })
-                logger.info(f"Stored summary (in-memory): {summary[:50]}...")
-            
+            else:
+                # Fallback: persistent records table, bounded to the newest max_summaries
+                with self.pool.transaction() as conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO memory_records (id, type, content, timestamp) VALUES (?, 'summary', ?, ?)",
+                        (summary_id, summary, timestamp)
+                    )
+                    conn.execute(
+                        """
+                        DELETE FROM memory_records
+                        WHERE type = 'summary' AND timestamp < (
+                            SELECT timestamp FROM memory_records
+                            WHERE type = 'summary'
+                            ORDER BY timestamp DESC
+                            LIMIT 1 OFFSET ?
+                        )
+                        """,
+                        (self.max_summaries - 1,)
+                    )
+                logger.info(f"Stored summary (SQLite): {summary[:50]}...")
+        
         except Exception as e:
             logger.error(f"Error storing summary: {e}")
-
+    
     def get_summaries(self, limit: int = 5) -> List[str]:
         """
         Get recent conversation summaries
         
         Args:
             limit: Number of summaries to retrieve
-            
+        
         Returns:
             List of summary strings
         """
         try:
             if self.collection is None:
-                # Fallback: get from memory
-                if not hasattr(self, '_memory_store'):
-                    return []
-                    
-                summaries = [
-                    msg for msg in self._memory_store 
-                    if msg.get('type') == 'summary'
-                ]
-                summaries.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-                return [s['content'] for s in summaries[:limit]]
+                # Fallback: newest summaries straight off the (type, timestamp) index
+                with self.pool.connection() as conn:
+                    rows = conn.execute(
+                        """
+                        SELECT content FROM memory_records
+                        WHERE type = 'summary'
+                        ORDER BY timestamp DESC
+                        LIMIT ?
+                        """,
+                        (limit,)
+                    ).fetchall()
+                return [row['content'] for row in rows]
             
             # Get summaries from ChromaDB
             results = self.collection.get(
@@ -432,7 +1201,7 @@ class JarvisMemory:
             
             if not results['documents']:
                 return []
-                
+            
             # Sort by timestamp descending
             summaries = []
             for i, doc in enumerate(results['documents']):
@@ -444,30 +1213,139 @@ class JarvisMemory:
             
             summaries.sort(key=lambda x: x['timestamp'], reverse=True)
             return [s['content'] for s in summaries]
-            
+        
         except Exception as e:
             logger.error(f"Error retrieving summaries: {e}")
             return []
-
+    
     def get_message_count(self) -> int:
-        """Get total number of messages stored"""
+        """Get total number of messages stored (constant time via message_stats)"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM messages")
-            count = cursor.fetchone()[0]
-            conn.close()
-            return count
+            with self.pool.connection() as conn:
+                return conn.execute("SELECT COALESCE(SUM(count), 0) FROM message_stats").fetchone()[0]
         except Exception as e:
             logger.error(f"Error getting message count: {e}")
             return 0
 
+class MemoryWriteQueue:
+    """
+    Write-behind buffer for conversation persistence
+    
+    Messages are queued in-process and flushed to JarvisMemory in batches
+    (one SQLite transaction, one ChromaDB add) when max_batch messages are
+    pending or flush_interval seconds have passed. stop() performs a final
+    flush so nothing queued is lost on a clean shutdown.
+    """
+    
+    def __init__(self, memory_system: "JarvisMemory", max_batch: int = 32, flush_interval: float = 1.0,
+                 on_flush: Optional[Callable[[List[int]], Awaitable[None]]] = None):
+        """
+        Initialize write queue
+        
+        Args:
+            memory_system: Memory to flush into
+            max_batch: Pending message count that triggers an immediate flush
+            flush_interval: Maximum seconds a message waits before being flushed
+            on_flush: Optional coroutine called with the stored message IDs after each flush
+        """
+        self.memory = memory_system
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+        
+        self._pending: List[Dict] = []
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        
+        # Metrics
+        self._flushes = 0
+        self._flushed_messages = 0
+        self._failed_flushes = 0
+    
+    def enqueue(self, role: str, text: str):
+        """Queue a message for persistence (non-blocking)"""
+        self._pending.append({
+            "role": role,
+            "content": text,
+            "created_at": datetime.now(timezone.utc)
+        })
+        if len(self._pending) >= self.max_batch:
+            self._wake.set()
+    
+    async def flush(self):
+        """Write all pending messages now"""
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, []
+            
+            try:
+                message_ids = await asyncio.to_thread(self.memory.store_messages, batch)
+            except Exception as e:
+                # Put the batch back in front of anything queued meanwhile and retry next cycle
+                logger.error(f"Error flushing {len(batch)} messages: {e}")
+                self._pending = batch + self._pending
+                self._failed_flushes += 1
+                return
+            
+            self._flushes += 1
+            self._flushed_messages += len(batch)
+            logger.debug(f"Flushed {len(batch)} messages to memory")
+        
+        if self.on_flush:
+            try:
+                await self.on_flush(message_ids)
+            except Exception as e:
+                logger.warning(f"Error in flush callback: {e}")
+    
+    async def _run(self):
+        """Flush loop - wakes on batch size or interval"""
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+    
+    def start(self):
+        """Start the background flush loop (requires a running event loop)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Stop the flush loop and durably write anything still pending"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+    
+    def get_stats(self) -> Dict:
+        """Get queue metrics"""
+        return {
+            'pending': len(self._pending),
+            'flushes': self._flushes,
+            'flushed_messages': self._flushed_messages,
+            'failed_flushes': self._failed_flushes,
+            'avg_batch_size': round(self._flushed_messages / self._flushes, 2) if self._flushes else 0.0
+        }
+
 # Global memory instance
 memory = None
 
-def get_memory() -> JarvisMemory:
-    """Get or create global memory instance"""
+def get_memory(background_init: bool = False) -> JarvisMemory:
+    """
+    Get or create global memory instance
+    
+    Args:
+        background_init: Load the semantic backend in a background thread
+    """
     global memory
     if memory is None:
-        memory = JarvisMemory()
+        memory = JarvisMemory(background_init=background_init)
     return memory
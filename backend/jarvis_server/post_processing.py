@@ -3,10 +3,18 @@ Post-processing pipeline for J.A.R.V.I.S responses.
 Includes SuggestionManager for proactive tips and HumorFilter for personality.
 """
 
+import asyncio
+import json
+import os
 import random
 import logging
+import time
+import uuid
+from contextlib import nullcontext
 from typing import List, Dict, Optional
-from openai import OpenAI
+from openai import AsyncOpenAI
+
+from memory import get_connection_pool
 
 logger = logging.getLogger(__name__)
 
@@ -50,10 +58,53 @@ class HumorFilter:
 class SuggestionManager:
     """
     Analyzes conversation context to provide helpful next-step suggestions.
+    
+    Suggestions can be appended inline (apply) or deferred (defer): a deferred
+    suggestion only reserves a short-lived slot, and the LLM call runs the
+    first time someone waits for it (wait_deferred). Slots nobody asks for
+    expire without costing a call. Slots live in SQLite, so any worker
+    process can serve a suggestion deferred by another.
     """
     
-    def __init__(self, client: Optional[OpenAI]):
+    def __init__(self, client: Optional[AsyncOpenAI], limiter: Optional[asyncio.Semaphore] = None,
+                 model: Optional[str] = None, budget: Optional[float] = None,
+                 db_path: str = "jarvis_suggestions.db", max_slots: int = 1000, slot_ttl: float = 300.0):
+        """
+        Args:
+            client: Async OpenAI-compatible client
+            limiter: Optional semaphore shared with other LLM calls to cap concurrency
+            model: Model for suggestions (defaults to SUGGESTION_MODEL / OPENAI_MODEL)
+            budget: Max seconds to spend on a suggestion; slower ones are skipped
+            db_path: SQLite file holding deferred slots (shared by worker processes)
+            max_slots: Max deferred results kept at once
+            slot_ttl: Seconds a deferred result stays retrievable
+        """
         self.client = client
+        self.limiter = limiter
+        self.model = model or os.getenv("SUGGESTION_MODEL", os.getenv("OPENAI_MODEL", "gpt-4o-mini"))
+        self.budget = budget
+        self.max_slots = max_slots
+        self.slot_ttl = slot_ttl
+        self.pool = get_connection_pool(db_path)
+        
+        # Generations running in this process, by slot id
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._skipped = 0
+        self._generated = 0
+        self._unclaimed = 0
+        
+        # status: pending (inputs kept until generation starts) -> generating -> ready | none
+        with self.pool.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS suggestions (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    suggestion TEXT,
+                    inputs TEXT,
+                    created REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_suggestions_created ON suggestions(created)")
         self.system_prompt = """
         Analyze the conversation history and provide a SINGLE, SHORT (max 10 words) next-step suggestion or tip for the user.
         The suggestion should be proactive and helpful.
@@ -62,12 +113,25 @@ class SuggestionManager:
         Example: "Shall I schedule that for you?" or "Would you like to send an email?"
         """
 
-    def get_suggestion(self, recent_messages: List[Dict], context_summary: str) -> Optional[str]:
+    async def get_suggestion(self, recent_messages: List[Dict], context_summary: str) -> Optional[str]:
         """
         Generate a suggestion based on recent messages and memory context.
+        Returns None when the call exceeds the budget.
         """
         if not self.client:
             return None
+        
+        if self.budget:
+            try:
+                return await asyncio.wait_for(self._generate(recent_messages, context_summary), timeout=self.budget)
+            except asyncio.TimeoutError:
+                self._skipped += 1
+                logger.info(f"Suggestion skipped - provider slower than {self.budget}s budget")
+                return None
+        return await self._generate(recent_messages, context_summary)
+
+    async def _generate(self, recent_messages: List[Dict], context_summary: str) -> Optional[str]:
+        """Call the LLM for a suggestion"""
 
         try:
             # Prepare messages for the suggestion engine
@@ -76,12 +140,13 @@ class SuggestionManager:
                 {"role": "user", "content": f"Context Summary: {context_summary}\n\nRecent Messages:\n{str(recent_messages[-5:])}"}
             ]
 
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=messages,
-                max_tokens=30,
-                temperature=0.5,
-            )
+            async with (self.limiter or nullcontext()):
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    max_tokens=30,
+                    temperature=0.5,
+                )
 
             suggestion = response.choices[0].message.content.strip()
             
@@ -95,11 +160,132 @@ class SuggestionManager:
             logger.warning(f"Error generating suggestion: {e}")
             return None
 
-    def apply(self, response_text: str, recent_messages: List[Dict], context_summary: str) -> str:
+    async def apply(self, response_text: str, recent_messages: List[Dict], context_summary: str) -> str:
         """
         Generate and append a suggestion to the response.
         """
-        suggestion = self.get_suggestion(recent_messages, context_summary)
+        suggestion = await self.get_suggestion(recent_messages, context_summary)
         if suggestion:
             return f"{response_text}\n\nTip: {suggestion}"
         return response_text
+
+    def defer(self, recent_messages: List[Dict], context_summary: str) -> str:
+        """
+        Reserve a slot for a suggestion generated on first request.
+        Returns a slot id for get_deferred() / wait_deferred().
+        """
+        slot_id = uuid.uuid4().hex
+        inputs = json.dumps([list(recent_messages), context_summary], default=str)
+        with self.pool.transaction() as conn:
+            self._evict(conn)
+            conn.execute(
+                "INSERT INTO suggestions (id, status, suggestion, inputs, created) VALUES (?, 'pending', NULL, ?, ?)",
+                (slot_id, inputs, time.time())
+            )
+        return slot_id
+    
+    def _claim(self, slot_id: str) -> Optional[tuple]:
+        """Take a pending slot's inputs for generation (None if another request or worker already has)."""
+        with self.pool.transaction(immediate=True) as conn:
+            row = conn.execute(
+                "SELECT inputs FROM suggestions WHERE id = ? AND status = 'pending' AND created >= ?",
+                (slot_id, time.time() - self.slot_ttl)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE suggestions SET status = 'generating', inputs = NULL WHERE id = ?", (slot_id,))
+        recent_messages, context_summary = json.loads(row["inputs"])
+        return recent_messages, context_summary
+    
+    async def _start(self, slot_id: str) -> Optional[asyncio.Task]:
+        """Start generating a slot's suggestion, or return this process's run already in flight."""
+        task = self._tasks.get(slot_id)
+        if task is None:
+            inputs = await asyncio.to_thread(self._claim, slot_id)
+            # Another request in this process may have claimed it meanwhile
+            task = self._tasks.get(slot_id)
+            if task is None and inputs is not None:
+                self._generated += 1
+                task = asyncio.create_task(self._fill_slot(slot_id, *inputs))
+                self._tasks[slot_id] = task
+                task.add_done_callback(lambda _: self._tasks.pop(slot_id, None))
+        return task
+
+    async def _fill_slot(self, slot_id: str, recent_messages: List[Dict], context_summary: str):
+        suggestion = None
+        try:
+            suggestion = await self.get_suggestion(recent_messages, context_summary)
+        finally:
+            await asyncio.to_thread(self._store_result, slot_id, suggestion)
+    
+    def _store_result(self, slot_id: str, suggestion: Optional[str]):
+        with self.pool.transaction() as conn:
+            conn.execute(
+                "UPDATE suggestions SET status = ?, suggestion = ? WHERE id = ?",
+                ("ready" if suggestion else "none", suggestion, slot_id)
+            )
+
+    def get_deferred(self, slot_id: str) -> Optional[Dict]:
+        """
+        Look up a deferred suggestion.
+        Returns {"status", "suggestion"} or None if the slot is unknown or expired.
+        """
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT status, suggestion FROM suggestions WHERE id = ? AND created >= ?",
+                (slot_id, time.time() - self.slot_ttl)
+            ).fetchone()
+        if row is None:
+            return None
+        # Being generated (maybe by another worker) is still pending to callers
+        status = "pending" if row["status"] == "generating" else row["status"]
+        return {"status": status, "suggestion": row["suggestion"]}
+
+    async def wait_deferred(self, slot_id: str) -> Optional[str]:
+        """Generate (if not started yet) and wait for a deferred suggestion, bounded by the budget."""
+        task = await self._start(slot_id)
+        if task is not None:
+            try:
+                await asyncio.shield(task)
+            except Exception:
+                pass
+        else:
+            # Generated by another worker (or already done) - poll its result, within the budget
+            deadline = time.monotonic() + (self.budget or 30.0) + 1.0
+            while True:
+                slot = await asyncio.to_thread(self.get_deferred, slot_id)
+                if slot is None or slot["status"] != "pending" or time.monotonic() >= deadline:
+                    break
+                await asyncio.sleep(0.1)
+        slot = await asyncio.to_thread(self.get_deferred, slot_id)
+        return slot["suggestion"] if slot else None
+
+    def _evict(self, conn):
+        """Drop expired slots and keep at most max_slots (newest kept)."""
+        expired_before = time.time() - self.slot_ttl
+        self._unclaimed += conn.execute(
+            "DELETE FROM suggestions WHERE created < ? AND status = 'pending'", (expired_before,)
+        ).rowcount
+        conn.execute("DELETE FROM suggestions WHERE created < ?", (expired_before,))
+        conn.execute(
+            """
+            DELETE FROM suggestions WHERE id IN (
+                SELECT id FROM suggestions ORDER BY created DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_slots - 1,)
+        )
+
+    def get_stats(self) -> Dict:
+        """Get suggestion metrics."""
+        with self.pool.connection() as conn:
+            slots = conn.execute("SELECT COUNT(*) FROM suggestions").fetchone()[0]
+        return {
+            "model": self.model,
+            "budget_seconds": self.budget,
+            "pending": len(self._tasks),
+            "slots": slots,
+            "generated": self._generated,
+            "expired_unclaimed": self._unclaimed,
+            "skipped_over_budget": self._skipped
+        }
@@ -0,0 +1,423 @@
+"""
+Prompt assembly for J.A.R.V.I.S
+Builds chat messages from persona, memory, tool output and history within a token budget
+"""
+
+import importlib.util
+import logging
+import os
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# tiktoken gives exact counts; it is optional - without it (or its encoding
+# files) counts fall back to ~4 characters per token
+TIKTOKEN_AVAILABLE = importlib.util.find_spec("tiktoken") is not None
+
+CHARS_PER_TOKEN = 4
+
+# Chat format overhead per message (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+OMITTED_NOTE = "({count} earlier messages of this conversation were omitted.)"
+
+# Per-section caps, highest priority first. Each section gets at most its cap
+# and at most what higher-priority sections left, so the lowest-priority
+# sections are the first to be trimmed.
+DEFAULT_SECTION_BUDGETS = {
+    'tools': 1500,
+    'summaries': 300,
+    'history': 2000,
+    'context': 1500,
+}
+
+class Tokenizer:
+    """
+    Cached token counter
+    
+    Counts are memoized per text, so the persona, stored summaries and
+    replayed history turns are only tokenized once.
+    """
+    
+    def __init__(self, model: str, cache_size: int = 4096):
+        """
+        Initialize tokenizer
+        
+        Args:
+            model: Model name used to pick the tiktoken encoding
+            cache_size: Texts whose counts are memoized
+        """
+        self.model = model
+        self._encoding = None
+        self._loaded = False
+        self._loading_in_background = False
+        self._lock = threading.Lock()
+        self.count = lru_cache(maxsize=cache_size)(self._count)
+    
+    def load(self):
+        """Load the tiktoken encoding (may download it once - keep off the event loop)"""
+        with self._lock:
+            if self._loaded:
+                return
+            if TIKTOKEN_AVAILABLE:
+                try:
+                    import tiktoken
+                    try:
+                        self._encoding = tiktoken.encoding_for_model(self.model)
+                    except KeyError:
+                        self._encoding = tiktoken.get_encoding("o200k_base")
+                except Exception as e:
+                    logger.warning(f"tiktoken encoding unavailable - estimating token counts: {e}")
+            self._loaded = True
+        # Counts memoized while loading were estimates
+        self.count.cache_clear()
+    
+    def load_in_background(self):
+        """Start loading the encoding in a thread; counts are estimated until it is loaded"""
+        with self._lock:
+            if self._loaded or self._loading_in_background:
+                return
+            self._loading_in_background = True
+        threading.Thread(target=self.load, name="tokenizer-warmup", daemon=True).start()
+    
+    def _get_encoding(self):
+        """The tiktoken encoding, loading it on first use unless a background load is under way"""
+        if not self._loaded:
+            if self._loading_in_background:
+                return None
+            self.load()
+        return self._encoding
+    
+    @property
+    def backend(self) -> str:
+        """Name of the counting method in use"""
+        encoding = self._get_encoding()
+        return f"tiktoken:{encoding.name}" if encoding is not None else "estimate"
+    
+    def _count(self, text: str) -> int:
+        if not text:
+            return 0
+        encoding = self._get_encoding()
+        if encoding is not None:
+            return len(encoding.encode(text, disallowed_special=()))
+        return max(1, len(text) // CHARS_PER_TOKEN)
+    
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """
+        Cut text to at most max_tokens, marking the cut
+        
+        Args:
+            text: Text to shorten
+            max_tokens: Token limit
+        
+        Returns:
+            Original text if it fits, otherwise a truncated copy ending in "..."
+        """
+        if self.count(text) <= max_tokens:
+            return text
+        if max_tokens <= 1:
+            return ""
+        
+        encoding = self._get_encoding()
+        if encoding is not None:
+            return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens - 1]) + "..."
+        return text[:(max_tokens - 1) * CHARS_PER_TOKEN] + "..."
+    
+    def get_stats(self) -> Dict:
+        """Get tokenizer metrics"""
+        info = self.count.cache_info()
+        lookups = info.hits + info.misses
+        return {
+            'backend': self.backend,
+            'cached_texts': info.currsize,
+            'hit_rate': round(info.hits / lookups, 3) if lookups else 0.0,
+        }
+
+def _usage_counts(usage) -> Tuple[Optional[int], int]:
+    """(prompt_tokens, cached_tokens) from an OpenAI-style usage object or dict"""
+    if isinstance(usage, dict):
+        details = usage.get('prompt_tokens_details') or {}
+        return usage.get('prompt_tokens'), (details.get('cached_tokens') or 0)
+    details = getattr(usage, 'prompt_tokens_details', None)
+    if isinstance(details, dict):
+        cached = details.get('cached_tokens')
+    else:
+        cached = getattr(details, 'cached_tokens', None)
+    return getattr(usage, 'prompt_tokens', None), (cached or 0)
+
+class PromptBuilder:
+    """
+    Token-budgeted, cache-friendly prompt assembly
+    
+    The persona and the user's input are always sent whole. Tool output,
+    stored user facts, the client's conversation history and memory context
+    then share the rest of max_tokens in that priority order, each capped by
+    its section budget:
+    
+        tools      - truncated
+        summaries  - newest first, whole summaries only
+        history    - newest turns kept; older turns are dropped in steps and noted
+        context    - line by line in order, the last line truncated
+    
+    Messages are ordered from most to least stable so providers with prefix
+    (KV) caching can reuse the front of the prompt across requests:
+    
+        system     - persona + user facts (changes only when a summary is added)
+        history    - earlier turns (grows at the end)
+        system     - this turn's memory context and tool output
+        user       - the current input
+    
+    With context_role="user" the per-turn context is put in front of the
+    user's message instead, for chat templates that only accept a leading
+    system message.
+    """
+    
+    def __init__(self, tokenizer: Tokenizer, max_tokens: int = 6000,
+                 section_budgets: Optional[Dict[str, int]] = None, context_role: str = "system"):
+        """
+        Initialize prompt builder
+        
+        Args:
+            tokenizer: Token counter
+            max_tokens: Budget for the whole prompt (all messages)
+            section_budgets: Per-section caps overriding DEFAULT_SECTION_BUDGETS
+            context_role: "system" (separate message) or "user" (prefixed to the user's message)
+        """
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.section_budgets = dict(DEFAULT_SECTION_BUDGETS)
+        if section_budgets:
+            self.section_budgets.update(section_budgets)
+        self.context_role = context_role
+        
+        # Metrics
+        self._requests = 0
+        self._total_tokens = 0
+        self._largest = 0
+        self._trimmed = {section: 0 for section in self.section_budgets}
+        
+        # Provider-side prompt caching, from the usage the provider reports
+        self._usage_calls = 0
+        self._prompt_tokens = 0
+        self._cached_tokens = 0
+        self._cache_hit_calls = 0
+        self._first_token_seconds = {'cached': [0, 0.0], 'uncached': [0, 0.0]}  # [count, total]
+    
+    def _fit_summaries(self, summaries: List[str], budget: int) -> Tuple[str, int, int]:
+        header = "\n\nUSER FACTS & PREFERENCES:"
+        used = self.tokenizer.count(header)
+        kept: List[str] = []
+        for summary in summaries:
+            tokens = self.tokenizer.count(f"\n- {summary}")
+            if used + tokens > budget:
+                break
+            kept.append(summary)
+            used += tokens
+        if not kept:
+            return "", 0, 0
+        # Newest are picked first but listed last, so adding a summary keeps the earlier text unchanged
+        return header + "".join(f"\n- {summary}" for summary in reversed(kept)), used, len(kept)
+    
+    def _fit_context(self, context: str, budget: int) -> Tuple[str, int]:
+        header = "\n\nCONVERSATION CONTEXT:"
+        used = self.tokenizer.count(header)
+        if used >= budget:
+            return "", 0
+        
+        text = header
+        for line in context.split("\n"):
+            tokens = self.tokenizer.count("\n" + line)
+            if used + tokens > budget:
+                remaining = budget - used
+                # Only worth keeping part of a line if a useful amount fits
+                if remaining >= 32:
+                    partial = "\n" + self.tokenizer.truncate(line, remaining - 1)
+                    text += partial
+                    used += self.tokenizer.count(partial)
+                break
+            text += "\n" + line
+            used += tokens
+        return text, used
+    
+    def _fit_history(self, history: List[Dict], budget: int) -> Tuple[List[Dict], int]:
+        """Keep the newest messages that fit the budget (the newest one alone is truncated rather than dropped)"""
+        tokens = [self.tokenizer.count(message["content"]) + MESSAGE_OVERHEAD_TOKENS for message in history]
+        if sum(tokens) <= budget:
+            return history, sum(tokens)
+        
+        start, used = len(history), 0
+        while start > 0 and used + tokens[start - 1] <= budget:
+            start -= 1
+            used += tokens[start]
+        
+        if start == len(history):
+            content = self.tokenizer.truncate(history[-1]["content"], budget - MESSAGE_OVERHEAD_TOKENS)
+            if not content:
+                return [], 0
+            return [{**history[-1], "content": content}], self.tokenizer.count(content) + MESSAGE_OVERHEAD_TOKENS
+        return history[start:], used
+    
+    def build(self, system_prompt: str, user_input: str, tool_context: str = "", context: str = "",
+              summaries: Optional[List[str]] = None, history: Optional[List[Dict]] = None) -> Tuple[List[Dict], Dict]:
+        """
+        Assemble chat messages within the token budget
+        
+        Args:
+            system_prompt: Persona prompt (never trimmed)
+            user_input: Current user input (never trimmed)
+            tool_context: Formatted tool output
+            context: Conversation context from memory
+            summaries: User facts/preferences, newest first
+            history: Client-provided conversation history, oldest first
+        
+        Returns:
+            Tuple of (messages, token report with per-section counts and trimmed sections)
+        """
+        summaries = summaries or []
+        # Client-supplied history - skip anything that isn't a message with text
+        history = [
+            message for message in (history or [])
+            if isinstance(message, dict) and isinstance(message.get("content"), str)
+        ]
+        report = {
+            'system': self.tokenizer.count(system_prompt) + MESSAGE_OVERHEAD_TOKENS,
+            'user_input': self.tokenizer.count(user_input) + MESSAGE_OVERHEAD_TOKENS,
+        }
+        remaining = self.max_tokens - report['system'] - report['user_input']
+        trimmed = []
+        
+        # The per-turn context message has its own overhead
+        if self.context_role == "system" and (context or tool_context or history):
+            report['system'] += MESSAGE_OVERHEAD_TOKENS
+            remaining -= MESSAGE_OVERHEAD_TOKENS
+        
+        def allowance(section: str) -> int:
+            return max(0, min(self.section_budgets[section], remaining))
+        
+        # Highest priority first - each section only gets what is left
+        tools_text = self.tokenizer.truncate(tool_context, allowance('tools')) if tool_context else ""
+        report['tools'] = self.tokenizer.count(tools_text)
+        if tools_text != tool_context:
+            trimmed.append('tools')
+        remaining -= report['tools']
+        
+        summaries_text, report['summaries'], kept_summaries = self._fit_summaries(summaries, allowance('summaries'))
+        if kept_summaries < len(summaries):
+            trimmed.append('summaries')
+        remaining -= report['summaries']
+        
+        kept_history, report['history'] = self._fit_history(history, allowance('history'))
+        note = ""
+        if len(kept_history) < len(history):
+            # Make room for the note saying how many turns were left out
+            reserve = self.tokenizer.count("\n\n" + OMITTED_NOTE.format(count=len(history)))
+            kept_history, report['history'] = self._fit_history(history, allowance('history') - reserve)
+            note = "\n\n" + OMITTED_NOTE.format(count=len(history) - len(kept_history))
+            report['history'] += self.tokenizer.count(note)
+            trimmed.append('history')
+        elif kept_history is not history:
+            trimmed.append('history')  # Newest message cut down to fit
+        remaining -= report['history']
+        
+        context_text, report['context'] = self._fit_context(context, allowance('context')) if context else ("", 0)
+        if context and not context_text.endswith(context):
+            trimmed.append('context')
+        
+        # Stable parts first: persona, then user facts oldest first (a new summary only appends)
+        messages = [{"role": "system", "content": system_prompt + summaries_text}]
+        messages.extend(kept_history)
+        
+        turn_context = (context_text + tools_text + note).strip()
+        if turn_context and self.context_role == "user":
+            messages.append({"role": "user", "content": f"{turn_context}\n\nUSER MESSAGE:\n{user_input}"})
+        else:
+            if turn_context:
+                messages.append({"role": "system", "content": turn_context})
+            messages.append({"role": "user", "content": user_input})
+        
+        report['total'] = sum(report.values())
+        report['max_tokens'] = self.max_tokens
+        report['trimmed'] = trimmed
+        
+        self._requests += 1
+        self._total_tokens += report['total']
+        self._largest = max(self._largest, report['total'])
+        for section in trimmed:
+            self._trimmed[section] += 1
+        
+        return messages, report
+    
+    def record_usage(self, usage, first_token_seconds: Optional[float] = None) -> Optional[Dict]:
+        """
+        Record the provider's token usage for one LLM call
+        
+        Args:
+            usage: Usage object/dict from the completion (None if the provider sent none)
+            first_token_seconds: Time to first token (streamed) or to the full reply
+        
+        Returns:
+            {'prompt_tokens', 'cached_tokens'} or None when no usage was reported
+        """
+        if usage is None:
+            return None
+        prompt_tokens, cached_tokens = _usage_counts(usage)
+        if prompt_tokens is None:
+            return None
+        
+        self._usage_calls += 1
+        self._prompt_tokens += prompt_tokens
+        self._cached_tokens += cached_tokens
+        if cached_tokens:
+            self._cache_hit_calls += 1
+        if first_token_seconds is not None:
+            bucket = self._first_token_seconds['cached' if cached_tokens else 'uncached']
+            bucket[0] += 1
+            bucket[1] += first_token_seconds
+        
+        return {'prompt_tokens': prompt_tokens, 'cached_tokens': cached_tokens}
+    
+    def get_stats(self) -> Dict:
+        """Get prompt assembly and provider prompt-cache metrics"""
+        return {
+            'max_tokens': self.max_tokens,
+            'section_budgets': self.section_budgets,
+            'context_role': self.context_role,
+            'requests': self._requests,
+            'avg_tokens': round(self._total_tokens / self._requests) if self._requests else 0,
+            'largest': self._largest,
+            'trimmed': self._trimmed,
+            'tokenizer': self.tokenizer.get_stats(),
+            'provider_cache': {
+                'calls_with_usage': self._usage_calls,
+                'prompt_tokens': self._prompt_tokens,
+                'cached_tokens': self._cached_tokens,
+                'cached_ratio': round(self._cached_tokens / self._prompt_tokens, 3) if self._prompt_tokens else 0.0,
+                'cache_hit_calls': self._cache_hit_calls,
+                'avg_first_token_ms': {
+                    label: round(total / count * 1000) if count else None
+                    for label, (count, total) in self._first_token_seconds.items()
+                },
+            },
+        }
+
+# Global prompt builder instance
+_prompt_builder = None
+
+def get_prompt_builder() -> PromptBuilder:
+    """Get or create global prompt builder instance"""
+    global _prompt_builder
+    if _prompt_builder is None:
+        _prompt_builder = PromptBuilder(
+            Tokenizer(os.getenv("OPENAI_MODEL", "gpt-4o-mini")),
+            max_tokens=int(os.getenv("PROMPT_MAX_TOKENS", "6000")),
+            context_role=os.getenv("PROMPT_CONTEXT_ROLE", "system").lower(),
+            section_budgets={
+                'tools': int(os.getenv("PROMPT_TOOLS_TOKENS", "1500")),
+                'summaries': int(os.getenv("PROMPT_SUMMARIES_TOKENS", "300")),
+                'history': int(os.getenv("PROMPT_HISTORY_TOKENS", "2000")),
+                'context': int(os.getenv("PROMPT_CONTEXT_TOKENS", "1500")),
+            }
+        )
+    return _prompt_builder
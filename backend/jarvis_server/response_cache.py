@@ -0,0 +1,278 @@
+"""
+Response cache for J.A.R.V.I.S
+Serves repeated and near-duplicate questions without a new LLM call
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Set
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Seconds a cached answer stays valid, by detected tool category.
+# 0 disables caching - live data (weather, device status) must never be replayed.
+DEFAULT_CATEGORY_TTLS = {
+    'general': 3600.0,
+    'web_search': 600.0,
+    'weather': 0.0,
+    'system_status': 0.0,
+}
+
+# Questions whose answer depends on the current moment
+TIME_SENSITIVE_PATTERN = re.compile(
+    r"\b(time|date|today|tonight|tomorrow|yesterday|now|current(ly)?|latest|right now|this (week|month|year))\b",
+    re.IGNORECASE
+)
+
+# Request phrasing that doesn't change what is being asked ("can you tell me about X" == "X")
+FILLER_PATTERN = re.compile(
+    r"\b(can|could|would|will) you\b|\b(tell|show|give) me\b|\blet me know\b|\bdo you know\b|\bplease\b",
+    re.IGNORECASE
+)
+
+# Questions about the user - answered from their own memory, never replayed
+PERSONAL_PATTERN = re.compile(r"\b(i|me|my|mine|myself|we|us|our|ours)\b", re.IGNORECASE)
+
+# Words that don't change what is being asked. Pronouns are deliberately
+# absent: "what is my name" and "what is your name" are different questions.
+STOPWORDS = {
+    'a', 'an', 'the', 'is', 'are', 'was', 'were', 'be', 'am', 'do', 'does', 'did',
+    'of', 'to', 'in', 'on', 'at', 'for', 'about', 'and', 'or', 'with', 'what',
+    'whats', 'who', 'how', 'why', 'tell', 'can', 'could', 'would', 'will', 'please',
+    'jarvis', 'hey', 'hi', 'some', 'explain', 'describe', 'know', 'give', 'show',
+    'that', 'this', 'there', 'so',
+}
+
+class ResponseCache:
+    """
+    In-process cache of LLM answers keyed by the user's question
+    
+    Lookups try an exact match on the normalized question first, then a
+    near-duplicate match by embedding cosine similarity within the same tool
+    category. Near-duplicates must also have the same content words, so
+    "weather in London" never answers "weather in Paris" and "what is my
+    name" never answers "what is your name", however close the vectors are.
+    """
+    
+    def __init__(self, embed_fn: Optional[Callable[[List[str]], Optional[np.ndarray]]] = None,
+                 max_entries: int = 512, similarity_threshold: float = 0.75,
+                 category_ttls: Optional[Dict[str, float]] = None):
+        """
+        Initialize response cache
+        
+        Args:
+            embed_fn: Returns normalized vectors for texts, or None when
+                embeddings are unavailable (exact matching only)
+            max_entries: Least recently used entries are evicted past this size
+            similarity_threshold: Minimum cosine similarity for a near-duplicate hit
+            category_ttls: Per-category TTL overrides in seconds
+        """
+        self.embed_fn = embed_fn
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.category_ttls = dict(DEFAULT_CATEGORY_TTLS)
+        if category_ttls:
+            self.category_ttls.update(category_ttls)
+        
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        
+        # Metrics
+        self._exact_hits = 0
+        self._semantic_hits = 0
+        self._misses = 0
+        self._bypassed = 0
+        self._evictions = 0
+        self._saved_seconds = 0.0
+    
+    @staticmethod
+    def _normalize(text: str) -> str:
+        """Fold case, whitespace and trailing punctuation"""
+        return re.sub(r"\s+", " ", text.lower()).strip().rstrip("?!. ")
+    
+    @staticmethod
+    def _terms(text: str) -> Set[str]:
+        """Content words of a question"""
+        text = FILLER_PATTERN.sub(" ", text.lower())
+        return {word for word in re.findall(r"\w+", text) if word not in STOPWORDS}
+    
+    def _key(self, text: str, category: str) -> str:
+        return hashlib.sha256(f"{category}\0{self._normalize(text)}".encode("utf-8")).hexdigest()
+    
+    def ttl_for(self, category: Optional[str]) -> float:
+        """TTL in seconds for a tool category (None means no tool)"""
+        return self.category_ttls.get(category or 'general', self.category_ttls['general'])
+    
+    def is_cacheable(self, user_input: str, category: Optional[str]) -> bool:
+        """
+        Whether a question may be served from / stored in the cache
+        
+        Args:
+            user_input: User's question
+            category: Detected tool name, or None
+        
+        Returns:
+            False for live-data tool categories, time-sensitive questions and
+            questions about the user
+        """
+        if self.ttl_for(category) <= 0:
+            return False
+        if PERSONAL_PATTERN.search(FILLER_PATTERN.sub(" ", user_input)):
+            return False
+        return not TIME_SENSITIVE_PATTERN.search(user_input)
+    
+    def _embed(self, text: str) -> Optional[np.ndarray]:
+        if not self.embed_fn:
+            return None
+        try:
+            vectors = self.embed_fn([text])
+            return None if vectors is None else np.asarray(vectors[0], dtype=np.float32)
+        except Exception as e:
+            logger.warning(f"Response cache embedding failed: {e}")
+            return None
+    
+    def _prune_expired(self, now: float):
+        """Drop expired entries (lock held)"""
+        expired = [key for key, entry in self._entries.items() if entry['expires_at'] <= now]
+        for key in expired:
+            del self._entries[key]
+    
+    def lookup(self, user_input: str, category: Optional[str]) -> Optional[str]:
+        """
+        Find a cached answer for a question
+        
+        Args:
+            user_input: User's question
+            category: Detected tool name, or None
+        
+        Returns:
+            Cached response text or None
+        """
+        if not self.is_cacheable(user_input, category):
+            self._bypassed += 1
+            return None
+        
+        category = category or 'general'
+        key = self._key(user_input, category)
+        now = time.time()
+        
+        with self._lock:
+            self._prune_expired(now)
+            entry = self._entries.get(key)
+            if entry:
+                self._entries.move_to_end(key)
+                self._exact_hits += 1
+                self._saved_seconds += entry['cost_seconds']
+                logger.info(f"Response cache hit (exact, {category})")
+                return entry['response']
+            
+            candidates = [
+                (cached_key, entry) for cached_key, entry in self._entries.items()
+                if entry['category'] == category and entry['vector'] is not None
+            ]
+        
+        # Near-duplicate search - embedding runs outside the lock
+        terms = self._terms(user_input)
+        vector = self._embed(user_input) if candidates and terms else None
+        if vector is not None:
+            matrix = np.stack([entry['vector'] for _, entry in candidates])
+            scores = matrix @ vector
+            for index in np.argsort(-scores):
+                if scores[index] < self.similarity_threshold:
+                    break
+                cached_key, entry = candidates[index]
+                if terms == entry['terms']:
+                    with self._lock:
+                        if cached_key not in self._entries:
+                            continue
+                        self._entries.move_to_end(cached_key)
+                        self._semantic_hits += 1
+                        self._saved_seconds += entry['cost_seconds']
+                    logger.info(f"Response cache hit (similarity {scores[index]:.2f}, {category})")
+                    return entry['response']
+        
+        self._misses += 1
+        return None
+    
+    def store(self, user_input: str, category: Optional[str], response: str, cost_seconds: float = 0.0):
+        """
+        Cache an answer
+        
+        Args:
+            user_input: User's question
+            category: Detected tool name, or None
+            response: Response text to replay on later hits
+            cost_seconds: Time it took to produce the response (reported as latency saved on hits)
+        """
+        if not response or not self.is_cacheable(user_input, category):
+            return
+        
+        ttl = self.ttl_for(category)
+        category = category or 'general'
+        entry = {
+            'response': response,
+            'category': category,
+            'vector': self._embed(user_input),
+            'terms': self._terms(user_input),
+            'expires_at': time.time() + ttl,
+            'cost_seconds': cost_seconds,
+        }
+        
+        with self._lock:
+            key = self._key(user_input, category)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+    
+    def clear(self):
+        """Remove all cached responses"""
+        with self._lock:
+            self._entries.clear()
+    
+    def get_stats(self) -> Dict:
+        """Get cache metrics"""
+        hits = self._exact_hits + self._semantic_hits
+        lookups = hits + self._misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'exact_hits': self._exact_hits,
+            'semantic_hits': self._semantic_hits,
+            'misses': self._misses,
+            'bypassed': self._bypassed,
+            'evictions': self._evictions,
+            'hit_rate': round(hits / lookups, 3) if lookups else 0.0,
+            'latency_saved_ms': round(self._saved_seconds * 1000),
+        }
+
+# Global response cache instance
+_response_cache = None
+
+def get_response_cache(embed_fn: Optional[Callable[[List[str]], Optional[np.ndarray]]] = None) -> ResponseCache:
+    """
+    Get or create global response cache instance
+    
+    Args:
+        embed_fn: Embedding function used for near-duplicate matching (first call only)
+    """
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache(
+            embed_fn=embed_fn,
+            max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512")),
+            similarity_threshold=float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.75")),
+            category_ttls={
+                'general': float(os.getenv("RESPONSE_CACHE_TTL", "3600")),
+                'web_search': float(os.getenv("RESPONSE_CACHE_SEARCH_TTL", "600")),
+            }
+        )
+    return _response_cache
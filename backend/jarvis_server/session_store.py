@@ -0,0 +1,291 @@
+"""
+Conversation sessions for J.A.R.V.I.S
+Server-side chat history, so clients send a session id instead of the whole conversation
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from memory import get_connection_pool
+
+logger = logging.getLogger(__name__)
+
+# Client-chosen session ids must look like this (uuid4 hex fits)
+SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+class SessionStore:
+    """
+    Per-session conversation history
+    
+    Every turn is written to SQLite, so sessions survive restarts and are
+    shared by worker processes. Recently used histories are also held in an
+    in-process LRU; each read checks the session's newest message id in
+    SQLite and reloads when another worker has changed it. Each session keeps
+    only its newest max_messages messages, and sessions idle longer than ttl
+    are purged.
+    """
+    
+    def __init__(self, db_path: str = "jarvis_sessions.db", max_cached_sessions: int = 256,
+                 max_messages: int = 40, ttl: float = 7 * 24 * 3600):
+        """
+        Initialize session store
+        
+        Args:
+            db_path: SQLite database file
+            max_cached_sessions: Sessions kept in memory (least recently used are dropped)
+            max_messages: Messages kept per session
+            ttl: Seconds of inactivity before a session is deleted
+        """
+        self.max_cached_sessions = max_cached_sessions
+        self.max_messages = max_messages
+        self.ttl = ttl
+        self.pool = get_connection_pool(db_path)
+        
+        # session id -> {'last_id': newest message id when loaded, 'messages': [...]}
+        self._cache: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+        
+        # Metrics
+        self._hits = 0
+        self._loads = 0
+        self._created = 0
+        
+        with self.pool.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    id TEXT PRIMARY KEY,
+                    created_at REAL NOT NULL,
+                    last_active REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS session_messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_session_messages_session ON session_messages(session_id, id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_last_active ON sessions(last_active)")
+    
+    @staticmethod
+    def is_valid_id(session_id: str) -> bool:
+        """Whether a client-supplied session id is well formed"""
+        return bool(SESSION_ID_PATTERN.match(session_id or ""))
+    
+    def create(self, session_id: Optional[str] = None) -> str:
+        """
+        Start a session (no-op if it already exists)
+        
+        Args:
+            session_id: Client-chosen id, or None to generate one
+        
+        Returns:
+            The session id
+        """
+        session_id = session_id or uuid.uuid4().hex
+        now = time.time()
+        with self.pool.transaction() as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO sessions (id, created_at, last_active) VALUES (?, ?, ?)",
+                (session_id, now, now)
+            )
+            if cursor.rowcount:
+                self._created += 1
+        self._purge_expired(now)
+        return session_id
+    
+    def exists(self, session_id: str) -> bool:
+        """Whether a session exists"""
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT 1 FROM sessions WHERE id = ?", (session_id,)).fetchone() is not None
+    
+    def get_history(self, session_id: str) -> List[Dict]:
+        """
+        Get a session's messages, oldest first
+        
+        Args:
+            session_id: Session id
+        
+        Returns:
+            List of {'role', 'content'} dicts (empty for unknown sessions)
+        """
+        with self.pool.connection() as conn:
+            last_id = self._last_message_id(conn, session_id)
+        
+        # Ids are AUTOINCREMENT (never reused), so an unchanged newest id means an unchanged history
+        with self._lock:
+            cached = self._cache.get(session_id)
+            if cached is not None and cached['last_id'] == last_id:
+                self._cache.move_to_end(session_id)
+                self._hits += 1
+                return list(cached['messages'])
+        
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                """
+                SELECT id, role, content FROM (
+                    SELECT id, role, content FROM session_messages
+                    WHERE session_id = ?
+                    ORDER BY id DESC
+                    LIMIT ?
+                ) ORDER BY id
+                """,
+                (session_id, self.max_messages)
+            ).fetchall()
+            known = rows or conn.execute("SELECT 1 FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        history = [{"role": row['role'], "content": row['content']} for row in rows]
+        
+        if known:
+            self._loads += 1
+            with self._lock:
+                self._cache[session_id] = {'last_id': rows[-1]['id'] if rows else 0, 'messages': history}
+                self._cache.move_to_end(session_id)
+                self._evict()
+        else:
+            with self._lock:
+                self._cache.pop(session_id, None)
+        return list(history)
+    
+    def append(self, session_id: str, messages: List[Dict]):
+        """
+        Add messages to a session, keeping only the newest max_messages
+        
+        Args:
+            session_id: Session id
+            messages: {'role', 'content'} dicts in order
+        """
+        now = time.time()
+        try:
+            # Write lock first: no other worker can append between reading previous_id and our insert
+            with self.pool.transaction(immediate=True) as conn:
+                previous_id = self._last_message_id(conn, session_id)
+                conn.execute(
+                    "INSERT INTO sessions (id, created_at, last_active) VALUES (?, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET last_active = excluded.last_active",
+                    (session_id, now, now)
+                )
+                conn.executemany(
+                    "INSERT INTO session_messages (session_id, role, content) VALUES (?, ?, ?)",
+                    [(session_id, message["role"], message["content"]) for message in messages]
+                )
+                conn.execute(
+                    """
+                    DELETE FROM session_messages
+                    WHERE session_id = ? AND id <= (
+                        SELECT id FROM session_messages
+                        WHERE session_id = ?
+                        ORDER BY id DESC
+                        LIMIT 1 OFFSET ?
+                    )
+                    """,
+                    (session_id, session_id, self.max_messages)
+                )
+                last_id = self._last_message_id(conn, session_id)
+        except Exception as e:
+            logger.error(f"Error saving session {session_id}: {e}")
+            return
+        
+        with self._lock:
+            cached = self._cache.get(session_id)
+            if cached is not None and cached['last_id'] == previous_id:
+                cached['messages'].extend({"role": message["role"], "content": message["content"]} for message in messages)
+                del cached['messages'][:-self.max_messages]
+                cached['last_id'] = last_id
+                self._cache.move_to_end(session_id)
+            elif cached is not None:
+                # Another worker appended since this was cached - reload on the next read
+                del self._cache[session_id]
+        self._purge_expired(now)
+    
+    def delete(self, session_id: str) -> bool:
+        """
+        Delete a session and its messages
+        
+        Returns:
+            True if the session existed
+        """
+        with self._lock:
+            self._cache.pop(session_id, None)
+        with self.pool.transaction() as conn:
+            conn.execute("DELETE FROM session_messages WHERE session_id = ?", (session_id,))
+            return conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,)).rowcount > 0
+    
+    def clear_all(self):
+        """Delete every session and its messages"""
+        with self.pool.transaction() as conn:
+            conn.execute("DELETE FROM session_messages")
+            conn.execute("DELETE FROM sessions")
+        with self._lock:
+            self._cache.clear()
+    
+    @staticmethod
+    def _last_message_id(conn, session_id: str) -> int:
+        """Id of a session's newest message (0 if it has none)"""
+        return conn.execute(
+            "SELECT COALESCE(MAX(id), 0) FROM session_messages WHERE session_id = ?", (session_id,)
+        ).fetchone()[0]
+    
+    def _evict(self):
+        """Drop least recently used sessions from memory (lock held) - they stay in SQLite"""
+        while len(self._cache) > self.max_cached_sessions:
+            self._cache.popitem(last=False)
+    
+    def _purge_expired(self, now: float):
+        """Delete idle sessions, at most once an hour"""
+        if now - self._last_purge < 3600:
+            return
+        self._last_purge = now
+        try:
+            with self.pool.transaction() as conn:
+                expired = [row['id'] for row in conn.execute(
+                    "SELECT id FROM sessions WHERE last_active < ?", (now - self.ttl,)
+                )]
+                conn.executemany("DELETE FROM session_messages WHERE session_id = ?", [(sid,) for sid in expired])
+                conn.executemany("DELETE FROM sessions WHERE id = ?", [(sid,) for sid in expired])
+            with self._lock:
+                for session_id in expired:
+                    self._cache.pop(session_id, None)
+            if expired:
+                logger.info(f"Purged {len(expired)} idle sessions")
+        except Exception as e:
+            logger.warning(f"Session purge failed: {e}")
+    
+    def get_stats(self) -> Dict:
+        """Get session store metrics"""
+        try:
+            with self.pool.connection() as conn:
+                sessions = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        except Exception:
+            sessions = 0
+        return {
+            'sessions': sessions,
+            'cached_sessions': len(self._cache),
+            'max_messages': self.max_messages,
+            'created': self._created,
+            'cache_hits': self._hits,
+            'loads': self._loads,
+        }
+
+# Global session store instance
+_session_store = None
+
+def get_session_store() -> SessionStore:
+    """Get or create global session store instance"""
+    global _session_store
+    if _session_store is None:
+        _session_store = SessionStore(
+            db_path=os.getenv("SESSION_DB", "jarvis_sessions.db"),
+            max_cached_sessions=int(os.getenv("SESSION_CACHE_SIZE", "256")),
+            max_messages=int(os.getenv("SESSION_MAX_MESSAGES", "40")),
+            ttl=float(os.getenv("SESSION_TTL_HOURS", "168")) * 3600
+        )
+    return _session_store
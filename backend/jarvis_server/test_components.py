@@ -43,7 +43,7 @@ def test_security_filter():
         else:
             results['failed'].append('G: Secrecy Filter')
             return False
-            
+    
     except Exception as e:
         print(f"  ❌ Error: {e}")
         results['failed'].append('G: Secrecy Filter')
@@ -68,7 +68,7 @@ def test_humor_filter():
             print(f"  ❌ Humor not added")
             results['failed'].append('C: Humor Filter')
             return False
-            
+    
     except Exception as e:
         print(f"  ❌ Error: {e}")
         results['failed'].append('C: Humor Filter')
@@ -85,7 +85,10 @@ def test_tool_manager():
         test_cases = [
             ("What's the weather in Paris?", "weather"),
             ("Search for Python tutorials", "web_search"),
-            ("How's the system doing?", "system_status"),
+            ("How's the system health?", "system_status"),
+            ("Explain the nervous system", None),  # 'system' alone isn't a status request
+            ("What is the weather like?", "weather"),  # Topic outranks question framing
+            ("Show me a photo of a brain", None),  # Word boundaries - no 'hot'/'rain' hit
             ("Hello JARVIS", None),  # No tool needed
         ]
         
@@ -104,7 +107,7 @@ def test_tool_manager():
         else:
             results['failed'].append('D: Tool Intent Detection')
             return False
-            
+    
     except Exception as e:
         print(f"  ❌ Error: {e}")
         results['failed'].append('D: Tool Intent Detection')
@@ -124,12 +127,769 @@ def test_file_analyzer():
         print(f"  ✓ FileAnalyzer module loaded successfully")
         results['passed'].append('E: File Analyzer (Module Load)')
         return True
-            
+    
     except Exception as e:
         print(f"  ❌ Error: {e}")
         results['failed'].append('E: File Analyzer')
         return False
 
+def test_vector_index():
+    """Test I: Embedded Vector Index (semantic recall without ChromaDB)"""
+    try:
+        import tempfile
+        from vector_index import VectorIndex, HashingEmbedder
+        
+        embedder = HashingEmbedder()
+        texts = [
+            "What's the weather in Paris tomorrow?",
+            "Tell me about black holes",
+            "Remind me to buy milk",
+        ]
+        
+        with tempfile.TemporaryDirectory() as index_dir:
+            index = VectorIndex(index_dir, dim=embedder.dim, embedder_name=embedder.name)
+            index.add(embedder.encode(texts), [{"content": t} for t in texts])
+            
+            # Reload from disk to check persistence
+            reloaded = VectorIndex(index_dir, dim=embedder.dim, embedder_name=embedder.name)
+            hits = reloaded.search(embedder.encode(["black hole physics"])[0], k=2)
+        
+        if reloaded.count() == 3 and hits and hits[0][1]["content"] == texts[1]:
+            print(f"  ✓ Top hit: '{hits[0][1]['content']}' (score {hits[0][0]:.2f})")
+            results['passed'].append('I: Vector Index')
+            return True
+        else:
+            print(f"  ❌ Unexpected results: {hits}")
+            results['failed'].append('I: Vector Index')
+            return False
+    
+    except Exception as e:
+        print(f"  ❌ Error: {e}")
+        results['failed'].append('I: Vector Index')
+        return False
+
+def test_response_cache():
+    """Test J: Response Cache (exact, near-duplicate and bypass)"""
+    try:
+        from response_cache import ResponseCache
+        from vector_index import HashingEmbedder
+        
+        cache = ResponseCache(embed_fn=HashingEmbedder().encode)
+        cache.store("Tell me about black holes", None, "Black holes are regions of spacetime...")
+        cache.store("What time is it in Tokyo?", None, "It is 3 PM in Tokyo.")
+        cache.store("What is your name", None, "I am J.A.R.V.I.S.")
+        
+        exact = cache.lookup("tell me about black holes?", None)
+        similar = cache.lookup("can you tell me about black holes please", None)
+        different = cache.lookup("tell me about white dwarfs", None)
+        live = cache.lookup("What time is it in Tokyo?", None)
+        # Pronouns count - questions about the user never get J.A.R.V.I.S's answers
+        personal = [cache.lookup(q, None) for q in ("hey jarvis what is my name", "do you know your birthday")]
+        
+        if exact and similar and different is None and live is None and personal == [None, None]:
+            print(f"  ✓ Exact and near-duplicate hits served, time-sensitive question bypassed")
+            print(f"  ✓ Stats: {cache.get_stats()}")
+            results['passed'].append('J: Response Cache')
+            return True
+        else:
+            print(f"  ❌ Unexpected results: {[exact, similar, different, live, personal]}")
+            results['failed'].append('J: Response Cache')
+            return False
+    
+    except Exception as e:
+        print(f"  ❌ Error: {e}")
+        results['failed'].append('J: Response Cache')
+        return False
+
+def test_document_chunking():
+    """Test K: Document Chunking (size bounds and stable boundaries after an edit)"""
+    try:
+        from document_summarizer import split_into_chunks, estimate_tokens
+        
+        paragraphs = [f"Section {i}: " + " ".join(f"word{i}_{j}" for j in range(40)) for i in range(200)]
+        original = split_into_chunks("\n\n".join(paragraphs), 500)
+        
+        paragraphs[20] += " An extra sentence added while editing."
+        edited = split_into_chunks("\n\n".join(paragraphs), 500)
+        
+        oversized = [chunk for chunk in original if estimate_tokens(chunk) > 500]
+        changed = len(set(edited) - set(original))
+        
+        if len(original) > 1 and not oversized and changed <= 2:
+            print(f"  ✓ {len(original)} chunks within budget, {changed} changed after editing one paragraph")
+            results['passed'].append('K: Document Chunking')
+            return True
+        else:
+            print(f"  ❌ {len(original)} chunks, {len(oversized)} oversized, {changed} changed after edit")
+            results['failed'].append('K: Document Chunking')
+            return False
+    
+    except Exception as e:
+        print(f"  ❌ Error: {e}")
+        results['failed'].append('K: Document Chunking')
+        return False
+
+def test_prompt_builder():
+    """Test L: Prompt Builder (token budget, section priority and message order)"""
+    try:
+        from prompt_builder import PromptBuilder, Tokenizer
+        
+        builder = PromptBuilder(Tokenizer("gpt-4o-mini"), max_tokens=1500)
+        history = [{"role": "user", "content": f"message {i} " + "filler " * 100} for i in range(20)]
+        messages, report = builder.build(
+            "You are J.A.R.V.I.S.",
+            "What did I just say?",
+            tool_context="\n\nWEB SEARCH RESULTS:\n" + "result " * 200,
+            context="RECENT CONVERSATION:\n" + "\n".join(f"User: old line {i}" for i in range(200)),
+            summaries=["User prefers metric units"],
+            history=history
+        )
+        
+        newest_kept = any(message['content'].startswith("message 19") for message in messages)
+        tools_whole = 'tools' not in report['trimmed']
+        # Per-turn context stays out of the leading system message (stable, cacheable prefix)
+        stable_prefix = "WEB SEARCH" not in messages[0]['content'] and "RECENT CONVERSATION" not in messages[0]['content']
+        
+        # History just over its budget loses only its oldest turn, not the whole conversation
+        long_turns = [{"role": "user" if i % 2 == 0 else "assistant", "content": f"turn {i} " + "word " * 420} for i in range(4)]
+        over_messages, over_report = PromptBuilder(Tokenizer("gpt-4o-mini"), max_tokens=6000).build(
+            "You are J.A.R.V.I.S.", "And then?", history=long_turns
+        )
+        kept_turns = [message['content'].split(" ")[1] for message in over_messages if message['content'].startswith("turn ")]
+        
+        # A single message over the budget is cut down rather than dropped
+        huge, huge_report = PromptBuilder(Tokenizer("gpt-4o-mini"), max_tokens=6000).build(
+            "You are J.A.R.V.I.S.", "Summarize that", history=[{"role": "user", "content": "paste " * 5000}]
+        )
+        huge_kept = any(message['content'].startswith("paste") for message in huge) and huge_report['history'] <= 2000
+        huge_kept = huge_kept and 'history' in huge_report['trimmed']
+        
+        # Malformed client history items are skipped, not a 500
+        malformed, _ = PromptBuilder(Tokenizer("gpt-4o-mini"), max_tokens=6000).build(
+            "You are J.A.R.V.I.S.", "Hello", history=["hi", None, {"role": "user", "content": None}, {"role": "user", "content": "earlier"}]
+        )
+        malformed_skipped = [message['content'] for message in malformed[1:]] == ["earlier", "Hello"]
+        
+        # While the encoding loads in the background, counts are estimated instead of waiting
+        background = Tokenizer("gpt-4o-mini")
+        background._loading_in_background = True
+        estimated = background.count("word " * 100) == len("word " * 100) // 4
+        background.load()
+        exact = background.count.cache_info().currsize == 0  # Estimates dropped once loaded
+        
+        if (report['total'] <= 1500 and newest_kept and tools_whole and stable_prefix and 'context' in report['trimmed']
+                and kept_turns == ["1", "2", "3"] and over_report['history'] <= 2000 and huge_kept
+                and malformed_skipped and estimated and exact):
+            print(f"  ✓ Prompt fits budget: {report['total']}/1500 tokens, trimmed {report['trimmed']}")
+            print(f"  ✓ History over budget by one turn keeps turns {kept_turns} ({over_report['history']} tokens)")
+            results['passed'].append('L: Prompt Builder')
+            return True
+        else:
+            print(f"  ❌ Unexpected report: {report} kept_turns={kept_turns} over={over_report} huge={huge_report} "
+                  f"malformed_skipped={malformed_skipped} estimated={estimated} exact={exact}")
+            results['failed'].append('L: Prompt Builder')
+            return False
+    
+    except Exception as e:
+        print(f"  ❌ Error: {e}")
+        results['failed'].append('L: Prompt Builder')
+        return False
+
+def test_session_store():
+    """Test M: Session Store (bounded server-side history that survives a restart)"""
+    try:
+        import tempfile
+        import threading
+        from session_store import SessionStore
+        
+        with tempfile.TemporaryDirectory() as db_dir:
+            db_path = os.path.join(db_dir, "sessions.db")
+            store = SessionStore(db_path, max_cached_sessions=1, max_messages=4)
+            session_id = store.create()
+            for i in range(3):
+                store.append(session_id, [
+                    {"role": "user", "content": f"question {i}"},
+                    {"role": "assistant", "content": f"answer {i}"},
+                ])
+            cached = store.get_history(session_id)
+            
+            # A fresh store has an empty cache - history comes back from SQLite
+            other_worker = SessionStore(db_path, max_messages=4)
+            reloaded = other_worker.get_history(session_id)
+            
+            # Turns appended by another worker show up in this one's cached history
+            other_worker.append(session_id, [{"role": "user", "content": "from worker 2"}])
+            seen_by_first = store.get_history(session_id)
+            store.append(session_id, [{"role": "assistant", "content": "reply from worker 1"}])
+            seen_by_second = other_worker.get_history(session_id)
+            
+            # Another worker appends while this one is mid-append (after it read its previous id)
+            original_last_id = store._last_message_id
+            
+            def interleaved_last_id(conn, sid):
+                store._last_message_id = original_last_id
+                previous_id = original_last_id(conn, sid)
+                racing = threading.Thread(target=other_worker.append, args=(sid, [{"role": "user", "content": "racing append"}]))
+                racing.start()
+                racing.join(timeout=0.5)  # Blocks on the write lock when appends are serialized
+                interleaved.append(racing)
+                return previous_id
+            
+            interleaved = []
+            store._last_message_id = interleaved_last_id
+            store.append(session_id, [{"role": "assistant", "content": "interleaved reply"}])
+            interleaved[0].join()
+            raced = store.get_history(session_id) == SessionStore(db_path, max_messages=4).get_history(session_id)
+            deleted = store.delete(session_id) and not other_worker.exists(session_id)
+            
+            # Idle sessions are purged when other sessions are written to, and clear_all empties the store
+            active = store.create()
+            idle = store.create()
+            with store.pool.transaction() as conn:
+                conn.execute("UPDATE sessions SET last_active = 0 WHERE id = ?", (idle,))
+            store._last_purge = 0.0  # Purges run at most hourly
+            store.append(active, [{"role": "user", "content": "still here"}])
+            purged = not store.exists(idle) and store.exists(active)
+            store.clear_all()
+            cleared = not other_worker.exists(active) and other_worker.get_history(active) == []
+        
+        expected = ["question 1", "answer 1", "question 2", "answer 2"]
+        shared = seen_by_first[-1]['content'] == "from worker 2" and seen_by_second[-1]['content'] == "reply from worker 1"
+        if [m['content'] for m in cached] == expected and reloaded == cached and shared and raced and deleted and purged and cleared:
+            print(f"  ✓ Kept newest {len(cached)} messages, reloaded from disk: {reloaded[-1]['content']}")
+            print(f"  ✓ Appends from another worker seen through the cache, even mid-append; idle sessions purged; clear_all empties")
+            results['passed'].append('M: Session Store')
+            return True
+        else:
+            print(f"  ❌ Unexpected history: cached={cached} reloaded={reloaded} shared={shared} raced={raced} "
+                  f"deleted={deleted} purged={purged} cleared={cleared}")
+            results['failed'].append('M: Session Store')
+            return False
+    
+    except Exception as e:
+        print(f"  ❌ Error: {e}")
+        results['failed'].append('M: Session Store')
+        return False
+
+def test_vector_index_workers():
+    """Test N: Vector Index shared by workers (clears and compactions seen by every instance)"""
+    try:
+        import tempfile
+        from vector_index import VectorIndex, HashingEmbedder
+        
+        embedder = HashingEmbedder()
+        with tempfile.TemporaryDirectory() as index_dir:
+            worker_a = VectorIndex(index_dir, dim=embedder.dim, embedder_name=embedder.name)
+            worker_b = VectorIndex(index_dir, dim=embedder.dim, embedder_name=embedder.name)
+            
+            # B clears and refills while A still holds the old generation, then A clears
+            worker_b.add(embedder.encode(["first"]), [{"content": "first"}])
+            worker_b.clear()
+            worker_b.add(embedder.encode(["second", "third"]), [{"content": "second"}, {"content": "third"}])
+            worker_a.clear()
+            
+            after_clear = worker_b.search(embedder.encode(["second"])[0], k=3)
+            worker_b.add(embedder.encode(["fourth"]), [{"content": "fourth"}])
+            hits = worker_a.search(embedder.encode(["fourth"])[0], k=3)
+        
+        if after_clear == [] and [h[1]["content"] for h in hits] == ["fourth"]:
+            print("  ✓ Clear by one worker is seen by the other; later appends are shared")
+            results['passed'].append('N: Vector Index Workers')
+            return True
+        else:
+            print(f"  ❌ Unexpected results: after_clear={after_clear} hits={hits}")
+            results['failed'].append('N: Vector Index Workers')
+            return False
+    
+    except Exception as e:
+        print(f"  ❌ Error: {e}")
+        results['failed'].append('N: Vector Index Workers')
+        return False
+
+def test_embedding_cache():
+    """Test O: Embedding Cache (normalized keys, disk reuse, encoding survives a failed write)"""
+    try:
+        import tempfile
+        from memory import EmbeddingService, get_connection_pool
+        from vector_index import HashingEmbedder
+        
+        class CountingEncoder(HashingEmbedder):
+            calls = 0
+            def encode(self, texts, normalize_embeddings=True):
+                CountingEncoder.calls += len(texts)
+                return super().encode(texts, normalize_embeddings)
+        
+        with tempfile.TemporaryDirectory() as db_dir:
+            pool = get_connection_pool(os.path.join(db_dir, "embeddings.db"))
+            first = EmbeddingService(CountingEncoder(), "hashing-v1", pool)
+            vectors = first.embed(["Hey JARVIS", "hey  jarvis!"])
+            
+            # A new instance (empty LRU, e.g. another worker) reads the disk cache
+            second = EmbeddingService(CountingEncoder(), "hashing-v1", pool)
+            second.embed(["hey jarvis"])
+            
+            # Losing the disk cache only costs persistence - vectors still come back
+            with pool.transaction() as conn:
+                conn.execute("DROP TABLE embedding_cache")
+            fresh = second.embed(["something new"])
+        
+        stats = second.get_stats()
+        if CountingEncoder.calls == 2 and (vectors[0] == vectors[1]).all() and stats['disk_hits'] == 1 and fresh.shape[0] == 1:
+            print(f"  ✓ {CountingEncoder.calls} encodes for 4 texts, disk hits {stats['disk_hits']}")
+            results['passed'].append('O: Embedding Cache')
+            return True
+        else:
+            print(f"  ❌ Unexpected: encodes={CountingEncoder.calls} stats={stats}")
+            results['failed'].append('O: Embedding Cache')
+            return False
+    
+    except Exception as e:
+        print(f"  ❌ Error: {e}")
+        results['failed'].append('O: Embedding Cache')
+        return False
+
+def test_tool_result_cache():
+    """Test P: Tool Result Cache (coalescing, failures not cached)"""
+    try:
+        import asyncio
+        from tool_manager import ToolResultCache
+        
+        calls = []
+        
+        async def scenario():
+            cache = ToolResultCache({'weather': 600})
+            
+            async def fetch_ok():
+                calls.append('ok')
+                await asyncio.sleep(0.05)
+                return {'success': True, 'city': 'Paris'}
+            
+            async def fetch_failed():
+                calls.append('failed')
+                return {'success': False, 'error': 'upstream 503'}
+            
+            async def fetch_raises():
+                calls.append('raises')
+                await asyncio.sleep(0.01)
+                raise RuntimeError("connection reset")
+            
+            # Five concurrent identical lookups share one upstream call
+            shared = await asyncio.gather(*(cache.get_or_fetch('weather', ' Paris ', fetch_ok) for _ in range(5)))
+            
+            # Failed results and exceptions are not cached - the next request retries
+            await cache.get_or_fetch('weather', 'London', fetch_failed)
+            await cache.get_or_fetch('weather', 'London', fetch_failed)
+            errors = await asyncio.gather(
+                *(cache.get_or_fetch('weather', 'Oslo', fetch_raises) for _ in range(2)), return_exceptions=True
+            )
+            await asyncio.gather(cache.get_or_fetch('weather', 'Oslo', fetch_raises), return_exceptions=True)
+            return shared, errors, cache.get_stats()
+        
+        shared, errors, stats = asyncio.run(scenario())
+        
+        raised = all(isinstance(error, RuntimeError) for error in errors)
+        if calls == ['ok', 'failed', 'failed', 'raises', 'raises'] and all(r['city'] == 'Paris' for r in shared) and raised:
+            print(f"  ✓ 5 concurrent lookups -> 1 fetch; failures retried. Stats: {stats}")
+            results['passed'].append('P: Tool Result Cache')
+            return True
+        else:
+            print(f"  ❌ Unexpected calls: {calls} errors={errors}")
+            results['failed'].append('P: Tool Result Cache')
+            return False
+    
+    except Exception as e:
+        print(f"  ❌ Error: {e}")
+        results['failed'].append('P: Tool Result Cache')
+        return False
+
+def make_test_pdf(page_texts):
+    """Build a minimal PDF with one line of Helvetica text per page"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(len(page_texts)))
+    objects.append(
+        f"<< /Type /Pages /Kids [{kids}] /Count {len(page_texts)} "
+        f"/Resources << /Font << /F1 << /Type /Font /Subtype /Type1 /BaseFont /Helvetica >> >> >> >>".encode()
+    )
+    for i, text in enumerate(page_texts):
+        content = f"BT /F1 10 Tf 20 800 Td ({text}) Tj ET".encode()
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Contents {4 + 2 * i} 0 R >>".encode())
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+    
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    pdf += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF".encode()
+    return pdf
+
+def test_pdf_extraction():
+    """Test Q: PDF Extraction (page order across parallel ranges, stops at the character budget)"""
+    try:
+        import file_analyzer
+        from file_analyzer import FileAnalyzer
+        
+        page_texts = [f"Page {i + 1} of the quarterly report" for i in range(12)]
+        pdf = make_test_pdf(page_texts)
+        analyzer = FileAnalyzer()
+        
+        # Small ranges on two workers, so the document spans several waves
+        saved = (file_analyzer.FILE_WORKERS, file_analyzer.PDF_PAGES_PER_TASK)
+        file_analyzer.FILE_WORKERS, file_analyzer.PDF_PAGES_PER_TASK = 2, 2
+        try:
+            full = analyzer.extract_pdf_text(pdf)
+            # Budget met within the first wave - later ranges are never submitted
+            pages = analyzer._collect_pdf_pages(pdf, len(page_texts), max_chars=60)
+            budgeted = analyzer.extract_pdf_text(pdf, max_chars=60)
+        finally:
+            file_analyzer.FILE_WORKERS, file_analyzer.PDF_PAGES_PER_TASK = saved
+            file_analyzer.shutdown_process_pool()
+        
+        in_order = [full.index(f"[Page {i + 1}]") for i in range(12)] == sorted(full.index(f"[Page {i + 1}]") for i in range(12))
+        if in_order and [num for num, _ in pages] == [1, 2] and len(budgeted) == 60 and budgeted.startswith("[Page 1]"):
+            print(f"  ✓ 12 pages extracted in order; 60-char budget read {len(pages)} pages")
+            results['passed'].append('Q: PDF Extraction')
+            return True
+        else:
+            print(f"  ❌ Unexpected: pages={pages} budgeted={budgeted!r}")
+            results['failed'].append('Q: PDF Extraction')
+            return False
+    
+    except Exception as e:
+        print(f"  ❌ Error: {e}")
+        results['failed'].append('Q: PDF Extraction')
+        return False
+
+def test_ocr_backpressure():
+    """Test R: OCR Backpressure (full queue rejected, slots released after failures)"""
+    try:
+        import file_analyzer
+        from file_analyzer import FileAnalyzer, AnalyzerBusyError
+        
+        saved = file_analyzer.FILE_WORKERS
+        file_analyzer.FILE_WORKERS = 0  # OCR in this thread, no pool needed
+        try:
+            analyzer = FileAnalyzer()
+            capacity = 1 + file_analyzer.OCR_QUEUE_SIZE
+            
+            # Occupy every running/queued slot - the next job is turned away at once
+            for _ in range(capacity):
+                analyzer._ocr_slots.acquire()
+            try:
+                analyzer.extract_image_text(b"\x89PNG\r\n\x1a\n")
+                busy = False
+            except AnalyzerBusyError:
+                busy = True
+            
+            # A job that fails must still give its slot back
+            analyzer._ocr_slots.release()
+            try:
+                analyzer.extract_image_text(b"\x89PNG\r\n\x1a\nnot really an image")
+                failed = False
+            except ValueError:
+                failed = True
+            released = analyzer._ocr_slots.acquire(blocking=False)
+        finally:
+            file_analyzer.FILE_WORKERS = saved
+        
+        if busy and failed and released:
+            print(f"  ✓ Job {capacity + 1} rejected with AnalyzerBusyError; failed job released its slot")
+            results['passed'].append('R: OCR Backpressure')
+            return True
+        else:
+            print(f"  ❌ Unexpected: busy={busy} failed={failed} released={released}")
+            results['failed'].append('R: OCR Backpressure')
+            return False
+    
+    except Exception as e:
+        print(f"  ❌ Error: {e}")
+        results['failed'].append('R: OCR Backpressure')
+        return False
+
+def test_file_cache():
+    """Test S: File Cache (least recently used entries evicted by size)"""
+    try:
+        import tempfile
+        import time
+        from file_analyzer import FileCache
+        
+        with tempfile.TemporaryDirectory() as db_dir:
+            cache = FileCache(os.path.join(db_dir, "files.db"), max_bytes=2500)
+            cache.put("a" * 64, "pdf", "x" * 1000)
+            time.sleep(0.01)
+            cache.put("b" * 64, "pdf", "y" * 1000)
+            time.sleep(0.01)
+            
+            # Touch the older entry so the other one is now least recently used
+            cache.get("a" * 64)
+            time.sleep(0.01)
+            cache.put_chunk_summaries({"chunk-1": "z" * 1000})
+            
+            kept_a = cache.get("a" * 64) is not None
+            kept_b = cache.get("b" * 64) is not None
+            stats = cache.get_stats()
+        
+        if kept_a and not kept_b and stats['evictions'] == 1 and stats['bytes'] <= 2500:
+            print(f"  ✓ Evicted the least recently used file; {stats['bytes']}/{stats['max_bytes']} bytes kept")
+            results['passed'].append('S: File Cache')
+            return True
+        else:
+            print(f"  ❌ Unexpected: kept_a={kept_a} kept_b={kept_b} stats={stats}")
+            results['failed'].append('S: File Cache')
+            return False
+    
+    except Exception as e:
+        print(f"  ❌ Error: {e}")
+        results['failed'].append('S: File Cache')
+        return False
+
+def test_upload_limits():
+    """Test T: Upload Limits (413 by Content-Length and chunked, inside CORS; streamed spool)"""
+    try:
+        import hashlib
+        from fastapi import FastAPI, Request
+        from fastapi.middleware.cors import CORSMiddleware
+        from fastapi.testclient import TestClient
+        from uploads import UploadSizeLimitMiddleware, receive_upload, discard_upload
+        
+        app = FastAPI()
+        app.add_middleware(UploadSizeLimitMiddleware, path="/upload", max_bytes=64 * 1024)
+        app.add_middleware(CORSMiddleware, allow_origins=["http://localhost"])
+        
+        @app.post("/upload")
+        async def upload(request: Request):
+            # Spool limits above the middleware's, so oversize bodies must be stopped by it
+            spool = await receive_upload(request, max_bytes=1024 * 1024, spool_bytes=4 * 1024)
+            source, sha256 = spool.finish()
+            on_disk = isinstance(source, str)
+            discard_upload(source)
+            return {"filename": spool.filename, "sha256": sha256, "on_disk": on_disk}
+        
+        pdf = b"%PDF-1.4\n" + b"0" * 10000
+        body = (b'--xx\r\nContent-Disposition: form-data; name="file"; filename="big.pdf"\r\n\r\n'
+                + b"%PDF-1.4\n" + b"0" * 100 * 1024 + b"\r\n--xx--\r\n")
+        
+        def chunked():
+            # A generator body is sent without Content-Length
+            for start in range(0, len(body), 8192):
+                yield body[start:start + 8192]
+        
+        headers = {"origin": "http://localhost"}
+        with TestClient(app) as client:
+            ok = client.post("/upload", files={"file": ("doc.pdf", pdf)}, headers=headers)
+            declared = client.post("/upload", content=body, headers={**headers, "content-type": "multipart/form-data; boundary=xx"})
+            streamed = client.post("/upload", content=chunked(), headers={**headers, "content-type": "multipart/form-data; boundary=xx"})
+            wrong_type = client.post("/upload", files={"file": ("notes.pdf", b"plain text, not a PDF")})
+        
+        cors = all(r.headers.get("access-control-allow-origin") == "http://localhost" for r in (declared, streamed))
+        spooled = ok.status_code == 200 and ok.json() == {
+            "filename": "doc.pdf", "sha256": hashlib.sha256(pdf).hexdigest(), "on_disk": True
+        }
+        if spooled and declared.status_code == 413 and streamed.status_code == 413 and cors and wrong_type.status_code == 415:
+            print(f"  ✓ Oversize uploads -> 413 (Content-Length and chunked, with CORS headers); bad type -> 415")
+            results['passed'].append('T: Upload Limits')
+            return True
+        else:
+            print(f"  ❌ Unexpected: ok={ok.status_code} {ok.text} declared={declared.status_code} "
+                  f"streamed={streamed.status_code} cors={cors} wrong_type={wrong_type.status_code}")
+            results['failed'].append('T: Upload Limits')
+            return False
+    
+    except Exception as e:
+        print(f"  ❌ Error: {e}")
+        results['failed'].append('T: Upload Limits')
+        return False
+
+def test_document_summarizer():
+    """Test U: Document Summarizer (one call for a document that fits a chunk, map-reduce otherwise)"""
+    try:
+        import asyncio
+        import types
+        from document_summarizer import DocumentSummarizer
+        
+        prompts = []
+        
+        async def create(**kwargs):
+            prompts.append(kwargs["messages"][-1]["content"])
+            message = types.SimpleNamespace(content=f"summary {len(prompts)}")
+            return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+        
+        client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=create)))
+        summarizer = DocumentSummarizer(client, model="test-model", chunk_tokens=1500)
+        
+        # ~2900 characters in short paragraphs - well under the 1500-token chunk size
+        short = "\n\n".join(f"Clause {i}: the parties agree to the terms set out below." for i in range(50))
+        asyncio.run(summarizer.summarize(short, "pdf"))
+        short_calls = len(prompts)
+        
+        prompts.clear()
+        long = "\n\n".join(f"Section {i}: " + "revenue grew in every region " * 10 for i in range(200))
+        asyncio.run(summarizer.summarize(long, "pdf"))
+        long_calls = len(prompts)
+        
+        if short_calls == 1 and long_calls > 2:
+            print(f"  ✓ Short document ({len(short)} chars) -> 1 call; long document -> {long_calls} calls")
+            results['passed'].append('U: Document Summarizer')
+            return True
+        else:
+            print(f"  ❌ Unexpected calls: short={short_calls} long={long_calls}")
+            results['failed'].append('U: Document Summarizer')
+            return False
+    
+    except Exception as e:
+        print(f"  ❌ Error: {e}")
+        results['failed'].append('U: Document Summarizer')
+        return False
+
+def test_document_recall():
+    """Test V: Document Recall (passages only for questions about the document)"""
+    try:
+        import tempfile
+        from memory import JarvisMemory
+        
+        contract = "\n\n".join([
+            "This Service Agreement is entered into by Acme Corporation, a company registered in the city "
+            "of London, and Stark Industries. The term of the agreement is two years from the effective date.",
+            "Termination. Either party may terminate this agreement with thirty days written notice to the "
+            "other party. In the event of a material breach, the other party may terminate immediately.",
+            "Payment. The client shall pay all invoices within fifteen days of receipt. Late payments accrue "
+            "interest at the rate of one percent per month.",
+            "Governing law. This agreement is governed by the laws of England and Wales, and the courts of "
+            "London have exclusive jurisdiction.",
+        ])
+        
+        with tempfile.TemporaryDirectory() as data_dir:
+            memory = JarvisMemory(
+                db_path=os.path.join(data_dir, "memory.db"),
+                chroma_path=os.path.join(data_dir, "chroma"),
+                index_path=os.path.join(data_dir, "vectors"),
+                document_index_path=os.path.join(data_dir, "documents"),
+            )
+            memory.passage_tokens = 60  # About one passage per clause
+            memory.store_document("contract-sha", "acme_services.pdf", "pdf", contract)
+            
+            unrelated = [
+                memory.recall_documents(query)
+                for query in ("what is the weather in the city of london", "what is the time in new york",
+                              "give me the weather report", "what is the trade agreement")
+            ]
+            on_topic = memory.recall_documents("what did the document say about termination")
+            by_filename = memory.recall_documents("when can acme terminate")
+        
+        if not any(unrelated) and on_topic and "terminate this agreement" in on_topic[0]['content'] and by_filename:
+            print(f"  ✓ Unrelated questions recall nothing; termination clause found (score {on_topic[0]['relevance_score']:.2f})")
+            results['passed'].append('V: Document Recall')
+            return True
+        else:
+            print(f"  ❌ Unexpected: unrelated={unrelated} on_topic={on_topic[:1]} by_filename={by_filename[:1]}")
+            results['failed'].append('V: Document Recall')
+            return False
+    
+    except Exception as e:
+        print(f"  ❌ Error: {e}")
+        results['failed'].append('V: Document Recall')
+        return False
+
+def test_memory_warmup():
+    """Test W: Memory Warm-up (writes never wait on the semantic backend; indexed once it loads)"""
+    try:
+        import tempfile
+        import threading
+        import time
+        from memory import JarvisMemory
+        
+        release = threading.Event()
+        
+        class SlowLoadingMemory(JarvisMemory):
+            def _init_chroma(self):
+                release.wait(timeout=10)
+                super()._init_chroma()
+        
+        with tempfile.TemporaryDirectory() as data_dir:
+            memory = SlowLoadingMemory(
+                db_path=os.path.join(data_dir, "memory.db"),
+                chroma_path=os.path.join(data_dir, "chroma"),
+                index_path=os.path.join(data_dir, "vectors"),
+                document_index_path=os.path.join(data_dir, "documents"),
+                background_init=True
+            )
+            
+            start = time.perf_counter()
+            memory.store_messages([
+                {"role": "user", "content": "My favourite colour is green"},
+                {"role": "assistant", "content": "Noted, sir."},
+            ])
+            memory.store_summary("User likes green")
+            store_seconds = time.perf_counter() - start
+            saved_while_loading = len(memory.get_recent(limit=10))
+            
+            release.set()
+            deadline = time.monotonic() + 10
+            while memory._deferred_semantic is not None and time.monotonic() < deadline:
+                time.sleep(0.05)
+            indexed = memory.get_stats().get('vector_embeddings', 0)
+            summaries = memory.get_summaries()
+        
+        if store_seconds < 1 and saved_while_loading == 2 and indexed == 2 and summaries == ["User likes green"]:
+            print(f"  ✓ Stored in {store_seconds * 1000:.0f}ms while loading; {indexed} messages indexed after warm-up")
+            results['passed'].append('W: Memory Warm-up')
+            return True
+        else:
+            print(f"  ❌ Unexpected: store={store_seconds:.1f}s saved={saved_while_loading} indexed={indexed} summaries={summaries}")
+            results['failed'].append('W: Memory Warm-up')
+            return False
+    
+    except Exception as e:
+        print(f"  ❌ Error: {e}")
+        results['failed'].append('W: Memory Warm-up')
+        return False
+
+def test_deferred_suggestions():
+    """Test X: Deferred Suggestions (served by any worker, generated once)"""
+    try:
+        import asyncio
+        import tempfile
+        from types import SimpleNamespace
+        from post_processing import SuggestionManager
+        
+        calls = []
+        
+        async def create(**kwargs):
+            calls.append(kwargs)
+            await asyncio.sleep(0.2)
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="Shall I book it?"))])
+        
+        client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        
+        async def run(db_path):
+            worker_1 = SuggestionManager(client, budget=3, db_path=db_path)
+            worker_2 = SuggestionManager(client, budget=3, db_path=db_path)
+            slot_id = worker_1.defer([{"role": "user", "content": "Find me a flight"}], "")
+            unknown = worker_2.get_deferred("missing")
+            # Both workers are asked at once - only one generates, the other waits for its result
+            fetched = await asyncio.gather(worker_2.wait_deferred(slot_id), worker_1.wait_deferred(slot_id))
+            return unknown, fetched, worker_1.get_deferred(slot_id)
+        
+        with tempfile.TemporaryDirectory() as db_dir:
+            unknown, fetched, slot = asyncio.run(run(os.path.join(db_dir, "suggestions.db")))
+        
+        if unknown is None and fetched == ["Shall I book it?"] * 2 and slot["status"] == "ready" and len(calls) == 1:
+            print(f"  ✓ Suggestion deferred by one worker served by both with {len(calls)} LLM call")
+            results['passed'].append('X: Deferred Suggestions')
+            return True
+        else:
+            print(f"  ❌ Unexpected: unknown={unknown} fetched={fetched} slot={slot} calls={len(calls)}")
+            results['failed'].append('X: Deferred Suggestions')
+            return False
+    
+    except Exception as e:
+        print(f"  ❌ Error: {e}")
+        results['failed'].append('X: Deferred Suggestions')
+        return False
+
 def print_summary():
     """Print test summary"""
     print("\n" + "="*60)
@@ -176,6 +936,54 @@ if __name__ == "__main__":
     print("\n[Test E] File Analyzer")
     test_file_analyzer()
     
+    print("\n[Test I] Vector Index")
+    test_vector_index()
+    
+    print("\n[Test J] Response Cache")
+    test_response_cache()
+    
+    print("\n[Test K] Document Chunking")
+    test_document_chunking()
+    
+    print("\n[Test L] Prompt Builder")
+    test_prompt_builder()
+    
+    print("\n[Test M] Session Store")
+    test_session_store()
+    
+    print("\n[Test N] Vector Index Workers")
+    test_vector_index_workers()
+    
+    print("\n[Test O] Embedding Cache")
+    test_embedding_cache()
+    
+    print("\n[Test P] Tool Result Cache")
+    test_tool_result_cache()
+    
+    print("\n[Test Q] PDF Extraction")
+    test_pdf_extraction()
+    
+    print("\n[Test R] OCR Backpressure")
+    test_ocr_backpressure()
+    
+    print("\n[Test S] File Cache")
+    test_file_cache()
+    
+    print("\n[Test T] Upload Limits")
+    test_upload_limits()
+    
+    print("\n[Test U] Document Summarizer")
+    test_document_summarizer()
+    
+    print("\n[Test V] Document Recall")
+    test_document_recall()
+    
+    print("\n[Test W] Memory Warm-up")
+    test_memory_warmup()
+    
+    print("\n[Test X] Deferred Suggestions")
+    test_deferred_suggestions()
+    
     print_summary()
     
     # Note: Tests A, B, F, H require full server/app integration
@@ -3,17 +3,332 @@ Tool Manager for J.A.R.V.I.S
 Provides web search, weather, and system status tools with intent detection
 """
 
-import requests
-from bs4 import BeautifulSoup
-import bleach
+import asyncio
+import importlib.util
 import os
 import logging
-from typing import Dict, List, Optional
+import re
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
 import random
 from datetime import datetime
 
+import httpx
+
 logger = logging.getLogger(__name__)
 
+# Keywords that frame a question rather than name a topic - they lose to a
+# topic keyword ("what is the weather" is a weather request). Default weight is 1.0.
+INTENT_KEYWORD_WEIGHTS = {
+    'what is': 0.5,
+    'who is': 0.5,
+    'find': 0.5,
+    'tell me about': 0.75,
+    'information about': 0.75,
+    'learn about': 0.75,
+    'hot': 0.5,
+    'cold': 0.5,
+    'system': 0.5,
+}
+
+# Inflections accepted after any keyword ("forecasts", "raining", "rainy")
+INTENT_SUFFIX = r"(?:s|es|ed|ing|y)?"
+
+def build_keyword_pattern(keywords: List[str]) -> str:
+    """
+    Build a prefix-factored regex alternation from keywords
+    
+    Keywords sharing a prefix share a branch ("system status" / "system info"
+    become "system\\s+(?:info|status)"), so matching cost per character stays
+    flat as the keyword list grows instead of retrying every alternative.
+    
+    Args:
+        keywords: Lowercase keywords or phrases
+        
+    Returns:
+        Regex source (without grouping or boundaries)
+    """
+    trie: Dict = {}
+    for keyword in keywords:
+        node = trie
+        for char in " ".join(keyword.split()):
+            node = node.setdefault(char, {})
+        node[''] = {}
+    
+    def emit(node: Dict) -> str:
+        branches = [
+            (r"\s+" if char == " " else re.escape(char)) + emit(child)
+            for char, child in sorted(node.items()) if char
+        ]
+        if not branches:
+            return ""
+        if len(branches) == 1 and '' not in node:
+            return branches[0]
+        group = "(?:" + "|".join(branches) + ")"
+        return group + "?" if '' in node else group
+    
+    return emit(trie)
+
+# Status codes worth retrying - rate limiting and transient upstream failures
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class ToolHTTPClient:
+    """
+    Shared async HTTP client for tool calls
+    
+    One keep-alive connection pool (HTTP/2 when the h2 package is installed)
+    is reused across requests, so repeat calls skip DNS, TCP and TLS setup.
+    Requests are retried on timeouts, connection errors and 429/5xx with
+    jittered exponential backoff, and a per-host semaphore keeps a burst of
+    users from hammering a single upstream service.
+    """
+    
+    def __init__(self, timeout: float = 10.0, max_retries: int = 2, backoff: float = 0.25,
+                 per_host_limit: int = 4, max_connections: int = 20):
+        """
+        Initialize HTTP client
+        
+        Args:
+            timeout: Per-attempt timeout in seconds
+            max_retries: Retries after the first attempt
+            backoff: Base backoff in seconds (doubled per retry, with jitter)
+            per_host_limit: Max concurrent requests to one host
+            max_connections: Total pooled connections
+        """
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.per_host_limit = per_host_limit
+        self.http2 = importlib.util.find_spec("h2") is not None
+        
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout, connect=min(timeout, 5.0)),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            http2=self.http2,
+            follow_redirects=True
+        )
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        
+        # Metrics
+        self._requests = 0
+        self._retries = 0
+        self._failures = 0
+    
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).hostname or ""
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._host_limits[host]
+    
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """Full-jitter exponential backoff, honoring a short Retry-After"""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit() and int(retry_after) <= 5:
+                return float(retry_after)
+        return random.uniform(0, self.backoff * (2 ** attempt))
+    
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        """
+        GET with retries and per-host concurrency limiting
+        
+        Args:
+            url: Request URL
+            **kwargs: Passed to httpx.AsyncClient.get (params, headers, ...)
+            
+        Returns:
+            Final response (raise_for_status is left to the caller)
+        """
+        async with self._host_limit(url):
+            for attempt in range(self.max_retries + 1):
+                self._requests += 1
+                try:
+                    response = await self.client.get(url, **kwargs)
+                except (httpx.TimeoutException, httpx.TransportError) as e:
+                    if attempt == self.max_retries:
+                        self._failures += 1
+                        raise
+                    delay = self._retry_delay(attempt)
+                    logger.warning(f"Tool request to {url} failed ({type(e).__name__}) - retrying in {delay:.2f}s")
+                else:
+                    if response.status_code not in RETRY_STATUS_CODES or attempt == self.max_retries:
+                        return response
+                    delay = self._retry_delay(attempt, response)
+                    logger.warning(f"Tool request to {url} returned {response.status_code} - retrying in {delay:.2f}s")
+                
+                self._retries += 1
+                await asyncio.sleep(delay)
+    
+    async def aclose(self):
+        """Close pooled connections"""
+        await self.client.aclose()
+    
+    def get_stats(self) -> Dict:
+        """Get client metrics"""
+        return {
+            'http2': self.http2,
+            'requests': self._requests,
+            'retries': self._retries,
+            'failures': self._failures,
+        }
+
+class ToolResultCache:
+    """
+    Bounded TTL cache for tool results with single-flight coalescing
+    
+    Concurrent lookups for the same (tool, key) share one upstream call: the
+    first caller starts a fetch task and the rest await the same task. Only
+    successful results are cached, so errors are retried on the next request.
+    """
+    
+    def __init__(self, ttls: Dict[str, float], max_entries: int = 256):
+        """
+        Initialize tool result cache
+        
+        Args:
+            ttls: Seconds results stay fresh, per tool name (missing or 0 = no caching)
+            max_entries: Oldest entries are evicted past this size
+        """
+        self.ttls = ttls
+        self.max_entries = max_entries
+        
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Dict]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+        
+        # Metrics
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._evictions = 0
+    
+    async def get_or_fetch(self, tool_name: str, key: str, fetch: Callable[[], Awaitable[Dict]]) -> Dict:
+        """
+        Return a fresh cached result or fetch it (once for all concurrent callers)
+        
+        Args:
+            tool_name: Tool name, selects the TTL
+            key: Lookup key (case and whitespace are folded)
+            fetch: Coroutine function that performs the upstream call
+            
+        Returns:
+            Tool result dictionary
+        """
+        cache_key = (tool_name, " ".join(key.lower().split()))
+        
+        entry = self._entries.get(cache_key)
+        if entry and entry[0] > time.monotonic():
+            self._entries.move_to_end(cache_key)
+            self._hits += 1
+            return dict(entry[1])
+        
+        task = self._inflight.get(cache_key)
+        if task is None:
+            self._misses += 1
+            task = asyncio.ensure_future(fetch())
+            self._inflight[cache_key] = task
+            task.add_done_callback(lambda done: self._finish(cache_key, done))
+        else:
+            self._coalesced += 1
+        
+        # Shielded so a caller timing out doesn't cancel the fetch others are waiting on
+        return dict(await asyncio.shield(task))
+    
+    def _finish(self, cache_key: Tuple[str, str], task: asyncio.Task):
+        """Store a completed fetch and release its in-flight slot"""
+        self._inflight.pop(cache_key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        
+        result = task.result()
+        ttl = self.ttls.get(cache_key[0], 0)
+        if ttl > 0 and result and result.get('success'):
+            self._entries[cache_key] = (time.monotonic() + ttl, result)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+    
+    def clear(self):
+        """Remove all cached results"""
+        self._entries.clear()
+    
+    def get_stats(self) -> Dict:
+        """Get cache metrics"""
+        lookups = self._hits + self._misses + self._coalesced
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self._hits,
+            'misses': self._misses,
+            'coalesced': self._coalesced,
+            'evictions': self._evictions,
+            'hit_rate': round((self._hits + self._coalesced) / lookups, 3) if lookups else 0.0,
+        }
+
+def format_search_result(result: Dict) -> str:
+    """Format web search results for LLM context"""
+    formatted = f"Search query: {result.get('query', 'N/A')}\n"
+    formatted += f"Found {result.get('count', 0)} results:\n\n"
+    for i, item in enumerate(result.get('results', []), 1):
+        formatted += f"{i}. {item['title']}\n"
+        formatted += f"   {item['snippet']}\n"
+        formatted += f"   URL: {item['url']}\n\n"
+    return formatted
+
+def format_weather_result(result: Dict) -> str:
+    """Format weather data for LLM context"""
+    formatted = f"Weather for {result.get('city', 'Unknown')}, {result.get('country', '')}\n"
+    formatted += f"Temperature: {result.get('temperature', 'N/A')}°C (feels like {result.get('feels_like', 'N/A')}°C)\n"
+    formatted += f"Conditions: {result.get('description', 'N/A')}\n"
+    formatted += f"Humidity: {result.get('humidity', 'N/A')}%\n"
+    formatted += f"Wind speed: {result.get('wind_speed', 'N/A')} m/s\n"
+    if 'note' in result:
+        formatted += f"\nNote: {result['note']}\n"
+    return formatted
+
+def format_system_status(result: Dict) -> str:
+    """Format a system status report for LLM context"""
+    formatted = f"System Status Report - {result.get('timestamp', 'N/A')}\n\n"
+    devices = result.get('devices', {})
+    for device_name, device_info in devices.items():
+        formatted += f"{device_name.replace('_', ' ').title()}:\n"
+        for key, value in device_info.items():
+            formatted += f"  {key.replace('_', ' ').title()}: {value}\n"
+        formatted += "\n"
+    formatted += f"Overall: {result.get('overall_status', 'Unknown')}\n"
+    return formatted
+
+class Tool:
+    """Registry entry: how a tool is triggered, gated, run, cached and shown to the LLM"""
+    
+    def __init__(self, name: str, keywords: List[str], handler: Callable[[str], Awaitable[Dict]],
+                 permission: Optional[str] = None, timeout: float = 10.0, cache_ttl: float = 0.0,
+                 cache_key: Optional[Callable[[str], str]] = None,
+                 formatter: Optional[Callable[[Dict], str]] = None):
+        """
+        Describe a tool
+        
+        Args:
+            name: Unique tool name (also the intent name)
+            keywords: Intent keywords/phrases that trigger the tool
+            handler: Coroutine function taking the user's input and returning a
+                result dict with a 'success' flag
+            permission: Permission key (from the X-Permissions header) required to run it
+            timeout: Seconds before the call is abandoned
+            cache_ttl: Seconds successful results are reused (0 = never cached)
+            cache_key: Derives the cache key from the input (default: the input itself)
+            formatter: Renders a successful result for the system prompt (default: str)
+        """
+        self.name = name
+        self.keywords = keywords
+        self.handler = handler
+        self.permission = permission
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.cache_key = cache_key
+        self.formatter = formatter
+
 class ToolManager:
     """Manages external tools and services for J.A.R.V.I.S"""
     
@@ -21,21 +336,88 @@ class ToolManager:
         """Initialize tool manager"""
         self.openweather_api_key = os.getenv("OPENWEATHER_API_KEY")
         
-        # Intent keywords for tool detection
-        self.intent_keywords = {
-            'web_search': [
+        # TTLs are filled in per tool as tools register
+        self.cache = ToolResultCache(ttls={}, max_entries=int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "256")))
+        
+        # Pooled keep-alive client shared by all tool calls (closed on app shutdown)
+        self.http = ToolHTTPClient(
+            timeout=float(os.getenv("TOOL_HTTP_TIMEOUT", "10")),
+            max_retries=int(os.getenv("TOOL_HTTP_RETRIES", "2")),
+            per_host_limit=int(os.getenv("TOOL_HTTP_PER_HOST_LIMIT", "4"))
+        )
+        
+        # Besides the top-ranked intent, tools scoring at least this much also run
+        self.secondary_min_score = 1.0
+        self.max_tools_per_request = int(os.getenv("TOOL_MAX_PER_REQUEST", "3"))
+        
+        # Tool registry and intent keywords derived from it
+        self.tools: Dict[str, Tool] = {}
+        self.intent_keywords: Dict[str, List[str]] = {}
+        self._register_builtin_tools()
+    
+    def register(self, tool: Tool):
+        """
+        Add (or replace) a tool and recompile intent detection
+        
+        Args:
+            tool: Tool description
+        """
+        self.tools[tool.name] = tool
+        self.intent_keywords[tool.name] = list(tool.keywords)
+        self.cache.ttls[tool.name] = tool.cache_ttl
+        self._compile_intents()
+        logger.info(f"Registered tool: {tool.name} ({len(tool.keywords)} keywords)")
+    
+    def _register_builtin_tools(self):
+        """Register web search, weather and system status"""
+        self.register(Tool(
+            name='web_search',
+            keywords=[
                 'search', 'find', 'look up', 'google', 'what is', 'who is',
                 'tell me about', 'information about', 'learn about'
             ],
-            'weather': [
+            handler=lambda user_input: self.web_search(self._extract_search_query(user_input)),
+            permission='web_internet',
+            timeout=8.0,
+            cache_ttl=float(os.getenv("TOOL_CACHE_SEARCH_TTL", "10800")),  # Results change within hours
+            cache_key=self._extract_search_query,
+            formatter=format_search_result
+        ))
+        self.register(Tool(
+            name='weather',
+            keywords=[
                 'weather', 'temperature', 'forecast', 'rain', 'sunny',
                 'climate', 'hot', 'cold', 'degrees'
             ],
-            'system_status': [
+            handler=lambda user_input: self.get_weather(self._extract_city(user_input)),
+            permission='web_internet',
+            timeout=6.0,
+            cache_ttl=float(os.getenv("TOOL_CACHE_WEATHER_TTL", "600")),  # Changes within minutes
+            cache_key=self._extract_city,
+            formatter=format_weather_result
+        ))
+        self.register(Tool(
+            name='system_status',
+            keywords=[
                 'system status', 'device status', 'system info', 'diagnostics',
                 'check system', 'system health', 'status report'
-            ]
-        }
+            ],
+            handler=self._system_status_handler,
+            permission='sensors',
+            timeout=2.0,
+            formatter=format_system_status
+        ))
+    
+    def _compile_intents(self):
+        """Compile intent_keywords into one word-bounded matcher (call again after editing them)"""
+        self._keyword_tools: Dict[str, List[str]] = {}
+        for tool_name, keywords in self.intent_keywords.items():
+            for keyword in keywords:
+                normalized = " ".join(keyword.lower().split())
+                self._keyword_tools.setdefault(normalized, []).append(tool_name)
+        
+        pattern = build_keyword_pattern(list(self._keyword_tools))
+        self._intent_pattern = re.compile(rf"\b({pattern}){INTENT_SUFFIX}\b") if pattern else None
     
     def sanitize_text(self, text: str) -> str:
         """
@@ -50,6 +432,8 @@ class ToolManager:
         if not text:
             return ""
         
+        import bleach  # Lazy import - keeps server startup fast
+        
         # Remove all HTML tags and scripts
         cleaned = bleach.clean(
             text,
@@ -64,6 +448,32 @@ class ToolManager:
         
         return cleaned.strip()
     
+    def rank_intents(self, user_input: str) -> List[Tuple[str, float]]:
+        """
+        Score every tool whose keywords appear in the input (single regex pass)
+        
+        Args:
+            user_input: User's input text
+            
+        Returns:
+            List of (tool_name, score) tuples, best first. A tool scores the sum
+            of its matched keyword weights; multi-word keywords count extra.
+        """
+        if not self._intent_pattern:
+            return []
+        
+        scores: Dict[str, float] = {}
+        longest: Dict[str, int] = {}
+        for match in self._intent_pattern.finditer(user_input.lower()):
+            keyword = " ".join(match.group(1).split())
+            weight = INTENT_KEYWORD_WEIGHTS.get(keyword, 1.0 + 0.25 * keyword.count(" "))
+            for tool_name in self._keyword_tools.get(keyword, []):
+                scores[tool_name] = scores.get(tool_name, 0.0) + weight
+                longest[tool_name] = max(longest.get(tool_name, 0), len(keyword))
+        
+        # Ties go to the tool with the more specific (longer) keyword
+        return sorted(scores.items(), key=lambda item: (-item[1], -longest[item[0]]))
+    
     def detect_intent(self, user_input: str) -> Optional[str]:
         """
         Detect user intent from input
@@ -72,20 +482,16 @@ class ToolManager:
             user_input: User's input text
             
         Returns:
-            Detected tool name or None
+            Highest-ranked tool name or None
         """
-        user_input_lower = user_input.lower()
-        
-        # Check each intent category
-        for tool_name, keywords in self.intent_keywords.items():
-            for keyword in keywords:
-                if keyword in user_input_lower:
-                    logger.info(f"Detected intent: {tool_name} (keyword: {keyword})")
-                    return tool_name
+        ranked = self.rank_intents(user_input)
+        if not ranked:
+            return None
         
-        return None
+        logger.info(f"Detected intent: {ranked[0][0]} (scores: {ranked})")
+        return ranked[0][0]
     
-    def web_search(self, query: str) -> Dict:
+    async def web_search(self, query: str) -> Dict:
         """
         Perform web search and return top 3 results
         
@@ -108,44 +514,17 @@ class ToolManager:
             logger.info(f"Performing web search: {query}")
             
             # Use DuckDuckGo HTML (no API key required)
-            search_url = f"https://html.duckduckgo.com/html/?q={requests.utils.quote(query)}"
+            search_url = "https://html.duckduckgo.com/html/"
             
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
             }
             
-            response = requests.get(search_url, headers=headers, timeout=10)
+            response = await self.http.get(search_url, params={'q': query}, headers=headers)
             response.raise_for_status()
             
-            # Parse HTML
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Extract search results
-            results = []
-            result_divs = soup.find_all('div', class_='result', limit=3)
-            
-            for div in result_divs:
-                try:
-                    # Get title
-                    title_elem = div.find('a', class_='result__a')
-                    title = self.sanitize_text(title_elem.get_text()) if title_elem else "No title"
-                    
-                    # Get URL
-                    url = title_elem.get('href', '') if title_elem else ''
-                    
-                    # Get snippet
-                    snippet_elem = div.find('a', class_='result__snippet')
-                    snippet = self.sanitize_text(snippet_elem.get_text()) if snippet_elem else ""
-                    
-                    if title and url:
-                        results.append({
-                            'title': title,
-                            'url': url,
-                            'snippet': snippet
-                        })
-                except Exception as e:
-                    logger.warning(f"Error parsing search result: {e}")
-                    continue
+            # HTML parsing is CPU-bound - keep it off the event loop
+            results = await asyncio.to_thread(self._parse_search_results, response.text)
             
             if not results:
                 return {
@@ -162,7 +541,7 @@ class ToolManager:
                 'count': len(results)
             }
             
-        except requests.Timeout:
+        except httpx.TimeoutException:
             logger.error("Web search timed out")
             return {
                 'success': False,
@@ -175,7 +554,41 @@ class ToolManager:
                 'error': f'Search failed: {str(e)}'
             }
     
-    def get_weather(self, city: str) -> Dict:
+    def _parse_search_results(self, html: str) -> List[Dict]:
+        """Extract the top 3 results from DuckDuckGo HTML"""
+        from bs4 import BeautifulSoup  # Lazy import - keeps server startup fast
+        soup = BeautifulSoup(html, 'html.parser')
+        
+        # Extract search results
+        results = []
+        result_divs = soup.find_all('div', class_='result', limit=3)
+        
+        for div in result_divs:
+            try:
+                # Get title
+                title_elem = div.find('a', class_='result__a')
+                title = self.sanitize_text(title_elem.get_text()) if title_elem else "No title"
+                
+                # Get URL
+                url = title_elem.get('href', '') if title_elem else ''
+                
+                # Get snippet
+                snippet_elem = div.find('a', class_='result__snippet')
+                snippet = self.sanitize_text(snippet_elem.get_text()) if snippet_elem else ""
+                
+                if title and url:
+                    results.append({
+                        'title': title,
+                        'url': url,
+                        'snippet': snippet
+                    })
+            except Exception as e:
+                logger.warning(f"Error parsing search result: {e}")
+                continue
+        
+        return results
+    
+    async def get_weather(self, city: str) -> Dict:
         """
         Get weather information for a city
         
@@ -204,14 +617,14 @@ class ToolManager:
             logger.info(f"Fetching weather for: {city}")
             
             # Call OpenWeatherMap API
-            base_url = "http://api.openweathermap.org/data/2.5/weather"
+            base_url = "https://api.openweathermap.org/data/2.5/weather"
             params = {
                 'q': city,
                 'appid': self.openweather_api_key,
                 'units': 'metric'  # Celsius
             }
             
-            response = requests.get(base_url, params=params, timeout=10)
+            response = await self.http.get(base_url, params=params)
             response.raise_for_status()
             
             data = response.json()
@@ -232,13 +645,13 @@ class ToolManager:
             logger.info(f"Weather data retrieved for {city}")
             return weather_info
             
-        except requests.Timeout:
+        except httpx.TimeoutException:
             logger.error("Weather API request timed out")
             return {
                 'success': False,
                 'error': 'Weather request timed out'
             }
-        except requests.HTTPError as e:
+        except httpx.HTTPStatusError as e:
             if e.response.status_code == 404:
                 return {
                     'success': False,
@@ -325,9 +738,12 @@ class ToolManager:
                 'error': f'Failed to get system status: {str(e)}'
             }
     
-    def execute_tool(self, tool_name: str, user_input: str) -> Optional[Dict]:
+    async def _system_status_handler(self, user_input: str) -> Dict:
+        return self.get_system_status()
+    
+    async def execute_tool(self, tool_name: str, user_input: str) -> Optional[Dict]:
         """
-        Execute a tool based on detected intent
+        Execute a registered tool, through its cache policy and timeout
         
         Args:
             tool_name: Name of tool to execute
@@ -336,24 +752,26 @@ class ToolManager:
         Returns:
             Tool execution result or None
         """
+        tool = self.tools.get(tool_name)
+        if not tool:
+            logger.warning(f"Unknown tool: {tool_name}")
+            return None
+        
+        def fetch():
+            return asyncio.wait_for(tool.handler(user_input), timeout=tool.timeout)
+        
         try:
-            if tool_name == 'web_search':
-                # Extract search query from input
-                query = self._extract_search_query(user_input)
-                return self.web_search(query)
-            
-            elif tool_name == 'weather':
-                # Extract city from input
-                city = self._extract_city(user_input)
-                return self.get_weather(city)
-            
-            elif tool_name == 'system_status':
-                return self.get_system_status()
-            
-            else:
-                logger.warning(f"Unknown tool: {tool_name}")
-                return None
-                
+            if tool.cache_ttl > 0:
+                key = tool.cache_key(user_input) if tool.cache_key else user_input
+                return await self.cache.get_or_fetch(tool.name, key, fetch)
+            return await fetch()
+            
+        except asyncio.TimeoutError:
+            logger.warning(f"Tool {tool_name} timed out after {tool.timeout}s")
+            return {
+                'success': False,
+                'error': f'{tool_name} timed out'
+            }
         except Exception as e:
             logger.error(f"Tool execution error: {e}")
             return {
@@ -361,6 +779,68 @@ class ToolManager:
                 'error': f'Tool execution failed: {str(e)}'
             }
     
+    def select_tools(self, user_input: str) -> List[str]:
+        """
+        Pick the tools to run for an utterance
+        
+        The top-ranked intent always runs; further intents run too when they
+        score like a real topic match ("weather in Paris and search for flights").
+        
+        Args:
+            user_input: User's input text
+            
+        Returns:
+            Registered tool names, best first
+        """
+        ranked = [(name, score) for name, score in self.rank_intents(user_input) if name in self.tools]
+        selected = [name for i, (name, score) in enumerate(ranked) if i == 0 or score >= self.secondary_min_score]
+        return selected[:self.max_tools_per_request]
+    
+    def is_allowed(self, tool_name: str, permissions: Dict[str, bool]) -> bool:
+        """Check the tool's declared permission (allowed if it declares none or the key is missing)"""
+        tool = self.tools.get(tool_name)
+        if not tool or not tool.permission:
+            return True
+        return permissions.get(tool.permission, True)
+    
+    async def run_tools(self, user_input: str, permissions: Dict[str, bool]) -> Tuple[List[Tuple[str, Dict]], List[str]]:
+        """
+        Run every selected, permitted tool concurrently
+        
+        Args:
+            user_input: User's input text
+            permissions: Permissions parsed from request headers
+            
+        Returns:
+            Tuple of ([(tool_name, result), ...] in rank order, denied tool names)
+        """
+        selected = self.select_tools(user_input)
+        allowed = [name for name in selected if self.is_allowed(name, permissions)]
+        denied = [name for name in selected if name not in allowed]
+        
+        if allowed:
+            logger.info(f"Executing tools: {allowed}")
+        outcomes = await asyncio.gather(*(self.execute_tool(name, user_input) for name in allowed))
+        return list(zip(allowed, outcomes)), denied
+    
+    def format_result(self, tool_name: str, result: Dict) -> str:
+        """Render a tool result with the tool's formatter"""
+        tool = self.tools.get(tool_name)
+        if tool and tool.formatter:
+            return tool.formatter(result)
+        return str(result)
+    
+    def get_stats(self) -> Dict:
+        """Get tool cache and HTTP client metrics"""
+        return {
+            'cache': self.cache.get_stats(),
+            'http': self.http.get_stats(),
+        }
+    
+    async def aclose(self):
+        """Release pooled HTTP connections"""
+        await self.http.aclose()
+    
     def _extract_search_query(self, user_input: str) -> str:
         """Extract search query from user input"""
         # Remove common search prefixes
@@ -387,6 +867,9 @@ class ToolManager:
                 text = text.split(prefix, 1)[1].strip()
                 break
         
+        # Compound requests ("weather in Paris and search for flights") - keep the first clause
+        text = re.split(r"\s+(?:and|then|also)\s+", text, maxsplit=1)[0]
+        
         # Remove trailing question marks and periods
         text = text.rstrip('?.!')
         
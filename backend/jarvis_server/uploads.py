@@ -0,0 +1,239 @@
+"""
+Upload handling for J.A.R.V.I.S
+Streams multipart file uploads to memory or a temp file, validating as bytes arrive
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+from file_analyzer import detect_file_type, FileSource
+
+logger = logging.getLogger(__name__)
+
+def _too_large_detail(max_bytes: int) -> str:
+    return f"File too large (max {max_bytes // (1024 * 1024)} MB)"
+
+class UploadSizeLimitMiddleware:
+    """
+    Reject uploads over the limit with 413
+    
+    A Content-Length over the limit is rejected before the body is read;
+    bodies are also counted as they arrive, which covers chunked uploads.
+    """
+    
+    def __init__(self, app, path: str, max_bytes: int):
+        """
+        Args:
+            app: ASGI app to wrap
+            path: Request path the limit applies to
+            max_bytes: Largest accepted request body
+        """
+        self.app = app
+        self.path = path
+        self.max_bytes = max_bytes
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] != self.path:
+            await self.app(scope, receive, send)
+            return
+        
+        content_length = dict(scope["headers"]).get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > self.max_bytes:
+            response = JSONResponse(status_code=413, content={"detail": _too_large_detail(self.max_bytes)})
+            await response(scope, receive, send)
+            return
+        
+        received = 0
+        
+        async def counting_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Raised inside the app, so it becomes a normal 413 response
+                    raise HTTPException(status_code=413, detail=_too_large_detail(self.max_bytes))
+            return message
+        
+        await self.app(scope, counting_receive, send)
+
+class UploadSpool:
+    """
+    Receives an upload as it streams in, validating on the way through
+    
+    The type is checked from the leading magic bytes and the size limit is
+    enforced as bytes arrive, so bad uploads are rejected without reading the
+    rest. Small uploads stay in memory; larger ones go to a temp file that
+    extraction memory-maps. The SHA-256 (file cache key) is computed on the
+    way through.
+    """
+    
+    def __init__(self, max_bytes: int, spool_bytes: int):
+        """
+        Args:
+            max_bytes: Largest accepted file
+            spool_bytes: Files larger than this move from memory to disk
+        """
+        self.max_bytes = max_bytes
+        self.spool_bytes = spool_bytes
+        self.filename: Optional[str] = None
+        self.on_disk = False
+        self._digest = hashlib.sha256()
+        self._buffer = bytearray()
+        self._header = b""
+        self._spool = None
+        self._size = 0
+    
+    def write(self, data: bytes):
+        """Add the next bytes of the file"""
+        if not data:
+            return
+        
+        if len(self._header) < 16:
+            self._header += data[:16 - len(self._header)]
+            if len(self._header) == 16:
+                self._check_type()
+        
+        self._size += len(data)
+        if self._size > self.max_bytes:
+            raise HTTPException(status_code=413, detail=_too_large_detail(self.max_bytes))
+        self._digest.update(data)
+        
+        # Past the in-memory threshold, move to disk and keep writing there
+        if self._spool is None and self._size > self.spool_bytes:
+            self._spool = tempfile.NamedTemporaryFile(prefix="jarvis_upload_", delete=False)
+            self._spool.write(self._buffer)
+            self._buffer = bytearray()
+            self.on_disk = True
+        
+        if self._spool is not None:
+            self._spool.write(data)
+        else:
+            self._buffer.extend(data)
+    
+    def finish(self) -> Tuple[FileSource, str]:
+        """
+        Complete the upload
+        
+        Returns:
+            Tuple of (bytes or temp file path, sha256 hex digest)
+        """
+        if self._size == 0:
+            raise HTTPException(status_code=400, detail="Empty file")
+        if len(self._header) < 16:
+            self._check_type()
+        
+        if self._spool is not None:
+            self._spool.close()
+            return self._spool.name, self._digest.hexdigest()
+        return bytes(self._buffer), self._digest.hexdigest()
+    
+    def discard(self):
+        """Delete the temp file of an abandoned upload"""
+        if self._spool is not None:
+            self._spool.close()
+            discard_upload(self._spool.name)
+    
+    def _check_type(self):
+        if detect_file_type(self._header) is None:
+            raise HTTPException(status_code=415, detail="Unsupported file type. Supported: PDF, PNG, JPEG, GIF, BMP, TIFF")
+
+async def receive_upload(request: Request, max_bytes: int, spool_bytes: int, field: str = "file") -> UploadSpool:
+    """
+    Parse a multipart body as it arrives, streaming one file field into an UploadSpool
+    
+    FastAPI's File() parameters spool the whole body to a temp file before the
+    handler runs, so size and type errors would only surface after the full
+    upload and the body would be copied twice. Parsing here writes it once.
+    
+    Args:
+        request: Request with a multipart/form-data body
+        max_bytes: Largest accepted file
+        spool_bytes: Files larger than this move from memory to disk
+        field: Form field holding the file
+    
+    Returns:
+        The received spool (call finish() for the content)
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+    
+    spool = UploadSpool(max_bytes, spool_bytes)
+    part = {"headers": {}, "name": b"", "value": b"", "target": None}
+    found = False
+    
+    def on_part_begin():
+        part.update(headers={}, name=b"", value=b"", target=None)
+    
+    def on_header_field(data, start, end):
+        part["name"] += data[start:end]
+    
+    def on_header_value(data, start, end):
+        part["value"] += data[start:end]
+    
+    def on_header_end():
+        part["headers"][part["name"].lower()] = part["value"]
+        part.update(name=b"", value=b"")
+    
+    def on_headers_finished():
+        nonlocal found
+        _, options = parse_options_header(part["headers"].get(b"content-disposition", b""))
+        # Other fields (and any further files) are skipped
+        if not found and options.get(b"name") == field.encode() and b"filename" in options:
+            found = True
+            spool.filename = options[b"filename"].decode("utf-8", errors="replace")
+            part["target"] = spool
+    
+    def on_part_data(data, start, end):
+        if part["target"] is not None:
+            part["target"].write(data[start:end])
+    
+    parser = MultipartParser(params[b"boundary"], {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+    })
+    
+    try:
+        async for chunk in request.stream():
+            # Disk writes go to a thread so they don't block the event loop
+            if spool.on_disk:
+                await run_in_threadpool(parser.write, chunk)
+            else:
+                parser.write(chunk)
+        parser.finalize()
+    except HTTPException:
+        spool.discard()
+        raise
+    except Exception as e:
+        spool.discard()
+        raise HTTPException(status_code=400, detail=f"Invalid multipart upload: {e}")
+    
+    if not found:
+        spool.discard()
+        raise HTTPException(status_code=400, detail="No file provided")
+    return spool
+
+def discard_upload(source: Optional[FileSource]):
+    """Delete a spooled upload's temp file"""
+    if isinstance(source, str):
+        try:
+            os.remove(source)
+        except OSError as e:
+            logger.warning(f"Could not remove upload temp file {source}: {e}")
@@ -0,0 +1,346 @@
+"""
+Embedded vector index for J.A.R.V.I.S
+Lightweight semantic recall without ChromaDB - normalized float32 vectors in a
+memory-mapped NumPy matrix with vectorized top-k search
+"""
+
+import json
+import logging
+import math
+import os
+import re
+import threading
+import zlib
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Cross-process locking for multi-worker deployments (POSIX only)
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Words that carry no topic - skipped by content-term embedders
+FUNCTION_WORDS = frozenset("""
+    a about all also an and any are as at be been but by can could did do does for from had has have
+    how if in into is it its may might more most must no not of on or shall should so some such than
+    that the their them then there these they this those to up was were what when where which who whom
+    why will with would
+""".split())
+
+class HashingEmbedder:
+    """
+    Dependency-free text embedder using feature hashing
+    
+    Words and character trigrams are hashed into a fixed number of buckets,
+    so related phrasings ("weather in paris" / "paris forecast") share
+    dimensions. Used when sentence-transformers isn't installed.
+    """
+    
+    name = "hashing-v1"
+    
+    def __init__(self, dim: int = 512, content_terms_only: bool = False):
+        """
+        Initialize embedder
+        
+        Args:
+            dim: Embedding dimensionality
+            content_terms_only: Skip FUNCTION_WORDS, so texts that share only
+                words like "what is the ... in the ..." don't score as similar
+        """
+        self.dim = dim
+        self.content_terms_only = content_terms_only
+        if content_terms_only:
+            self.name = "hashing-content-v1"
+        self._token_pattern = re.compile(r"\w+")
+    
+    def _features(self, text: str) -> Dict[str, float]:
+        """Extract weighted word and character trigram features"""
+        counts: Dict[str, float] = {}
+        for word in self._token_pattern.findall(text.lower()):
+            if self.content_terms_only and word in FUNCTION_WORDS:
+                continue
+            counts[f"w:{word}"] = counts.get(f"w:{word}", 0.0) + 1.0
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                gram = f"c:{padded[i:i + 3]}"
+                counts[gram] = counts.get(gram, 0.0) + 0.5
+        # Sublinear term frequency
+        return {feature: 1.0 + math.log(count) if count > 1 else count for feature, count in counts.items()}
+    
+    def encode(self, texts: List[str], normalize_embeddings: bool = True) -> np.ndarray:
+        """
+        Embed texts into float32 vectors (mirrors SentenceTransformer.encode)
+        
+        Args:
+            texts: Texts to embed
+            normalize_embeddings: L2-normalize each vector
+        
+        Returns:
+            Array of shape (len(texts), dim)
+        """
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text).items():
+                # crc32 is stable across processes, unlike hash()
+                h = zlib.crc32(feature.encode("utf-8"))
+                sign = 1.0 if h & 0x80000000 else -1.0
+                vectors[row, h % self.dim] += sign * weight
+        return normalize(vectors) if normalize_embeddings else vectors
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize rows as contiguous float32"""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+class VectorIndex:
+    """
+    Append-only, memory-mapped vector index
+    
+    On-disk layout (in index_path):
+        index.json   - header with dim, embedder name and compaction generation
+        vectors.f32  - row-major float32 matrix, one normalized vector per row
+        meta.jsonl   - one JSON metadata object per row
+        index.lock   - advisory lock shared by worker processes
+    
+    Searches run a single matrix-vector product over the memory-mapped
+    matrix and select top-k with np.argpartition. Each process follows
+    appends made by other workers, and the index is compacted to the newest
+    max_vectors rows once it grows past that bound.
+    """
+    
+    def __init__(self, index_path: str, dim: int, embedder_name: str, max_vectors: Optional[int] = None):
+        """
+        Open (or create) an index
+        
+        Args:
+            index_path: Directory for index files
+            dim: Vector dimensionality
+            embedder_name: Identifier of the embedding model; a mismatch with
+                the stored header resets the index
+            max_vectors: Keep at most this many (newest) vectors; None for unbounded
+        """
+        self.index_path = index_path
+        self.dim = dim
+        self.embedder_name = embedder_name
+        self.max_vectors = max_vectors
+        
+        self._vectors_file = os.path.join(index_path, "vectors.f32")
+        self._meta_file = os.path.join(index_path, "meta.jsonl")
+        self._header_file = os.path.join(index_path, "index.json")
+        self._lock_file = os.path.join(index_path, "index.lock")
+        
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.ndarray] = None  # memmap, refreshed after writes
+        self._metadata: List[Dict] = []
+        self._meta_offset = 0   # Bytes of meta.jsonl already loaded
+        self._generation = 0    # Bumped by compaction/clear so other workers reload
+        
+        os.makedirs(index_path, exist_ok=True)
+        with self._locked(exclusive=True):
+            self._load()
+    
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        """Hold the thread lock plus a cross-process file lock"""
+        with self._lock:
+            with open(self._lock_file, "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def _read_header(self) -> Optional[Dict]:
+        if not os.path.exists(self._header_file):
+            return None
+        with open(self._header_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    
+    def _next_generation(self) -> int:
+        """Generation for a rewrite - past both ours and the one on disk, so every worker reloads"""
+        stored = self._read_header() or {}
+        return max(self._generation, stored.get("generation", 0)) + 1
+    
+    def _write_header(self):
+        tmp_file = self._header_file + ".tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "embedder": self.embedder_name, "generation": self._generation}, f)
+        os.replace(tmp_file, self._header_file)
+    
+    def _load(self):
+        """Load header and metadata, resetting on model/dim mismatch (exclusive lock held)"""
+        stored = self._read_header()
+        
+        if stored is None:
+            self._write_header()
+        elif stored.get("dim") != self.dim or stored.get("embedder") != self.embedder_name:
+            logger.warning(f"Vector index at {self.index_path} built with {stored} - rebuilding for {self.embedder_name}")
+            self._generation = self._next_generation()
+            self._reset_files()
+            self._write_header()
+        else:
+            self._generation = stored.get("generation", 0)
+        
+        self._read_new_metadata()
+        
+        # A crash between the two appends can leave them uneven - keep the common prefix
+        rows = self._vector_rows()
+        if rows != len(self._metadata):
+            count = min(rows, len(self._metadata))
+            logger.warning(f"Vector index out of sync ({rows} vectors, {len(self._metadata)} records) - truncating to {count}")
+            self._rewrite(count)
+        
+        self._remap()
+        logger.info(f"Vector index loaded from {self.index_path} ({len(self._metadata)} vectors)")
+    
+    def _read_new_metadata(self):
+        """Load metadata lines appended since the last read"""
+        if not os.path.exists(self._meta_file):
+            return
+        with open(self._meta_file, "rb") as f:
+            f.seek(self._meta_offset)
+            data = f.read()
+        
+        # Only consume complete lines
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            if line.strip():
+                self._metadata.append(json.loads(line))
+        self._meta_offset += end
+    
+    def _refresh(self):
+        """Pick up appends, compactions and clears made by other workers (lock held)"""
+        header = self._read_header() or {}
+        meta_size = os.path.getsize(self._meta_file) if os.path.exists(self._meta_file) else 0
+        
+        # A new generation or a shrunken metadata file means the files were
+        # rewritten under us - reload from the start
+        if header.get("generation", 0) != self._generation or meta_size < self._meta_offset:
+            self._generation = header.get("generation", 0)
+            self._metadata = []
+            self._meta_offset = 0
+        
+        if meta_size != self._meta_offset or not self._metadata:
+            self._read_new_metadata()
+            self._remap()
+    
+    def _vector_rows(self) -> int:
+        if not os.path.exists(self._vectors_file):
+            return 0
+        return os.path.getsize(self._vectors_file) // (self.dim * 4)
+    
+    def _rewrite(self, count: int):
+        """Rewrite both files keeping the newest count rows (exclusive lock held)"""
+        keep_from = len(self._metadata) - count
+        vectors = np.fromfile(self._vectors_file, dtype=np.float32).reshape(-1, self.dim) if self._vector_rows() else np.zeros((0, self.dim), dtype=np.float32)
+        vectors = vectors[:min(len(vectors), len(self._metadata))][keep_from:]
+        self._metadata = self._metadata[keep_from:][:len(vectors)]
+        
+        # Write side files then swap in, so readers never see a half-written index
+        vectors_tmp = self._vectors_file + ".tmp"
+        meta_tmp = self._meta_file + ".tmp"
+        vectors.tofile(vectors_tmp)
+        with open(meta_tmp, "w", encoding="utf-8") as f:
+            for metadata in self._metadata:
+                f.write(json.dumps(metadata) + "\n")
+        os.replace(vectors_tmp, self._vectors_file)
+        os.replace(meta_tmp, self._meta_file)
+        
+        self._meta_offset = os.path.getsize(self._meta_file)
+        self._generation = self._next_generation()
+        self._write_header()
+    
+    def _reset_files(self):
+        for path in (self._vectors_file, self._meta_file):
+            if os.path.exists(path):
+                os.remove(path)
+        self._metadata = []
+        self._meta_offset = 0
+    
+    def _remap(self):
+        """Memory-map the vectors file (lock held)"""
+        # Never map past the end of the file, even if metadata got ahead of it
+        rows = min(len(self._metadata), self._vector_rows())
+        if rows == 0:
+            self._matrix = None
+        else:
+            self._matrix = np.memmap(self._vectors_file, dtype=np.float32, mode="r", shape=(rows, self.dim))
+    
+    def add(self, vectors: np.ndarray, metadatas: List[Dict]):
+        """
+        Append vectors with metadata
+        
+        Args:
+            vectors: Array of shape (n, dim)
+            metadatas: One JSON-serializable dict per vector
+        """
+        if len(metadatas) == 0:
+            return
+        vectors = normalize(vectors)
+        
+        with self._locked(exclusive=True):
+            self._refresh()
+            
+            with open(self._vectors_file, "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self._meta_file, "a", encoding="utf-8") as f:
+                for metadata in metadatas:
+                    f.write(json.dumps(metadata) + "\n")
+            self._read_new_metadata()
+            
+            # Compact with 25% slack so we don't rewrite on every append
+            if self.max_vectors and len(self._metadata) > self.max_vectors * 1.25:
+                logger.info(f"Compacting vector index to newest {self.max_vectors} vectors")
+                self._rewrite(self.max_vectors)
+            
+            self._remap()
+    
+    def search(self, query: np.ndarray, k: int = 5) -> List[Tuple[float, Dict]]:
+        """
+        Find the k most similar vectors by cosine similarity
+        
+        Args:
+            query: Query vector of shape (dim,)
+            k: Number of results
+        
+        Returns:
+            List of (score, metadata) tuples, best first
+        """
+        with self._locked(exclusive=False):
+            self._refresh()
+            matrix = self._matrix
+            metadata = self._metadata
+        
+        if matrix is None or k <= 0:
+            return []
+        
+        scores = matrix @ normalize(query.reshape(1, -1))[0]
+        k = min(k, scores.shape[0])
+        
+        # Partial sort - O(n) selection, then order only the k winners
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        
+        return [(float(scores[i]), metadata[i]) for i in top]
+    
+    def count(self) -> int:
+        """Number of stored vectors"""
+        return len(self._metadata)
+    
+    def clear(self):
+        """Remove all vectors"""
+        with self._locked(exclusive=True):
+            self._refresh()
+            self._matrix = None
+            self._reset_files()
+            self._generation = self._next_generation()
+            self._write_header()
@@ -324,7 +324,12 @@ class _ChatScreenState extends State<ChatScreen> with TickerProviderStateMixin {
 
     try {
       // Call backend API
-      final response = await _apiService.ask(userMessage);
+      final response = await _apiService.ask(
+        userMessage,
+        onSuggestion: (tip) {
+          if (mounted) _addMessage('Tip: $tip', isUser: false);
+        },
+      );
 
       _addMessage(response, isUser: false);
       await _voiceService.speak(response);
@@ -262,7 +262,13 @@ class _ThemedHomeScreenState extends State<ThemedHomeScreen> {
     try {
       _addMessage('Thinking...', isUser: false);
       
-      final response = await _apiService.ask(text);
+      final response = await _apiService.ask(
+        text,
+        sessionId: _chatHistory.currentSessionId,
+        onSuggestion: (tip) {
+          if (mounted) _addMessage('Tip: $tip', isUser: false);
+        },
+      );
       
       _messages.removeLast();
       
@@ -296,6 +302,10 @@ class _ThemedHomeScreenState extends State<ThemedHomeScreen> {
     setState(() {
       _messages.clear();
     });
+    final sessionId = _chatHistory.currentSessionId;
+    if (sessionId != null) {
+      _apiService.endSession(sessionId);
+    }
     _chatHistory.clearCurrentSession();
     await _speakWelcomeMessage();
   }
@@ -81,7 +81,15 @@ class JarvisApiService {
   }
 
   /// Send message to J.A.R.V.I.S with permissions
-  Future<String> ask(String userInput) async {
+  ///
+  /// With a [sessionId] the server keeps the conversation history, so only
+  /// the new message is sent. [onSuggestion] receives the follow-up tip once
+  /// it is ready; the reply itself doesn't wait for it.
+  Future<String> ask(
+    String userInput, {
+    String? sessionId,
+    void Function(String suggestion)? onSuggestion,
+  }) async {
     try {
       // Get current permissions
       final permissions = await SettingsManager.getAllPermissions();
@@ -96,12 +104,19 @@ class JarvisApiService {
             },
             body: json.encode({
               'user_input': userInput,
+              if (sessionId != null) 'session_id': sessionId,
             }),
           )
           .timeout(const Duration(seconds: 90));
 
       if (response.statusCode == 200) {
         final data = json.decode(response.body);
+        final suggestionId = data['suggestion_id'];
+        if (onSuggestion != null && suggestionId != null) {
+          fetchSuggestion(suggestionId).then((suggestion) {
+            if (suggestion != null) onSuggestion(suggestion);
+          });
+        }
         return data['response'];
       } else {
         final error = json.decode(response.body);
@@ -111,4 +126,37 @@ class JarvisApiService {
       throw Exception('Error communicating with J.A.R.V.I.S: $e');
     }
   }
+
+  /// Get the follow-up tip for an earlier reply (null if there is none)
+  ///
+  /// The server only generates a tip when it is requested.
+  Future<String?> fetchSuggestion(String suggestionId) async {
+    try {
+      final response = await http
+          .get(Uri.parse('$_baseUrl/suggestion/$suggestionId'))
+          .timeout(const Duration(seconds: 15));
+      if (response.statusCode != 200) return null;
+      final data = json.decode(response.body);
+      return data['status'] == 'ready' ? data['suggestion'] : null;
+    } catch (e) {
+      if (kDebugMode) {
+        print('Failed to fetch suggestion: $e');
+      }
+      return null;
+    }
+  }
+
+  /// Delete a conversation session's server-side history
+  Future<void> endSession(String sessionId) async {
+    try {
+      await http
+          .delete(Uri.parse('$_baseUrl/session/$sessionId'))
+          .timeout(const Duration(seconds: 10));
+    } catch (e) {
+      // Idle sessions expire on the server anyway
+      if (kDebugMode) {
+        print('Failed to end session: $e');
+      }
+    }
+  }
 }